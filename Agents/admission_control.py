@@ -0,0 +1,179 @@
+"""
+Admission control for long-running agent runs.
+
+Bounds how many agent runs execute at once inside the Agents container and
+parks the rest in a priority-ordered wait queue. When the queue is full (or a
+queued request waits too long) the caller is rejected with a Retry-After hint
+so bursts are pushed back to the Backend instead of piling up in memory or
+exhausting the Vertex AI quota.
+"""
+
+import asyncio
+import heapq
+import itertools
+import math
+import os
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, Dict, Optional
+
+# Lower value = served first
+PRIORITY_HIGH = 0
+PRIORITY_NORMAL = 1
+PRIORITY_LOW = 2
+
+PRIORITY_LEVELS = {
+    "high": PRIORITY_HIGH,
+    "normal": PRIORITY_NORMAL,
+    "low": PRIORITY_LOW,
+}
+
+
+class AdmissionRejected(Exception):
+    """Raised when an agent run cannot be admitted."""
+
+    def __init__(self, reason: str, retry_after: int):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """Bounded concurrency limiter with a priority-aware wait queue."""
+
+    def __init__(self, max_concurrent: int, max_queue_depth: int, queue_timeout: float):
+        self.max_concurrent = max(1, max_concurrent)
+        self.max_queue_depth = max(0, max_queue_depth)
+        self.queue_timeout = queue_timeout
+
+        self._active = 0
+        self._queued = 0
+        self._waiters: list = []  # heap of (priority, sequence, future)
+        self._sequence = itertools.count()
+
+        # Metrics
+        self._admitted_total = 0
+        self._rejected_total = 0
+        self._timed_out_total = 0
+        self._completed_total = 0
+        self._wait_times = deque(maxlen=1000)
+        self._run_times = deque(maxlen=200)
+        self._max_queue_depth_seen = 0
+
+    @staticmethod
+    def parse_priority(priority: str) -> int:
+        """Map a priority name ('high', 'normal', 'low') to its queue rank."""
+        return PRIORITY_LEVELS.get((priority or "normal").lower(), PRIORITY_NORMAL)
+
+    def _retry_after(self) -> int:
+        """Estimate how long a rejected caller should back off, in seconds."""
+        avg_run = sum(self._run_times) / len(self._run_times) if self._run_times else 30.0
+        backlog = self._queued + 1
+        estimate = math.ceil(avg_run * backlog / self.max_concurrent)
+        return max(1, min(estimate, 300))
+
+    async def acquire(self, priority: int = PRIORITY_NORMAL) -> float:
+        """Wait for a run slot and return the time spent queued, in seconds."""
+        if self._active < self.max_concurrent and self._queued == 0:
+            self._active += 1
+            self._admitted_total += 1
+            self._wait_times.append(0.0)
+            return 0.0
+
+        if self._queued >= self.max_queue_depth:
+            self._rejected_total += 1
+            raise AdmissionRejected(
+                f"Agent queue is full ({self._queued}/{self.max_queue_depth} waiting)",
+                self._retry_after(),
+            )
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._sequence), future))
+        self._queued += 1
+        self._max_queue_depth_seen = max(self._max_queue_depth_seen, self._queued)
+        started = time.monotonic()
+
+        try:
+            await asyncio.wait_for(future, timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            self._queued -= 1
+            self._timed_out_total += 1
+            self._rejected_total += 1
+            raise AdmissionRejected(
+                f"Timed out after {self.queue_timeout:.0f}s waiting for an agent slot",
+                self._retry_after(),
+            )
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # The slot was handed over just as the caller went away - pass it on
+                self.release()
+            else:
+                self._queued -= 1
+            raise
+
+        waited = time.monotonic() - started
+        self._admitted_total += 1
+        self._wait_times.append(waited)
+        return waited
+
+    def release(self, run_seconds: Optional[float] = None) -> None:
+        """Free a run slot, handing it directly to the highest-priority waiter."""
+        if run_seconds is not None:
+            self._run_times.append(run_seconds)
+            self._completed_total += 1
+        while self._waiters:
+            _, _, future = heapq.heappop(self._waiters)
+            if not future.done():
+                self._queued -= 1
+                future.set_result(None)
+                return
+        self._active = max(0, self._active - 1)
+
+    @asynccontextmanager
+    async def slot(self, priority: int = PRIORITY_NORMAL):
+        """Async context manager that holds a run slot for the duration of a run."""
+        await self.acquire(priority)
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self.release(time.monotonic() - started)
+
+    def metrics(self) -> Dict[str, Any]:
+        """Snapshot of queue depth, concurrency and wait-time statistics."""
+        waits = sorted(self._wait_times)
+
+        def percentile(p: float) -> float:
+            if not waits:
+                return 0.0
+            index = min(len(waits) - 1, int(round(p * (len(waits) - 1))))
+            return round(waits[index], 3)
+
+        return {
+            "max_concurrent": self.max_concurrent,
+            "max_queue_depth": self.max_queue_depth,
+            "queue_timeout_seconds": self.queue_timeout,
+            "active_runs": self._active,
+            "queue_depth": self._queued,
+            "max_queue_depth_seen": self._max_queue_depth_seen,
+            "admitted_total": self._admitted_total,
+            "rejected_total": self._rejected_total,
+            "timed_out_total": self._timed_out_total,
+            "completed_total": self._completed_total,
+            "wait_seconds": {
+                "p50": percentile(0.50),
+                "p95": percentile(0.95),
+                "p99": percentile(0.99),
+                "max": round(waits[-1], 3) if waits else 0.0,
+            },
+            "avg_run_seconds": round(sum(self._run_times) / len(self._run_times), 3) if self._run_times else 0.0,
+        }
+
+
+# Create a singleton instance
+admission_controller = AdmissionController(
+    max_concurrent=int(os.getenv("AGENT_MAX_CONCURRENT_RUNS", "4")),
+    max_queue_depth=int(os.getenv("AGENT_MAX_QUEUE_DEPTH", "16")),
+    queue_timeout=float(os.getenv("AGENT_QUEUE_TIMEOUT", "300")),
+)
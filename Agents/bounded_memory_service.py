@@ -0,0 +1,225 @@
+"""
+Bounded, project-scoped memory service with a keyword index.
+
+`InMemoryMemoryService` keeps every session it is given forever and scans all
+of them on each search, so memory use and recall cost grow with uptime. This
+implementation:
+
+- scopes memories per project (taken from the session state or the
+  "FIRESTORE_PROJECT_ID : ..." marker the Frontend puts in its prompts),
+- replaces a session's memories when the session is added again instead of
+  appending duplicates,
+- evicts least recently used sessions once the entry or byte budget is
+  exceeded, and truncates oversized entries,
+- answers searches from an inverted keyword index ranked by IDF, so recall
+  touches only the entries that share words with the query.
+"""
+
+import math
+import os
+import re
+import threading
+from collections import OrderedDict, defaultdict
+from datetime import datetime
+from typing import Any, Dict, List, Set, Tuple
+
+from google.adk.memory import BaseMemoryService
+from google.adk.memory.base_memory_service import SearchMemoryResponse
+from google.adk.memory.memory_entry import MemoryEntry
+from google.genai.types import Content, Part
+
+DEFAULT_PROJECT = "default"
+
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "has", "have", "in", "is", "it",
+    "its", "of", "on", "or", "that", "the", "this", "to", "was", "were", "will", "with", "you", "your",
+}
+
+_PROJECT_PATTERNS = [
+    re.compile(r"FIRESTORE_PROJECT_ID\s*:\s*([\w.-]+)"),
+    re.compile(r"\bproject_id\b[\"']?\s*[:=]\s*[\"']?([\w.-]+)"),
+]
+
+Scope = Tuple[str, str, str]  # (app_name, user_id, project)
+
+
+def _tokenize(text: str) -> List[str]:
+    return [word for word in re.findall(r"[a-z0-9]+", text.lower()) if len(word) > 1 and word not in STOPWORDS]
+
+
+class _Entry:
+    __slots__ = ("entry_id", "scope", "session_id", "author", "timestamp", "text", "words", "size")
+
+    def __init__(self, entry_id: int, scope: Scope, session_id: str, author: str, timestamp: float, text: str):
+        self.entry_id = entry_id
+        self.scope = scope
+        self.session_id = session_id
+        self.author = author
+        self.timestamp = timestamp
+        self.text = text
+        self.words = set(_tokenize(text))
+        self.size = len(text.encode("utf-8"))
+
+
+class BoundedMemoryService(BaseMemoryService):
+    """Memory service with per-project scopes, LRU eviction and an inverted index."""
+
+    def __init__(
+        self,
+        max_entries: int = 5000,
+        max_bytes: int = 50 * 1024 * 1024,
+        max_entry_chars: int = 8000,
+        top_k: int = 10,
+    ):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.max_entry_chars = max_entry_chars
+        self.top_k = top_k
+
+        self._lock = threading.Lock()
+        self._next_id = 0
+        self._entries: Dict[int, _Entry] = {}
+        # (scope, session_id) -> entry ids, least recently used first
+        self._sessions: "OrderedDict[Tuple[Scope, str], List[int]]" = OrderedDict()
+        # (app_name, user_id, session_id) -> its key in _sessions
+        self._session_keys: Dict[Tuple[str, str, str], Tuple[Scope, str]] = {}
+        # scope -> word -> entry ids
+        self._index: Dict[Scope, Dict[str, Set[int]]] = defaultdict(lambda: defaultdict(set))
+        # (app_name, user_id) -> project of the most recently added session
+        self._active_project: Dict[Tuple[str, str], str] = {}
+        self._bytes = 0
+        self._evicted_sessions = 0
+
+    @staticmethod
+    def project_of(session) -> str:
+        """Work out which project a session belongs to."""
+        for key in ("project_id", "user:project_id"):
+            if session.state.get(key):
+                return str(session.state[key])
+        for event in session.events:
+            if event.author != "user" or not event.content or not event.content.parts:
+                continue
+            text = " ".join(part.text for part in event.content.parts if part.text)
+            for pattern in _PROJECT_PATTERNS:
+                match = pattern.search(text)
+                if match:
+                    return match.group(1)
+        return DEFAULT_PROJECT
+
+    def _remove_session(self, key: Tuple[Scope, str]) -> None:
+        scope = key[0]
+        self._session_keys.pop((scope[0], scope[1], key[1]), None)
+        for entry_id in self._sessions.pop(key, []):
+            entry = self._entries.pop(entry_id)
+            self._bytes -= entry.size
+            postings = self._index[scope]
+            for word in entry.words:
+                ids = postings.get(word)
+                if ids is not None:
+                    ids.discard(entry_id)
+                    if not ids:
+                        del postings[word]
+        if scope in self._index and not self._index[scope]:
+            del self._index[scope]
+
+    def _evict(self) -> None:
+        while self._sessions and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+            oldest = next(iter(self._sessions))
+            self._remove_session(oldest)
+            self._evicted_sessions += 1
+
+    async def add_session_to_memory(self, session):
+        project = self.project_of(session)
+        scope: Scope = (session.app_name, session.user_id, project)
+        key = (scope, session.id)
+
+        with self._lock:
+            # Re-adding a session replaces its memories instead of duplicating them
+            existing_key = self._session_keys.get((session.app_name, session.user_id, session.id))
+            if existing_key is not None:
+                self._remove_session(existing_key)
+
+            entry_ids = []
+            for event in session.events:
+                if not event.content or not event.content.parts:
+                    continue
+                text = " ".join(part.text for part in event.content.parts if part.text).strip()
+                if not text:
+                    continue
+                entry = _Entry(self._next_id, scope, session.id, event.author, event.timestamp,
+                               text[:self.max_entry_chars])
+                if not entry.words:
+                    continue
+                self._next_id += 1
+                self._entries[entry.entry_id] = entry
+                self._bytes += entry.size
+                for word in entry.words:
+                    self._index[scope][word].add(entry.entry_id)
+                entry_ids.append(entry.entry_id)
+
+            self._sessions[key] = entry_ids
+            self._session_keys[(session.app_name, session.user_id, session.id)] = key
+            self._sessions.move_to_end(key)
+            self._active_project[(session.app_name, session.user_id)] = project
+            self._evict()
+
+    def _search(self, scope: Scope, query: str) -> List[_Entry]:
+        postings = self._index.get(scope)
+        if not postings:
+            return []
+        total = len(self._entries) or 1
+        scores: Dict[int, float] = defaultdict(float)
+        for word in set(_tokenize(query)):
+            ids = postings.get(word)
+            if not ids:
+                continue
+            idf = math.log(1 + total / len(ids))
+            for entry_id in ids:
+                scores[entry_id] += idf
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], -self._entries[item[0]].timestamp))
+        return [self._entries[entry_id] for entry_id, _ in ranked[:self.top_k]]
+
+    async def search_memory(self, *, app_name: str, user_id: str, query: str) -> SearchMemoryResponse:
+        """Search the project the user is currently working on."""
+        project = self._active_project.get((app_name, user_id), DEFAULT_PROJECT)
+        return await self.search_project_memory(app_name=app_name, user_id=user_id, project=project, query=query)
+
+    async def search_project_memory(self, *, app_name: str, user_id: str, project: str, query: str) -> SearchMemoryResponse:
+        scope: Scope = (app_name, user_id, project)
+        with self._lock:
+            hits = self._search(scope, query)
+            # Recalled sessions count as recently used
+            for entry in hits:
+                key = (entry.scope, entry.session_id)
+                if key in self._sessions:
+                    self._sessions.move_to_end(key)
+            memories = [
+                MemoryEntry(
+                    content=Content(role="user" if entry.author == "user" else "model", parts=[Part(text=entry.text)]),
+                    author=entry.author,
+                    timestamp=datetime.fromtimestamp(entry.timestamp).isoformat(),
+                )
+                for entry in hits
+            ]
+        return SearchMemoryResponse(memories=memories)
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "sessions": len(self._sessions),
+                "projects": len({key[0] for key in self._sessions}),
+                "evicted_sessions_total": self._evicted_sessions,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+            }
+
+
+def create_bounded_memory_service() -> BoundedMemoryService:
+    return BoundedMemoryService(
+        max_entries=int(os.getenv("AGENT_MEMORY_MAX_ENTRIES", "5000")),
+        max_bytes=int(os.getenv("AGENT_MEMORY_MAX_BYTES", str(50 * 1024 * 1024))),
+        max_entry_chars=int(os.getenv("AGENT_MEMORY_MAX_ENTRY_CHARS", "8000")),
+        top_k=int(os.getenv("AGENT_MEMORY_SEARCH_TOP_K", "10")),
+    )
@@ -7,6 +7,8 @@ from google.adk.agents import Agent
 from google.adk.tools import agent_tool
 from google.cloud import logging as google_cloud_logging
 
+from session_compaction import fetch_requirement_blob
+
 from test_generator_agent import test_generator_agent
 
 # Load environment variables from .env file in root directory
@@ -262,5 +264,6 @@ Jira MCP Tool
 Firestore MCP Tool
 
 
-"""    
+""",
+    tools=[fetch_requirement_blob],
 )
@@ -0,0 +1,66 @@
+"""
+Helpers for pulling JSON payloads out of free-form LLM responses.
+
+Agents usually answer with a JSON object, but it may be wrapped in markdown
+fences or surrounded by a sentence of prose. These helpers locate the first
+complete JSON object in the text and decode it.
+"""
+
+import json
+import re
+from typing import Any, Optional
+
+_FENCE_RE = re.compile(r"```(?:json)?\s*(.*?)```", re.DOTALL | re.IGNORECASE)
+
+
+def _balanced_object(text: str, start: int) -> Optional[str]:
+    """Return the balanced {...} block starting at `start`, honouring strings."""
+    depth = 0
+    in_string = False
+    escaped = False
+    for index in range(start, len(text)):
+        char = text[index]
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+            continue
+        if char == '"':
+            in_string = True
+        elif char == "{":
+            depth += 1
+        elif char == "}":
+            depth -= 1
+            if depth == 0:
+                return text[start:index + 1]
+    return None
+
+
+def extract_json(text: str) -> Optional[Any]:
+    """Decode the first JSON object found in `text`, or return None."""
+    if not text:
+        return None
+
+    candidates = [match.group(1) for match in _FENCE_RE.finditer(text)]
+    candidates.append(text)
+
+    for candidate in candidates:
+        candidate = candidate.strip()
+        try:
+            return json.loads(candidate)
+        except ValueError:
+            pass
+
+        start = candidate.find("{")
+        while start != -1:
+            block = _balanced_object(candidate, start)
+            if block is None:
+                break
+            try:
+                return json.loads(block)
+            except ValueError:
+                start = candidate.find("{", start + 1)
+    return None
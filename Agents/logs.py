@@ -0,0 +1,16 @@
+"""
+Structured logging for the Agents API.
+
+Hot-path logs go through category loggers (`get_logger("run")` is the
+"agents.run" logger) instead of print(). The JSON/text format, the queue and
+writer thread, and the LOG_* settings are shared with the other services
+(medassure_telemetry.logs). Values such as an ADK event or a response dict
+are only turned into text on the writer thread. LOG_SAMPLE_RATES defaults to
+"events=0.1": one ADK event log in ten.
+"""
+
+from medassure_telemetry import logs as shared_logs
+# Re-exported for the rest of the service
+from medassure_telemetry.logs import get_logger, truncate
+
+shared_logs.configure("agents", default_sample_rates="events=0.1")
@@ -1,25 +1,62 @@
+import os
+import json
+import time
 import uuid
 from google.adk.runners import Runner
 from google.adk.sessions import InMemorySessionService
 from google.adk.memory import InMemoryMemoryService
+from google.adk.events import Event
 from google.genai.types import Content, Part
-from fastapi import FastAPI
+from fastapi import FastAPI, HTTPException
 from pydantic import BaseModel
 import uvicorn
 
 from master_agent.agent import root_agent
+from sqlite_session_service import SqliteSessionService, SqliteMemoryService
+from bounded_memory_service import create_bounded_memory_service
+from session_compaction import session_compactor, expand_blob_references
+from mcp_connections import mcp_connections
+from admission_control import admission_controller, AdmissionRejected
+from parallel_test_generation import parallel_test_generator
+from push_pipeline import push_pipeline, find_generated_hierarchy, parse_push_targets
+from run_profiler import run_profiler
+import logs
+import metrics
+import tracing
 
 # Session and Runner
 APP_NAME = "master_agent_app"
 USER_ID="test_user"
-SESSION_ID="test_session"
+
+# "sqlite" keeps sessions and memory on disk so clarification history survives
+# restarts and can be shared by replicas mounting the same volume; "memory"
+# restores the old in-process behaviour.
+SESSION_BACKEND = os.getenv("AGENT_SESSION_BACKEND", "sqlite").lower()
+SESSION_DB_PATH = os.getenv("AGENT_SESSION_DB_PATH", "data/agent_sessions.db")
+# "bounded" (project-scoped, LRU-evicted, indexed), "sqlite" (durable, unbounded)
+# or "memory" (ADK's unbounded in-memory store)
+MEMORY_BACKEND = os.getenv("AGENT_MEMORY_BACKEND", "bounded").lower()
 
 # Global session and runner instances
 global_session = None
 global_runner = None
 
+# Structured, queued logs (LOG_LEVELS / LOG_SAMPLE_RATES per category)
+run_log = logs.get_logger("run")
+event_log = logs.get_logger("events")
+session_log = logs.get_logger("session")
+generation_log = logs.get_logger("generation")
+
 # Initialize FastAPI app
 app = FastAPI(title="Master Agent API", description="API for Master Agent interactions")  
+# Request latency, agent run and MCP tool metrics at GET /metrics for Prometheus
+metrics.install(app)
+# Request, agent run, ADK event and tool call spans (TRACING_EXPORTER)
+tracing.install(app)
+metrics.register_gauge("agents_admission_active_runs", "Agent runs holding an admission slot",
+                       lambda: admission_controller.metrics()["active_runs"])
+metrics.register_gauge("agents_admission_queue_depth", "Agent runs waiting for an admission slot",
+                       lambda: admission_controller.metrics()["queue_depth"])
 
 # Pydantic models for request/response
 class QueryRequest(BaseModel):
@@ -29,143 +66,371 @@ class QueryResponse(BaseModel):
     response: str
     debug_info: str = ""
 
-async def setup_session_and_runner():
-    print("DEBUG: Starting setup_session_and_runner()")
-    session_service = InMemorySessionService()
-    memory_service = InMemoryMemoryService()
-    session = await session_service.create_session(app_name=APP_NAME, user_id=USER_ID, session_id=SESSION_ID)  # type: ignore
-    runner = Runner(agent=root_agent, app_name=APP_NAME, session_service=session_service, memory_service=memory_service)
-    print("DEBUG: Completed setup_session_and_runner()")
+def create_services():
+    if SESSION_BACKEND == "memory":
+        session_service = InMemorySessionService()
+    else:
+        print(f"DEBUG: Using SQLite session storage at {SESSION_DB_PATH}")
+        session_service = SqliteSessionService(SESSION_DB_PATH)
+
+    if MEMORY_BACKEND == "sqlite":
+        memory_service = SqliteMemoryService(SESSION_DB_PATH)
+    elif MEMORY_BACKEND == "memory":
+        memory_service = InMemoryMemoryService()
+    else:
+        memory_service = create_bounded_memory_service()
+    print(f"DEBUG: Using {type(memory_service).__name__} for agent memory")
+    return session_service, memory_service
+
+def new_session_id():
+    return f"session_{uuid.uuid4().hex[:12]}"
+
+async def get_active_session(session_service):
+    """The active session is the user's most recently updated one."""
+    response = await session_service.list_sessions(app_name=APP_NAME, user_id=USER_ID)
+    if not response.sessions:
+        return None
+    return max(response.sessions, key=lambda session: session.last_update_time)
+
+async def setup_session_and_runner(new_session: bool = False):
+    """Build the runner once, then resume the active session or start a new one."""
+    runner = global_runner
+    if runner is None:
+        session_service, memory_service = create_services()
+        runner = Runner(agent=root_agent, app_name=APP_NAME, session_service=session_service, memory_service=memory_service)
+
+    session = None if new_session else await get_active_session(runner.session_service)
+    if session is None:
+        session = await runner.session_service.create_session(app_name=APP_NAME, user_id=USER_ID, session_id=new_session_id())  # type: ignore
+        session_log.info("Created session", extra={"session_id": session.id})
+    else:
+        session_log.debug("Resumed session", extra={"session_id": session.id})
     return session, runner
 
 async def reset_session():
-    """Reset the global session and runner - useful for debugging or manual resets"""
-    print("Starting reset_session()")
+    """Start a fresh session - useful for debugging or manual resets"""
     global global_session, global_runner
-    global_session = None
-    global_runner = None
-    print("Session and runner reset")
+    global_session, global_runner = await setup_session_and_runner(new_session=True)
+    session_log.info("Session reset", extra={"session_id": global_session.id})
 
 # Agent Interaction
 async def call_agent_async(query, isnewproject: bool):
-    print(f"DEBUG: Starting call_agent_async() with isnewproject={isnewproject}")
     global global_session, global_runner
     
-    print("DEBUG: Creating Content object")
     content = Content(role='user', parts=[Part(text=query)])
-    print(f"DEBUG: Content created successfully")
-
-    # Print first 100 characters of the prompt for debugging
-    print(f"Prompt (first 100 chars): {query[:100]}...")
-
-    # Only setup new session and runner if it's a new project or if they don't exist
-    if (
-    isnewproject
-    or global_session is None
-    or global_runner is None
-    or getattr(global_session, "is_closed", lambda: False)()
-    ):
-        print(f"Creating new session and runner (isnewproject: {isnewproject})")
-        global_session, global_runner = await setup_session_and_runner()
-        print("DEBUG: New session and runner created successfully")
-    else:
-        print("Reusing existing session and runner")
 
-    print("DEBUG: About to call global_runner.run_async()")
-    try:
-        events = global_runner.run_async(user_id=USER_ID, session_id=SESSION_ID, new_message=content)
-    except Exception as e:
-        if "Session terminated" in str(e):
-            print("MCP session terminated reinitializing...")
-            global_session, global_runner = await setup_session_and_runner()
-            events = global_runner.run_async(user_id=USER_ID, session_id=SESSION_ID, new_message=content)
-        else:
-            raise
-    print("DEBUG: global_runner.run_async() returned events generator")
+    # New projects start a new session on the existing runner; otherwise resume the
+    # most recently updated session (another replica may have moved on to a new one)
+    session, runner = await setup_session_and_runner(new_session=isnewproject)
+    # Summarize old turns and offload pasted documents once the history gets large
+    session = await session_compactor.maybe_compact(runner.session_service, session, new_session_id())
+    # Concurrent runs reassign the globals while this one awaits: the run keeps its own session
+    global_session, global_runner = session, runner
+
+    # Dropped MCP sessions are reconnected per tool call by mcp_connections
+    events = runner.run_async(user_id=USER_ID, session_id=session.id, new_message=content)
 
     final_response_content = "Final response not yet received."
     debug_events = []
     
-    print("DEBUG: Starting event processing loop")
     event_count = 0
+    # Time spent per agent: a stage ends when another agent starts producing events
+    stage_author, stage_started = None, time.perf_counter()
+    run_spans = tracing.RunSpans()
+    # Model turns, tool calls and transfers with wall time and tokens, at GET /runs/{id}/profile
+    profile = run_profiler.start("query", session.id)
+    run_log.info("Agent run started", extra={"run_id": profile.run_id, "session_id": session.id,
+                                              "new_project": isnewproject, "prompt_chars": len(query),
+                                              "prompt": logs.truncate(query, 100)})
     
-    async for event in events:
-        event_count += 1
-        print(f"DEBUG: Processing event #{event_count}")
+    # The session is not compacted while this run streams into it
+    with session_compactor.track_run(session.id):
+        try:
+            async for event in events:
+                event_count += 1
+                run_spans.event(event)
+                profile.event(event)
+                if event.author != stage_author:
+                    if stage_author is not None:
+                        metrics.observe_stage("query", stage_author, time.perf_counter() - stage_started)
+                    stage_author, stage_started = event.author, time.perf_counter()
         
-        if function_calls := event.get_function_calls():
-            tool_name = function_calls[0].name
-            debug_info = f"_Using tool {tool_name}..._"
-            print(debug_info)
-            debug_events.append(debug_info)
-        elif event.actions and event.actions.transfer_to_agent:
-            personality_name = event.actions.transfer_to_agent
-            debug_info = f"_Delegating to agent: {personality_name}..._"
-            print(debug_info)
-            debug_events.append(debug_info)
-        elif event.is_final_response() and event.content and event.content.parts:
-            final_response_content = event.content.parts[0].text
-
-        # For debugging, print the raw type and content to the console
-        print(f"DEBUG: Full Event: {str(event)[:3000]}...")
+                if function_calls := event.get_function_calls():
+                    tool_name = function_calls[0].name
+                    debug_info = f"_Using tool {tool_name}..._"
+                    run_log.info("Tool call", extra={"run_id": profile.run_id, "agent": event.author, "tool": tool_name})
+                    debug_events.append(debug_info)
+                elif event.actions and event.actions.transfer_to_agent:
+                    personality_name = event.actions.transfer_to_agent
+                    debug_info = f"_Delegating to agent: {personality_name}..._"
+                    run_log.info("Agent transfer", extra={"run_id": profile.run_id, "agent": event.author,
+                                                          "to_agent": personality_name})
+                    debug_events.append(debug_info)
+                elif event.is_final_response() and event.content and event.content.parts:
+                    final_response_content = event.content.parts[0].text
+
+                # Sampled (LOG_SAMPLE_RATES); the event is only rendered and truncated on the log writer thread
+                event_log.info("ADK event", extra={"run_id": profile.run_id, "event_number": event_count,
+                                                   "author": event.author, "event": event})
+        except BaseException as e:
+            profile.finish(error=f"{type(e).__name__}: {e}")
+            raise
+        finally:
+            run_spans.close()
+    profile.finish()
+    debug_events.append(profile.debug_summary())
     
-    print(f"DEBUG: Event processing loop completed. Processed {event_count} events")
-    print("## Final Message")
-    print(final_response_content[:3000] + "..." if len(final_response_content) > 3000 else final_response_content)
+    if stage_author is not None:
+        metrics.observe_stage("query", stage_author, time.perf_counter() - stage_started)
+    run_log.info("Agent run finished", extra={"run_id": profile.run_id, "events": event_count,
+                                               "wall_seconds": profile.wall_seconds,
+                                               "response_chars": len(final_response_content),
+                                               "response": final_response_content})
 
     try:
-        completed_session = await global_runner.session_service.get_session(app_name=APP_NAME, user_id=USER_ID, session_id=SESSION_ID)
-        await global_runner.memory_service.add_session_to_memory(completed_session) #type: ignore
-        print("DEBUG: Session added to memory successfully")
+        completed_session = await runner.session_service.get_session(app_name=APP_NAME, user_id=USER_ID, session_id=session.id)
+        await runner.memory_service.add_session_to_memory(completed_session) #type: ignore
+        session_log.debug("Session added to memory", extra={"session_id": session.id})
     except Exception as e:
-        print(f" Skipped adding to memory: {e}")
+        session_log.warning("Skipped adding session to memory", extra={"session_id": session.id, "error": str(e)})
 
     return final_response_content, "\n".join(debug_events)
     
+async def admit(priority: str):
+    """Wait for an admission slot, or raise 429 with a Retry-After header."""
+    try:
+        await admission_controller.acquire(admission_controller.parse_priority(priority))
+    except AdmissionRejected as e:
+        run_log.warning("Request rejected by admission control", extra={"reason": e.reason, "priority": priority})
+        raise HTTPException(
+            status_code=429,
+            detail=e.reason,
+            headers={"Retry-After": str(e.retry_after)}
+        )
+
+async def get_session_context(runner, session_id: str) -> str:
+    """Concatenate the text of a conversation (requirements, review outcome)."""
+    session = await runner.session_service.get_session(app_name=APP_NAME, user_id=USER_ID, session_id=session_id)
+    if session is None:
+        return ""
+    texts = []
+    for event in session.events:
+        if event.content and event.content.parts:
+            text = "".join(part.text or "" for part in event.content.parts)
+            if text.strip():
+                texts.append(f"[{event.author}]\n{await expand_blob_references(text)}")
+    return "\n\n".join(texts)
+
+async def generate_parallel_async(instruction: str):
+    """Run fan-out test generation and record the result in the shared session."""
+    global global_session, global_runner
+    session, runner = await setup_session_and_runner()
+    global_session, global_runner = session, runner
+
+    # The result is appended to this session: keep it from being compacted meanwhile
+    with session_compactor.track_run(session.id):
+        context = await get_session_context(runner, session.id)
+        generation_log.info("Parallel generation started", extra={"context_chars": len(context)})
+        result = await parallel_test_generator.generate(context, instruction)
+        result_text = json.dumps(result, indent=2)
+
+        # Store the merged output in the master agent session so the existing
+        # "push to Jira and Firestore" prompt can find the generated artifacts
+        session = await runner.session_service.get_session(app_name=APP_NAME, user_id=USER_ID, session_id=session.id)
+        await runner.session_service.append_event(session, Event(
+            invocation_id=f"parallel-{uuid.uuid4().hex[:8]}",
+            author="test_generator_agent",
+            content=Content(role="model", parts=[Part(text=result_text)]),
+        ))
+        return result_text, json.dumps(result["generation_stats"])
+
+async def push_artifacts_async(instruction: str, project_id: str = None, jira_project_key: str = None):
+    """Push the latest generated hierarchy to Jira and Firestore without an LLM round trip."""
+    global global_session, global_runner
+    session, runner = await setup_session_and_runner()
+    global_session, global_runner = session, runner
+
+    # The result is appended to this session: keep it from being compacted meanwhile
+    with session_compactor.track_run(session.id):
+        session = await runner.session_service.get_session(app_name=APP_NAME, user_id=USER_ID, session_id=session.id)
+        user_texts, agent_texts = [], []
+        for event in (session.events if session else []):
+            if event.content and event.content.parts:
+                text = "".join(part.text or "" for part in event.content.parts)
+                if text.strip():
+                    (user_texts if event.author == "user" else agent_texts).append(text)
+
+        generated = find_generated_hierarchy(agent_texts)
+        if generated is None:
+            raise ValueError("No generated test cases found in the current session")
+
+        # Explicit parameters win, then the push instruction, then the earlier user prompts
+        targets = parse_push_targets(instruction)
+        for text in reversed(user_texts):
+            for key, value in parse_push_targets(text).items():
+                targets[key] = targets[key] or value
+        project_id = project_id or targets["project_id"] or generated.get("project_id")
+        jira_project_key = jira_project_key or targets["jira_project_key"]
+        if not project_id:
+            raise ValueError("Firestore project ID not found; pass project_id or include FIRESTORE_PROJECT_ID in the request")
+
+        result = await push_pipeline.push(generated, project_id, jira_project_key)
+        generation_log.info("Push finished", extra={"status": result["status"], "timings_seconds": result["timings_seconds"]})
+
+        # The session gets the hierarchy with its Jira keys: a retried push reads
+        # it back as the latest generated output and only creates what is missing
+        await runner.session_service.append_event(session, Event(
+            invocation_id=f"push-{uuid.uuid4().hex[:8]}",
+            author="push_pipeline",
+            content=Content(role="model", parts=[Part(text=json.dumps(result, indent=2))]),
+        ))
+        result.pop("epics")
+        result_text = json.dumps(result, indent=2)
+        if not result["success"]:
+            raise RuntimeError(f"Push incomplete: {result['jira_issues_failed']} Jira issues failed, "
+                               f"{len(result['jira_link_failures'])} not linked, stored in Firestore: {result['stored_in_firestore']}. {result_text}")
+        return result_text, json.dumps(result["timings_seconds"])
+
 # FastAPI endpoints
 @app.post("/query", response_model=QueryResponse)
-async def process_query(request: QueryRequest,isnewproject: bool = False):
+async def process_query(request: QueryRequest, isnewproject: bool = False, priority: str = "normal"):
     """
     Process a query through the master agent and return the response.
+
+    Runs are admitted through the admission controller; when too many runs are
+    queued the request is rejected with 429 and a Retry-After header.
     """
-    print(f"DEBUG: Received API request - query length: {len(request.query)}, isnewproject: {isnewproject}")
+    run_log.debug("Query received", extra={"query_chars": len(request.query), "new_project": isnewproject,
+                                            "priority": priority})
+    await admit(priority)
+    run_started = time.monotonic()
     try:
-        print("DEBUG: About to call call_agent_async()")
-        response, debug_info = await call_agent_async(request.query, isnewproject)
-        print(f"DEBUG: call_agent_async() completed successfully")
-        print(f"DEBUG: Response length: {len(response) if response else 0}")
+        with metrics.stage_timer("query", "total"), tracing.span("agent_run query", **{"agent.new_project": isnewproject}):
+            response, debug_info = await call_agent_async(request.query, isnewproject)
         return QueryResponse(response=response, debug_info=debug_info) #type:ignore
     except Exception as e:
-        import traceback
-        print(f"DEBUG: Exception in process_query: {str(e)}")
-        print(f"DEBUG: Exception type: {type(e)}")
-        print(f"DEBUG: Exception args: {e.args}")
-        print(f"DEBUG: Request query length: {len(request.query) if request.query else 0}")
-        print(f"DEBUG: isnewproject parameter: {isnewproject}")
-        print(f"DEBUG: Global session exists: {global_session is not None}")
-        print(f"DEBUG: Global runner exists: {global_runner is not None}")
-        print(f"DEBUG: Full traceback:")
-        print(traceback.format_exc())
-        print("DEBUG: End of exception details")
+        run_log.exception("Query failed", extra={"query_chars": len(request.query) if request.query else 0,
+                                                 "new_project": isnewproject,
+                                                 "has_session": global_session is not None,
+                                                 "has_runner": global_runner is not None})
         return QueryResponse(response=f"Error processing query: {str(e)}", debug_info=f"Exception type: {type(e).__name__}")    
+    finally:
+        admission_controller.release(time.monotonic() - run_started)
 
 
+@app.post("/generate_parallel", response_model=QueryResponse)
+async def generate_parallel(request: QueryRequest, priority: str = "low"):
+    """
+    Generate test cases with per-epic (or per-feature) fan-out.
+
+    Planning and compliance run once; test engineering and review run
+    concurrently per branch (TEST_GENERATION_MAX_PARALLEL_BRANCHES) and are
+    merged deterministically. The merged JSON is appended to the current
+    session so a follow-up /query can push it to Jira and Firestore.
+    """
+    generation_log.debug("Parallel generation request received", extra={"query_chars": len(request.query)})
+    await admit(priority)
+    run_started = time.monotonic()
+    try:
+        with metrics.stage_timer("generate_parallel", "total"), tracing.span("agent_run generate_parallel"):
+            response, debug_info = await generate_parallel_async(request.query)
+        return QueryResponse(response=response, debug_info=debug_info)
+    except Exception as e:
+        generation_log.exception("Parallel generation failed")
+        raise HTTPException(status_code=500, detail=f"Error generating test cases: {type(e).__name__}: {e}")
+    finally:
+        admission_controller.release(time.monotonic() - run_started)
+
+@app.post("/push_artifacts", response_model=QueryResponse)
+async def push_artifacts(request: QueryRequest, project_id: str = None, jira_project_key: str = None, priority: str = "low"):
+    """
+    Push the most recently generated test cases to Jira and Firestore.
+
+    The hierarchy is read from the current session and written in code:
+    Jira issues are created with batch_create_issues, their IDs are copied
+    onto each artifact and the result is stored with bulk_write_epics_structure.
+    """
+    generation_log.debug("Push request received", extra={"project_id": project_id, "jira_project_key": jira_project_key})
+    await admit(priority)
+    run_started = time.monotonic()
+    try:
+        with metrics.stage_timer("push", "total"), tracing.span("agent_run push", **{"firestore.project_id": project_id}):
+            response, debug_info = await push_artifacts_async(request.query, project_id, jira_project_key)
+        return QueryResponse(response=response, debug_info=debug_info)
+    except Exception as e:
+        generation_log.exception("Push failed", extra={"project_id": project_id})
+        raise HTTPException(status_code=500, detail=f"Error pushing artifacts: {type(e).__name__}: {e}")
+    finally:
+        admission_controller.release(time.monotonic() - run_started)
+
 @app.get("/")
 async def root():
     """
     Health check endpoint.
     """
-    print("DEBUG: Health check endpoint called")
     return {"message": "Master Agent API is running!", "status": "healthy"}
 
+@app.get("/admission/metrics")
+async def admission_metrics():
+    """
+    Queue depth, active runs and wait-time statistics for the /query admission controller.
+    """
+    return admission_controller.metrics()
+
+@app.get("/runs")
+async def recent_runs(limit: int = 20):
+    """
+    Summaries of the latest /query runs (wall time, tokens, slowest step), newest first.
+    """
+    return {"runs": run_profiler.recent(limit)}
+
+@app.get("/runs/{run_id}/profile")
+async def run_profile(run_id: str):
+    """
+    Timeline of one /query run: model turns, tool calls and agent transfers with
+    their wall time and token counts, plus totals per agent and per tool.
+    """
+    profile = run_profiler.get(run_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail=f"Run {run_id} not found (only the last {run_profiler.max_runs} runs are kept)")
+    return profile.to_dict()
+
+@app.get("/session/compaction")
+async def session_compaction_metrics():
+    """
+    Compaction settings and the outcome of the most recent compaction.
+    """
+    return session_compactor.metrics()
+
+@app.get("/memory/metrics")
+async def memory_metrics():
+    """
+    Size and eviction statistics for the agent memory service.
+    """
+    if global_runner is None or not hasattr(global_runner.memory_service, "metrics"):
+        return {"backend": MEMORY_BACKEND}
+    return {"backend": MEMORY_BACKEND, **global_runner.memory_service.metrics()}
+
+@app.get("/mcp/health")
+async def mcp_health():
+    """
+    Ping every MCP server, reconnecting once if a pooled session is dead.
+    """
+    return await mcp_connections.health_check()
+
+@app.get("/mcp/metrics")
+async def mcp_metrics():
+    """
+    Per-tool call counts, errors, reconnects and latency for the shared MCP connections.
+    """
+    return mcp_connections.metrics()
+
 @app.post("/reset-session")
 async def reset_session_endpoint():
     """
     Reset the current session and memory - useful for starting fresh.
     """
-    print("DEBUG: Reset session endpoint called")
     await reset_session()
-    print("DEBUG: Reset session endpoint completed")
     return {"message": "Session reset successfully", "status": "success"}
 
 @app.on_event("startup")
@@ -173,14 +438,16 @@ async def startup_event():
     global global_session, global_runner
     print("Initializing persistent MCP session and runner...")
     global_session, global_runner = await setup_session_and_runner()
+    mcp_connections.start_health_checks()
     print(" Persistent session and runner ready.")
 
 @app.on_event("shutdown")
 async def shutdown_event():
-    global global_session
-    if global_session:
-        await global_session.close()
-        print(" MCP session closed.")
+    await mcp_connections.close()
+    print(" MCP connections closed.")
+    if global_runner and hasattr(global_runner.session_service, "close"):
+        global_runner.session_service.close()
+        print(" Session storage closed.")
 
 # Run the query (for testing when running directly)
 if __name__ == "__main__":
@@ -8,8 +8,6 @@ from google.cloud import logging as google_cloud_logging
 from google.adk.tools import agent_tool
 from google.genai import types
 
-from google.adk.tools.mcp_tool.mcp_toolset import MCPToolset
-from google.adk.tools.mcp_tool.mcp_session_manager import StreamableHTTPConnectionParams
 
 # Import other agents using relative imports since we're inside the Agents folder
 import sys
@@ -19,6 +17,8 @@ from test_generator_agent import test_generator_agent
 from migrate_testcase_agent import migrate_testcase_agent
 from enhance_testcase_agent import enhance_testcase_agent
 from requirement_reviewer_agent import requirement_reviewer_agent
+from session_compaction import fetch_requirement_blob
+from mcp_connections import mcp_connections
 
 
 # Load environment variables from .env file in root directory
@@ -31,19 +31,9 @@ os.environ.setdefault("GOOGLE_CLOUD_PROJECT", "gen-lang-client-0182599221")
 os.environ.setdefault("GOOGLE_CLOUD_LOCATION", "global")
 os.environ.setdefault("GOOGLE_GENAI_USE_VERTEXAI", "True")
 
-JIRA_MCP_URL = os.getenv('JIRA_MCP_URL', 'http://localhost:8085/mcp')
-FIRESTORE_MCP_URL= os.getenv('FIRESTORE_MCP_URL', 'http://localhost:8084/mcp')
-
-FireStoreMCP_Tool = MCPToolset(
-                                connection_params=StreamableHTTPConnectionParams(
-                                    url=FIRESTORE_MCP_URL,
-                                ),
-                              )
-JiraMCP_Tool = MCPToolset(
-                              connection_params=StreamableHTTPConnectionParams(
-                                  url=JIRA_MCP_URL,
-                              ),
-                            )
+# One shared, health-checked MCP connection per server for all agents
+FireStoreMCP_Tool = mcp_connections.get_toolset("firestore")
+JiraMCP_Tool = mcp_connections.get_toolset("jira")
 
 logging_client = google_cloud_logging.Client()
 logger = logging_client.logger("master-agent")
@@ -384,6 +374,6 @@ SECURITY & PRIVACY
                 enhance_testcase_agent,
                 migrate_testcase_agent
     ],
-    tools=[FireStoreMCP_Tool,JiraMCP_Tool]  
+    tools=[FireStoreMCP_Tool,JiraMCP_Tool,fetch_requirement_blob]  
 )
 
@@ -0,0 +1,321 @@
+"""
+Process-wide MCP connection manager.
+
+Every agent module used to build its own `MCPToolset` for the Firestore and
+Jira MCP servers (with slightly different default URLs), so each opened its
+own streamable-HTTP session. Here one toolset per server is shared by all
+agents. Its session manager pools MCP client sessions (one per distinct set
+of request headers). On top of that the manager provides:
+
+- health checks (MCP ping) on demand and on a background interval,
+- automatic reconnect: when a call fails because the server dropped the
+  session ("Session terminated") or the transport closed, pooled sessions are
+  discarded and the call is retried once on a fresh session,
+- per-tool call counts, errors, reconnects and latency percentiles.
+"""
+
+import asyncio
+import json
+import os
+import time
+from collections import deque
+from typing import Any, Dict, List, Optional
+
+import anyio
+import httpx
+from google.adk.agents.readonly_context import ReadonlyContext
+from google.adk.tools.base_tool import BaseTool
+from google.adk.tools.mcp_tool.mcp_session_manager import StreamableHTTPConnectionParams
+from google.adk.tools.mcp_tool.mcp_tool import McpTool
+from google.adk.tools.mcp_tool.mcp_toolset import McpToolset
+from mcp.shared.exceptions import McpError
+
+import metrics
+import logs
+import tracing
+
+mcp_log = logs.get_logger("mcp")
+
+DEFAULT_URLS = {
+    "firestore": "http://localhost:8084/mcp",
+    "jira": "http://localhost:8085/mcp",
+}
+
+URL_ENV_VARS = {
+    "firestore": "FIRESTORE_MCP_URL",
+    "jira": "JIRA_MCP_URL",
+}
+
+
+def normalize_mcp_url(url: str) -> str:
+    """Streamable-HTTP MCP servers are mounted at /mcp; accept URLs with or without it."""
+    url = url.rstrip("/")
+    return url if url.endswith("/mcp") else f"{url}/mcp"
+
+
+def is_connection_error(error: BaseException) -> bool:
+    """True for failures that a fresh MCP session can fix."""
+    if isinstance(error, McpError):
+        return "session terminated" in str(error).lower()
+    return isinstance(error, (anyio.ClosedResourceError, anyio.BrokenResourceError,
+                              httpx.TransportError, ConnectionError))
+
+
+class ToolStats:
+    """Call counters and a latency window for one MCP tool."""
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.reconnects = 0
+        self.latencies = deque(maxlen=500)
+
+    def to_dict(self) -> Dict[str, Any]:
+        latencies = sorted(self.latencies)
+
+        def percentile(p: float) -> float:
+            if not latencies:
+                return 0.0
+            index = min(len(latencies) - 1, int(round(p * (len(latencies) - 1))))
+            return round(latencies[index], 3)
+
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "reconnects": self.reconnects,
+            "latency_seconds": {
+                "p50": percentile(0.50),
+                "p95": percentile(0.95),
+                "max": round(latencies[-1], 3) if latencies else 0.0,
+                "avg": round(sum(latencies) / len(latencies), 3) if latencies else 0.0,
+            },
+        }
+
+
+class ManagedMcpTool(McpTool):
+    """MCP tool that records latency, propagates the trace context and reconnects once on a dropped session."""
+
+    def __init__(self, *, connection: "ManagedMcpToolset", **kwargs):
+        super().__init__(**kwargs)
+        self._connection = connection
+
+    async def _call(self, args, tool_context, credential):
+        # Same as McpTool._run_async_impl, plus the W3C trace context in the request _meta
+        headers = await self._get_headers(tool_context, credential)
+        session = await self._mcp_session_manager.create_session(headers=headers)
+        return await session.call_tool(self.name, arguments=args, meta=tracing.inject_meta())
+
+    async def _run_async_impl(self, *, args, tool_context, credential):
+        stats = self._connection.tool_stats(self.name)
+        stats.calls += 1
+        metrics.tool_call_started(self._connection.server_name)
+        started = time.monotonic()
+        failed = False
+        try:
+            try:
+                return await self._call(args, tool_context, credential)
+            except Exception as e:
+                if not is_connection_error(e):
+                    raise
+                mcp_log.warning("MCP connection lost, reconnecting", extra={"server": self._connection.server_name,
+                                                                           "tool": self.name, "error": str(e)})
+                stats.reconnects += 1
+                await self._connection.reconnect()
+                return await self._call(args, tool_context, credential)
+        except Exception:
+            stats.errors += 1
+            failed = True
+            raise
+        finally:
+            stats.latencies.append(time.monotonic() - started)
+            metrics.tool_call_finished(self._connection.server_name, self.name, failed, stats.latencies[-1])
+
+
+class ManagedMcpToolset(McpToolset):
+    """A shared MCP toolset for one server."""
+
+    def __init__(self, server_name: str, url: str, timeout: float):
+        super().__init__(connection_params=StreamableHTTPConnectionParams(url=url, timeout=timeout))
+        self.server_name = server_name
+        self.url = url
+        self.stats: Dict[str, ToolStats] = {}
+        self.reconnects_total = 0
+        self.last_health: Dict[str, Any] = {"healthy": None, "checked_at": None, "error": None}
+
+    def tool_stats(self, tool_name: str) -> ToolStats:
+        if tool_name not in self.stats:
+            self.stats[tool_name] = ToolStats()
+        return self.stats[tool_name]
+
+    async def reconnect(self) -> None:
+        """Drop every pooled session; the next call opens a new one."""
+        self.reconnects_total += 1
+        await self._mcp_session_manager.close()
+
+    async def _list_tools(self):
+        session = await self._mcp_session_manager.create_session()
+        return await session.list_tools()
+
+    async def get_tools(self, readonly_context: Optional[ReadonlyContext] = None) -> List[BaseTool]:
+        try:
+            tools_response = await self._list_tools()
+        except Exception as e:
+            if not is_connection_error(e):
+                raise
+            mcp_log.warning("MCP connection lost while listing tools, reconnecting", extra={"server": self.server_name,
+                                                                                         "error": str(e)})
+            await self.reconnect()
+            tools_response = await self._list_tools()
+
+        tools = []
+        for tool in tools_response.tools:
+            managed_tool = ManagedMcpTool(
+                connection=self,
+                mcp_tool=tool,
+                mcp_session_manager=self._mcp_session_manager,
+                auth_scheme=self._auth_scheme,
+                auth_credential=self._auth_credential,
+            )
+            if self._is_tool_selected(managed_tool, readonly_context):
+                tools.append(managed_tool)
+        return tools
+
+    async def call_tool(self, tool_name: str, arguments: Dict[str, Any]) -> Any:
+        """Call an MCP tool directly (outside an agent) and decode its JSON result."""
+        with tracing.span(f"MCP {self.server_name} {tool_name}", "client",
+                          **{"mcp.server": self.server_name, "mcp.tool.name": tool_name}):
+            return await self._call_tool(tool_name, arguments)
+
+    async def _call_tool(self, tool_name: str, arguments: Dict[str, Any]) -> Any:
+        stats = self.tool_stats(tool_name)
+        stats.calls += 1
+        metrics.tool_call_started(self.server_name)
+        started = time.monotonic()
+        failed = False
+        try:
+            try:
+                session = await self._mcp_session_manager.create_session()
+                result = await session.call_tool(tool_name, arguments=arguments, meta=tracing.inject_meta())
+            except Exception as e:
+                if not is_connection_error(e):
+                    raise
+                mcp_log.warning("MCP connection lost, reconnecting", extra={"server": self.server_name, "tool": tool_name,
+                                                                           "error": str(e)})
+                stats.reconnects += 1
+                await self.reconnect()
+                session = await self._mcp_session_manager.create_session()
+                result = await session.call_tool(tool_name, arguments=arguments, meta=tracing.inject_meta())
+
+            text = "".join(getattr(item, "text", "") or "" for item in result.content)
+            if result.isError:
+                raise RuntimeError(f"MCP tool {tool_name} failed: {text}")
+            if result.structuredContent is not None:
+                content = result.structuredContent
+                # FastMCP wraps non-object return values as {"result": ...}
+                return content.get("result", content) if set(content) == {"result"} else content
+            try:
+                return json.loads(text)
+            except ValueError:
+                return text
+        except Exception:
+            stats.errors += 1
+            failed = True
+            raise
+        finally:
+            stats.latencies.append(time.monotonic() - started)
+            metrics.tool_call_finished(self.server_name, tool_name, failed, stats.latencies[-1])
+
+    async def _ping(self) -> None:
+        session = await self._mcp_session_manager.create_session()
+        await session.send_ping()
+
+    async def _ping_isolated(self, timeout: float) -> Optional[str]:
+        """Ping in a separate task and return an error message, or None when healthy.
+
+        When the server is unreachable the MCP client cancels the task that
+        opened the session, so the ping must not run in the caller's task.
+        """
+        task = asyncio.create_task(self._ping())
+        done, _ = await asyncio.wait({task}, timeout=timeout)
+        if not done:
+            task.cancel()
+            return f"No response within {timeout:.0f}s"
+        if task.cancelled():
+            return "Connection cancelled (server unreachable)"
+        error = task.exception()
+        return None if error is None else (str(error) or type(error).__name__)
+
+    async def health_check(self, timeout: float = 10.0) -> Dict[str, Any]:
+        """Ping the server, reconnecting once if the pooled session is dead."""
+        started = time.monotonic()
+        error = await self._ping_isolated(timeout)
+        if error is not None:
+            await self.reconnect()
+            error = await self._ping_isolated(timeout)
+        self.last_health = {
+            "healthy": error is None,
+            "checked_at": time.time(),
+            "latency_seconds": round(time.monotonic() - started, 3),
+            "error": error,
+        }
+        return self.last_health
+
+
+class MCPConnectionManager:
+    """Owns one shared toolset per MCP server for the whole process."""
+
+    def __init__(self):
+        self.timeout = float(os.getenv("MCP_CONNECT_TIMEOUT", "30"))
+        self.health_check_interval = float(os.getenv("MCP_HEALTH_CHECK_INTERVAL", "60"))
+        self._toolsets: Dict[str, ManagedMcpToolset] = {}
+        self._health_task: Optional[asyncio.Task] = None
+
+    def get_toolset(self, server_name: str) -> ManagedMcpToolset:
+        """Return the shared toolset for "firestore" or "jira"."""
+        if server_name not in self._toolsets:
+            url = normalize_mcp_url(os.getenv(URL_ENV_VARS[server_name], DEFAULT_URLS[server_name]))
+            self._toolsets[server_name] = ManagedMcpToolset(server_name, url, self.timeout)
+        return self._toolsets[server_name]
+
+    async def health_check(self) -> Dict[str, Any]:
+        results = await asyncio.gather(*[toolset.health_check() for toolset in self._toolsets.values()])
+        return {
+            name: {"url": toolset.url, **result}
+            for (name, toolset), result in zip(self._toolsets.items(), results)
+        }
+
+    async def _health_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.health_check_interval)
+            try:
+                results = await self.health_check()
+                unhealthy = [name for name, result in results.items() if not result["healthy"]]
+                if unhealthy:
+                    mcp_log.warning("MCP health check failed", extra={"servers": unhealthy})
+            except Exception as e:
+                mcp_log.warning("MCP health check error", extra={"error": str(e)})
+
+    def start_health_checks(self) -> None:
+        if self.health_check_interval > 0 and (self._health_task is None or self._health_task.done()):
+            self._health_task = asyncio.create_task(self._health_loop())
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            name: {
+                "url": toolset.url,
+                "reconnects_total": toolset.reconnects_total,
+                "last_health": toolset.last_health,
+                "tools": {tool_name: stats.to_dict() for tool_name, stats in sorted(toolset.stats.items())},
+            }
+            for name, toolset in self._toolsets.items()
+        }
+
+    async def close(self) -> None:
+        if self._health_task:
+            self._health_task.cancel()
+        for toolset in self._toolsets.values():
+            await toolset.close()
+
+
+# Create a singleton instance
+mcp_connections = MCPConnectionManager()
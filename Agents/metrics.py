@@ -0,0 +1,142 @@
+"""
+Prometheus metrics for the Agents API.
+
+GET /metrics exposes:
+
+- agents_http_request_duration_seconds{method,route,status}: latency per route
+  template, and agents_http_requests_in_flight{method},
+- agents_run_duration_seconds{run,stage,outcome}: agent runs by stage, where
+  `run` is query, generate_parallel or push and `stage` is "total", the ADK
+  agent that produced the events (query), the pipeline agent or "branch"
+  (generate_parallel), or the Jira wave / Firestore write (push),
+- agents_runs_in_flight{run,stage},
+- agents_mcp_tool_calls_total{server,tool,outcome},
+  agents_mcp_tool_call_duration_seconds{server,tool} and
+  agents_mcp_tool_calls_in_flight{server},
+- agents_llm_tokens_total{agent,kind}: prompt and completion tokens of /query
+  runs per agent, from the ADK events' usage metadata,
+- agents_admission_active_runs and agents_admission_queue_depth.
+
+Metrics are optional: without prometheus_client, or with METRICS_ENABLED=false,
+every helper is a no-op and /metrics is not registered.
+"""
+
+import time
+from contextlib import contextmanager
+from typing import Callable, Iterator
+
+from medassure_telemetry import metrics as shared_metrics
+from medassure_telemetry.metrics import METRICS_ENABLED
+
+if METRICS_ENABLED:
+    from prometheus_client import Counter, Gauge, Histogram
+
+HTTP_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+RUN_BUCKETS = (0.5, 1, 2.5, 5, 10, 20, 30, 60, 120, 300, 600, 1200)
+TOOL_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+if METRICS_ENABLED:
+    HTTP_DURATION = Histogram("agents_http_request_duration_seconds", "HTTP request latency",
+                              ["method", "route", "status"], buckets=HTTP_BUCKETS)
+    HTTP_IN_FLIGHT = Gauge("agents_http_requests_in_flight", "HTTP requests being handled", ["method"])
+    RUN_DURATION = Histogram("agents_run_duration_seconds", "Agent run duration by stage",
+                             ["run", "stage", "outcome"], buckets=RUN_BUCKETS)
+    RUNS_IN_FLIGHT = Gauge("agents_runs_in_flight", "Agent run stages executing", ["run", "stage"])
+    TOOL_CALLS = Counter("agents_mcp_tool_calls_total", "MCP tool calls", ["server", "tool", "outcome"])
+    TOOL_DURATION = Histogram("agents_mcp_tool_call_duration_seconds", "MCP tool call latency",
+                              ["server", "tool"], buckets=TOOL_BUCKETS)
+    TOOLS_IN_FLIGHT = Gauge("agents_mcp_tool_calls_in_flight", "MCP tool calls awaiting a result", ["server"])
+    LLM_TOKENS = Counter("agents_llm_tokens_total", "LLM tokens used by agent runs", ["agent", "kind"])
+
+
+@contextmanager
+def stage_timer(run: str, stage: str) -> Iterator[None]:
+    """Time a run stage; an exception leaving the block records outcome "error"."""
+    if not METRICS_ENABLED:
+        yield
+        return
+    RUNS_IN_FLIGHT.labels(run, stage).inc()
+    started = time.perf_counter()
+    outcome = "error"
+    try:
+        yield
+        outcome = "success"
+    finally:
+        RUNS_IN_FLIGHT.labels(run, stage).dec()
+        RUN_DURATION.labels(run, stage, outcome).observe(time.perf_counter() - started)
+
+
+def observe_stage(run: str, stage: str, seconds: float, outcome: str = "success") -> None:
+    """Record a stage that was timed by the caller."""
+    if METRICS_ENABLED:
+        RUN_DURATION.labels(run, stage, outcome).observe(seconds)
+
+
+def tool_call_started(server: str) -> None:
+    if METRICS_ENABLED:
+        TOOLS_IN_FLIGHT.labels(server).inc()
+
+
+def tool_call_finished(server: str, tool: str, failed: bool, seconds: float) -> None:
+    if METRICS_ENABLED:
+        TOOLS_IN_FLIGHT.labels(server).dec()
+        TOOL_CALLS.labels(server, tool, "error" if failed else "success").inc()
+        TOOL_DURATION.labels(server, tool).observe(seconds)
+
+
+def record_tokens(agent: str, prompt: int, completion: int) -> None:
+    if METRICS_ENABLED:
+        LLM_TOKENS.labels(agent, "prompt").inc(prompt)
+        LLM_TOKENS.labels(agent, "completion").inc(completion)
+
+
+def register_gauge(name: str, documentation: str, read: Callable[[], float]) -> None:
+    """Expose a value read at scrape time, e.g. the admission queue depth."""
+    if METRICS_ENABLED:
+        Gauge(name, documentation).set_function(read)
+
+
+class HttpMetricsMiddleware:
+    """ASGI middleware recording latency per route template and requests in flight."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = {"code": 500}
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        method = scope["method"]
+        HTTP_IN_FLIGHT.labels(method).inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            HTTP_IN_FLIGHT.labels(method).dec()
+            # The router stores the matched route in the scope; unmatched paths share one label
+            route = getattr(scope.get("route"), "path", "unmatched")
+            HTTP_DURATION.labels(method, route, str(status["code"])).observe(time.perf_counter() - started)
+
+
+def install(app) -> None:
+    """Add the HTTP middleware and GET /metrics to a FastAPI app."""
+    if not METRICS_ENABLED:
+        shared_metrics.report_disabled()
+        return
+
+    from fastapi import Response
+
+    app.add_middleware(HttpMetricsMiddleware)
+
+    @app.get("/metrics", include_in_schema=False)
+    async def prometheus_metrics():
+        body, content_type = shared_metrics.exposition()
+        return Response(body, media_type=content_type)
@@ -0,0 +1,354 @@
+"""
+Parallel fan-out mode for test case generation.
+
+`test_generator_agent` produces every epic, feature, use case and test case in
+a single LLM response, and the `test_generator_agent1` SequentialAgent chain is
+strictly serial. This module keeps the same four stages but splits the work:
+
+1. planner_agent and compliance_agent run once over the whole specification.
+2. The compliance-validated plan is split into branches (one per epic, or one
+   per feature).
+3. test_engineer_agent -> reviewer_agent run for every branch concurrently,
+   bounded by a semaphore.
+4. Branch outputs are merged back in plan order, test case IDs are renumbered
+   and counts recomputed, so the result does not depend on completion order.
+
+The merged document uses the same JSON shape as `test_generator_agent`, so the
+existing Jira/Firestore push flow consumes it unchanged.
+
+With TEST_GENERATION_STRUCTURED_OUTPUT=true every stage runs with a response
+schema (see structured_output.py) and streams its answer; reviewed epics are
+reported through `on_epic` as soon as they close, and malformed JSON is
+repaired locally before falling back to a retry.
+"""
+
+import asyncio
+import copy
+import json
+import os
+import re
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from google.adk.agents.run_config import RunConfig, StreamingMode
+from google.adk.runners import InMemoryRunner
+from google.genai.types import Content, Part
+
+from json_extraction import extract_json
+import logs
+import metrics
+from structured_output import STAGE_SCHEMAS, IncrementalEpicParser, repair_json, validate_stage_output
+from test_generator_agent import planner_agent, compliance_agent, test_engineer_agent, reviewer_agent
+
+generation_log = logs.get_logger("generation")
+
+APP_NAME = "parallel_test_generation"
+USER_ID = "test_generation"
+
+SPLIT_BY_EPIC = "epic"
+SPLIT_BY_FEATURE = "feature"
+
+JIRA_PLACEHOLDERS = {
+    "jira_issue_id": None,
+    "jira_issue_key": None,
+    "jira_issue_url": None,
+    "jira_status": "Not Pushed",
+}
+
+
+def _standalone(agent, structured: bool = False):
+    """Clone a pipeline stage so it can run as the root agent of its own Runner."""
+    update = {"disallow_transfer_to_parent": True, "disallow_transfer_to_peers": True}
+    if structured:
+        update["output_schema"] = STAGE_SCHEMAS[agent.name]
+    return agent.clone(update=update)
+
+
+def _parse_project_fields(instruction: str) -> Dict[str, Optional[str]]:
+    """Pick the project id/name out of the Frontend's generation instruction."""
+    project_id = re.search(r"FIRESTORE_PROJECT_ID\s*:\s*([^,\s]+)", instruction or "")
+    project_name = re.search(r"Project Name\s*:\s*([^,]+)", instruction or "")
+    return {
+        "project_id": project_id.group(1).strip() if project_id else None,
+        "project_name": project_name.group(1).strip() if project_name else None,
+    }
+
+
+class ParallelTestGenerator:
+    """Runs the planner/compliance stages once and fans out test engineering and review."""
+
+    def __init__(self):
+        self.max_parallel = max(1, int(os.getenv("TEST_GENERATION_MAX_PARALLEL_BRANCHES", "4")))
+        self.split_by = os.getenv("TEST_GENERATION_SPLIT_BY", SPLIT_BY_EPIC).lower()
+        self.retries = max(0, int(os.getenv("TEST_GENERATION_BRANCH_RETRIES", "1")))
+        self.branch_context_chars = int(os.getenv("TEST_GENERATION_BRANCH_CONTEXT_CHARS", "20000"))
+        self.structured = os.getenv("TEST_GENERATION_STRUCTURED_OUTPUT", "false").lower() == "true"
+        self.repaired_total = 0
+
+        self.planner = _standalone(planner_agent, self.structured)
+        self.compliance = _standalone(compliance_agent, self.structured)
+        self.test_engineer = _standalone(test_engineer_agent, self.structured)
+        self.reviewer = _standalone(reviewer_agent, self.structured)
+
+    async def _run_agent(self, agent, message: str, on_epic: Optional[Callable] = None) -> str:
+        """Run a single agent in a throwaway session and return its final text.
+
+        In structured mode the response is streamed and epics are passed to
+        `on_epic` as soon as they are complete.
+        """
+        runner = InMemoryRunner(agent=agent, app_name=APP_NAME)
+        session = await runner.session_service.create_session(app_name=APP_NAME, user_id=USER_ID)
+        content = Content(role="user", parts=[Part(text=message)])
+        run_config = RunConfig(streaming_mode=StreamingMode.SSE) if self.structured else RunConfig()
+        parser = IncrementalEpicParser() if on_epic else None
+
+        final_text = ""
+        async for event in runner.run_async(user_id=USER_ID, session_id=session.id, new_message=content,
+                                            run_config=run_config):
+            if not event.content or not event.content.parts:
+                continue
+            text = "".join(part.text or "" for part in event.content.parts)
+            if event.partial:
+                if parser:
+                    for epic in parser.feed(text):
+                        await on_epic(epic)
+            elif event.is_final_response():
+                final_text = text
+
+        if parser and not parser.text and final_text:
+            # The model did not stream; report the epics from the complete answer
+            for epic in parser.feed(final_text):
+                await on_epic(epic)
+        return final_text
+
+    async def _run_json(self, agent, message: str, on_epic: Optional[Callable] = None) -> Dict[str, Any]:
+        """Run an agent and decode its JSON answer.
+
+        Malformed JSON is repaired locally; the agent is only asked again when
+        nothing can be salvaged. Epics streamed by a failed attempt are not
+        passed to `on_epic` again by the next one.
+        """
+        emit = None
+        if on_epic:
+            emitted = set()
+
+            async def emit(epic: Dict[str, Any]) -> None:
+                key = epic.get("epic_id") or json.dumps(epic, sort_keys=True, default=str)
+                if key not in emitted:
+                    emitted.add(key)
+                    await on_epic(epic)
+
+        with metrics.stage_timer("generate_parallel", agent.name):
+            for attempt in range(self.retries + 1):
+                text = await self._run_agent(agent, message, emit)
+                data = extract_json(text)
+                if data is None:
+                    data = repair_json(text)
+                    if isinstance(data, dict):
+                        self.repaired_total += 1
+                        generation_log.debug("Repaired malformed JSON", extra={"agent": agent.name})
+                if isinstance(data, dict):
+                    return validate_stage_output(agent.name, data) if self.structured else data
+                generation_log.warning("Agent returned no JSON object", extra={"agent": agent.name, "attempt": attempt + 1})
+            raise ValueError(f"{agent.name} did not return a JSON object")
+
+    def _split(self, epics: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Split the validated plan into independent branches, in plan order."""
+        branches = []
+        for epic_index, epic in enumerate(epics):
+            features = epic.get("features") or []
+            if self.split_by == SPLIT_BY_FEATURE and len(features) > 1:
+                for feature in features:
+                    subtree = {key: value for key, value in epic.items() if key != "features"}
+                    subtree["features"] = [feature]
+                    branches.append({"epic_index": epic_index, "epic": subtree})
+            else:
+                branches.append({"epic_index": epic_index, "epic": epic})
+        return branches
+
+    async def _run_branch(self, semaphore: asyncio.Semaphore, index: int, total: int,
+                          branch: Dict[str, Any], context: str, instruction: str,
+                          on_epic: Optional[Callable] = None) -> Dict[str, Any]:
+        """Run test engineering and review for one branch under the concurrency cap."""
+        async with semaphore:
+            started = time.monotonic()
+            branch_json = json.dumps({"epics": [branch["epic"]]}, indent=2)
+            engineer_message = f"""
+You are processing branch {index + 1} of {total} of a larger test plan. Generate test cases ONLY for
+the compliance-validated items below. Keep every epic_id, feature_id and use_case_id unchanged and
+return a single JSON object in your OUTPUT FORMAT.
+
+User instruction: {instruction}
+
+Requirement context (excerpt):
+{context[:self.branch_context_chars]}
+
+Compliance-validated branch:
+{branch_json}
+"""
+            result: Dict[str, Any] = {"index": index, "epic_index": branch["epic_index"], "error": None}
+            try:
+                engineered = await self._run_json(self.test_engineer, engineer_message)
+                reviewer_message = f"""
+Review the generated use cases and test cases below (branch {index + 1} of {total}). Keep all IDs
+unchanged and return a single JSON object in your OUTPUT FORMAT.
+
+{json.dumps(engineered, indent=2)}
+"""
+                try:
+                    output = await self._run_json(self.reviewer, reviewer_message, on_epic)
+                except Exception as e:
+                    # An unreviewed branch is still useful; the reviewer fields stay empty
+                    generation_log.warning("Review failed, keeping test engineer output", extra={"branch": index + 1, "error": str(e)})
+                    output = engineered
+                result["epics"] = output.get("epics") or []
+            except Exception as e:
+                generation_log.error("Branch failed", extra={"branch": index + 1, "error": str(e)})
+                result["epics"] = []
+                result["error"] = str(e)
+
+            result["duration_seconds"] = round(time.monotonic() - started, 3)
+            metrics.observe_stage("generate_parallel", "branch", result["duration_seconds"],
+                                  "error" if result["error"] else "success")
+            generation_log.info("Branch finished", extra={"branch": index + 1, "branches": total,
+                                                         "duration_seconds": result["duration_seconds"]})
+            return result
+
+    @staticmethod
+    def _merge(plan_epics: List[Dict[str, Any]], branch_results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Merge branch outputs back into plan order and renumber test cases."""
+        merged: Dict[int, Dict[str, Any]] = {}
+        for result in sorted(branch_results, key=lambda item: item["index"]):
+            epic_index = result["epic_index"]
+            if epic_index not in merged:
+                base = {key: value for key, value in plan_epics[epic_index].items() if key != "features"}
+                base["features"] = []
+                merged[epic_index] = base
+            target = merged[epic_index]
+            for output_epic in result["epics"]:
+                for key, value in output_epic.items():
+                    if key != "features":
+                        target.setdefault(key, value)
+                target["features"].extend(output_epic.get("features") or [])
+
+        epics = [copy.deepcopy(merged[index]) for index in sorted(merged)]
+        test_case_number = 0
+        for epic in epics:
+            for key, value in JIRA_PLACEHOLDERS.items():
+                epic.setdefault(key, value)
+            for feature in epic["features"]:
+                for key, value in JIRA_PLACEHOLDERS.items():
+                    feature.setdefault(key, value)
+                for use_case in feature.get("use_cases") or []:
+                    for key, value in JIRA_PLACEHOLDERS.items():
+                        use_case.setdefault(key, value)
+                    for test_case in use_case.get("test_cases") or []:
+                        # Branches number their test cases independently; make IDs unique
+                        test_case_number += 1
+                        test_case["test_case_id"] = f"TC{test_case_number:03d}"
+                        for key, value in JIRA_PLACEHOLDERS.items():
+                            test_case.setdefault(key, value)
+        return epics
+
+    async def generate(self, context: str, instruction: str,
+                       project_name: Optional[str] = None, project_id: Optional[str] = None,
+                       on_epic: Optional[Callable] = None) -> Dict[str, Any]:
+        """Generate the full test hierarchy for `context` using per-branch fan-out.
+
+        `on_epic`, an async callable, receives each reviewed epic as soon as it
+        is complete (before branches are merged and test cases renumbered).
+        """
+        started = time.monotonic()
+        repaired_before = self.repaired_total
+        streamed = {"epics": 0, "first_epic_seconds": None}
+
+        async def epic_ready(epic: Dict[str, Any]) -> None:
+            streamed["epics"] += 1
+            if streamed["first_epic_seconds"] is None:
+                streamed["first_epic_seconds"] = round(time.monotonic() - started, 3)
+            generation_log.info("Epic ready", extra={"epic_id": epic.get("epic_id"),
+                                                     "seconds": round(time.monotonic() - started, 1)})
+            if on_epic:
+                await on_epic(epic)
+        project = _parse_project_fields(instruction)
+        project_name = project_name or project["project_name"]
+        project_id = project_id or project["project_id"]
+
+        generation_log.info("Running planner_agent")
+        plan = await self._run_json(self.planner, f"""
+User instruction: {instruction}
+
+Validated and approved requirement context:
+{context}
+""")
+        plan_epics = plan.get("epics") or []
+        if not plan_epics:
+            raise ValueError("planner_agent returned no epics")
+
+        generation_log.info("Running compliance_agent", extra={"epics": len(plan_epics)})
+        try:
+            compliance = await self._run_json(self.compliance, json.dumps(plan, indent=2))
+            validated_epics = compliance.get("validated_epics") or plan_epics
+        except Exception as e:
+            generation_log.warning("Compliance stage failed, continuing with planner output", extra={"error": str(e)})
+            compliance = {}
+            validated_epics = plan_epics
+        planning_seconds = time.monotonic() - started
+
+        branches = self._split(validated_epics)
+        semaphore = asyncio.Semaphore(self.max_parallel)
+        generation_log.info("Fanning out branches", extra={"branches": len(branches), "split_by": self.split_by,
+                                                           "max_parallel": self.max_parallel})
+        branch_results = await asyncio.gather(*[
+            self._run_branch(semaphore, index, len(branches), branch, context, instruction, epic_ready)
+            for index, branch in enumerate(branches)
+        ])
+
+        failed = [result for result in branch_results if result["error"]]
+        if len(failed) == len(branch_results):
+            raise RuntimeError(f"All {len(branches)} generation branches failed: {failed[0]['error']}")
+
+        epics = self._merge(validated_epics, branch_results)
+        features = [feature for epic in epics for feature in epic["features"]]
+        use_cases = [use_case for feature in features for use_case in feature.get("use_cases") or []]
+        test_cases = [test_case for use_case in use_cases for test_case in use_case.get("test_cases") or []]
+        branch_seconds = sum(result["duration_seconds"] for result in branch_results)
+
+        return {
+            "project_name": project_name,
+            "project_id": project_id,
+            "epics": epics,
+            "epics_generated": len(epics),
+            "features_generated": len(features),
+            "use_cases_generated": len(use_cases),
+            "test_cases_generated": len(test_cases),
+            "plan_summary": plan.get("plan_summary"),
+            "compliance_summary": compliance.get("compliance_summary"),
+            "stored_in_firestore": False,
+            "pushed_to_jira": False,
+            "next_action": "push all generated test cases (epics to test cases) into Jira and Firestore through master agent.",
+            "push_targets": ["Jira", "Firestore"],
+            "status": "generation_completed" if not failed else "generation_partial",
+            "generation_mode": "parallel",
+            "generation_stats": {
+                "split_by": self.split_by,
+                "branches": len(branches),
+                "failed_branches": [
+                    {"branch": result["index"] + 1, "epic_id": validated_epics[result["epic_index"]].get("epic_id"),
+                     "error": result["error"]}
+                    for result in failed
+                ],
+                "max_parallel": self.max_parallel,
+                "structured_output": self.structured,
+                "repaired_responses": self.repaired_total - repaired_before,
+                "streamed_epics": streamed["epics"],
+                "first_epic_seconds": streamed["first_epic_seconds"],
+                "planning_seconds": round(planning_seconds, 3),
+                "branch_seconds_total": round(branch_seconds, 3),
+                "wall_seconds": round(time.monotonic() - started, 3),
+            },
+        }
+
+
+# Create a singleton instance
+parallel_test_generator = ParallelTestGenerator()
@@ -0,0 +1,331 @@
+"""
+Deterministic push of generated test artifacts to Jira and Firestore.
+
+The original push stage sent a long prompt asking the master agent to
+rebuild the hierarchy as JSON and call `batch_create_issues` and then
+`bulk_write_epics_structure` itself. That costs a full model round trip and
+the model can drop or invent items. This pipeline does the same work in
+code:
+
+1. Split epics -> features -> use cases -> test cases into one wave per
+   level, remembering where each artifact came from.
+2. Create each wave through the Jira MCP `batch_create_issues` tool, with
+   all of its chunks in flight at once. Every issue of a wave references its
+   parent's key from the previous wave (as Jira parent or as an issue link),
+   so push latency grows with the depth of the hierarchy (four waves), not
+   with the number of artifacts.
+   An artifact whose parent could not be pushed is not created (it would
+   end up detached from its parent) and is marked failed. Issues pushed
+   earlier whose link to their parent is missing are sent again, to be
+   linked only.
+3. Copy the returned issue id/key/url back onto each artifact.
+4. Write the enriched hierarchy with the Firestore MCP
+   `bulk_write_epics_structure` tool.
+"""
+
+import asyncio
+import copy
+import os
+import re
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from json_extraction import extract_json
+import logs
+import metrics
+from mcp_connections import mcp_connections
+
+push_log = logs.get_logger("push")
+
+LEVELS = ("epic", "feature", "use_case", "test_case")
+
+STATUS_PUSHED = "Pushed"
+STATUS_FAILED = "Push Failed"
+PARENT_NOT_PUSHED = "parent not pushed"
+
+
+def _issue_types() -> Dict[str, str]:
+    names = os.getenv("PUSH_JIRA_ISSUE_TYPES", "Epic,Story,Story,Task").split(",")
+    names = [name.strip() for name in names] + ["Task"] * (len(LEVELS) - len(names))
+    return dict(zip(LEVELS, names))
+
+
+def _parent_links() -> Dict[str, str]:
+    """How features, use cases and test cases attach to their parent issue: parent, link or none."""
+    modes = os.getenv("PUSH_JIRA_PARENT_LINKS", "parent,link,link").split(",")
+    modes = [mode.strip().lower() for mode in modes] + ["none"] * (len(LEVELS) - 1 - len(modes))
+    return dict(zip(LEVELS[1:], modes))
+
+
+def _bullets(items: Any) -> str:
+    if not items:
+        return ""
+    if isinstance(items, str):
+        return items
+    return "\n".join(f"- {item}" for item in items)
+
+
+def _summary(level: str, item: Dict[str, Any]) -> str:
+    ref = item.get(f"{level}_id") or ""
+    title = (
+        item.get("epic_name") or item.get("feature_name") or item.get("test_case_title")
+        or item.get("title") or ref or level.replace("_", " ").title()
+    )
+    summary = f"[{ref}] {title}" if ref else title
+    # Jira rejects summaries longer than 255 characters
+    return summary[:255]
+
+
+def _description(level: str, item: Dict[str, Any]) -> str:
+    sections = [item.get("description") or ""]
+    if level == "use_case":
+        if item.get("acceptance_criteria"):
+            sections.append("Acceptance criteria:\n" + _bullets(item["acceptance_criteria"]))
+        if item.get("test_scenarios_outline"):
+            sections.append("Test scenarios:\n" + _bullets(item["test_scenarios_outline"]))
+    if level == "test_case":
+        if item.get("preconditions"):
+            sections.append("Preconditions:\n" + _bullets(item["preconditions"]))
+        if item.get("test_steps"):
+            sections.append("Test steps:\n" + _bullets(item["test_steps"]))
+        if item.get("expected_result"):
+            sections.append(f"Expected result: {item['expected_result']}")
+        if item.get("test_type"):
+            sections.append(f"Test type: {item['test_type']}")
+    if item.get("compliance_mapping"):
+        sections.append("Compliance: " + ", ".join(map(str, item["compliance_mapping"])))
+    if item.get("model_explanation"):
+        sections.append(f"Model explanation: {item['model_explanation']}")
+    return "\n\n".join(section for section in sections if section)
+
+
+def flatten_hierarchy(epics: List[Dict[str, Any]]) -> List[Tuple[str, Dict[str, Any]]]:
+    """List every artifact as (level, item) in parent-before-child order."""
+    flat = []
+    for epic in epics:
+        flat.append(("epic", epic))
+        for feature in epic.get("features") or []:
+            flat.append(("feature", feature))
+            for use_case in feature.get("use_cases") or []:
+                flat.append(("use_case", use_case))
+                for test_case in use_case.get("test_cases") or []:
+                    flat.append(("test_case", test_case))
+    return flat
+
+
+def hierarchy_waves(epics: List[Dict[str, Any]]) -> List[List[Tuple[str, Dict[str, Any], Optional[Dict[str, Any]]]]]:
+    """Group artifacts by level as (level, item, parent item), epics first."""
+    waves = {level: [] for level in LEVELS}
+    children = {"epic": "features", "feature": "use_cases", "use_case": "test_cases"}
+    current = [("epic", epic, None) for epic in epics]
+    while current:
+        level = current[0][0]
+        waves[level].extend(current)
+        child_level = LEVELS[LEVELS.index(level) + 1] if level in children else None
+        current = [
+            (child_level, child, item)
+            for _, item, _ in current if child_level
+            for child in item.get(children[level]) or []
+        ]
+    return [waves[level] for level in LEVELS if waves[level]]
+
+
+def find_generated_hierarchy(texts: List[str]) -> Optional[Dict[str, Any]]:
+    """Return the most recent generation output (a JSON object with "epics") from agent texts."""
+    for text in reversed(texts):
+        if '"epics"' not in text:
+            continue
+        data = extract_json(text)
+        if isinstance(data, dict) and isinstance(data.get("epics"), list) and data["epics"]:
+            return data
+    return None
+
+
+def parse_push_targets(instruction: str) -> Dict[str, Optional[str]]:
+    """Pick the Firestore project id and Jira key out of the Frontend's instruction."""
+    project_id = re.search(r"FIRESTORE_PROJECT_ID\s*:\s*([^,\s]+)", instruction or "")
+    jira_key = re.search(r"JIRA_PROJECT_KEY\s*:\s*([^,\s.]+)", instruction or "")
+    return {
+        "project_id": project_id.group(1) if project_id else None,
+        "jira_project_key": jira_key.group(1) if jira_key else None,
+    }
+
+
+class PushPipeline:
+    """Creates Jira issues for a generated hierarchy and bulk-writes it to Firestore."""
+
+    def __init__(self):
+        self.batch_size = max(1, int(os.getenv("PUSH_JIRA_BATCH_SIZE", "50")))
+
+    async def _create_jira_issues(self, issues: List[Dict[str, Any]], jira_project_key: Optional[str], project_id: str):
+        """Create issues in concurrent chunks; returns (created by index, failed by index).
+
+        The Jira MCP remembers issues by (project_id, external_ref), so a
+        retried push gets the existing issues back instead of duplicates.
+        """
+        created: Dict[int, Dict[str, Any]] = {}
+        failed: Dict[int, str] = {}
+        jira = mcp_connections.get_toolset("jira")
+
+        async def create_chunk(start: int) -> None:
+            chunk = issues[start:start + self.batch_size]
+            arguments: Dict[str, Any] = {"jira_issues": chunk, "ref_namespace": project_id}
+            if jira_project_key:
+                arguments["project_key"] = jira_project_key
+            try:
+                result = await jira.call_tool("batch_create_issues", arguments)
+            except Exception as e:
+                for offset in range(len(chunk)):
+                    failed[start + offset] = str(e)
+                return
+
+            for entry in (result or {}).get("created", []):
+                created[start + entry["index"]] = entry
+            for entry in (result or {}).get("failed", []):
+                failed[start + entry["index"]] = entry.get("error", "unknown error")
+
+        # The Jira MCP's scheduler keeps the concurrent chunks within the rate limit
+        await asyncio.gather(*[create_chunk(start) for start in range(0, len(issues), self.batch_size)])
+        return created, failed
+
+    async def push(self, generated: Dict[str, Any], project_id: str, jira_project_key: Optional[str] = None) -> Dict[str, Any]:
+        """Push `generated["epics"]` to Jira, then write the enriched hierarchy to Firestore."""
+        started = time.monotonic()
+        epics = copy.deepcopy(generated.get("epics") or [])
+        flat = flatten_hierarchy(epics)
+        issue_types = _issue_types()
+        parent_links = _parent_links()
+
+        waves = hierarchy_waves(epics)
+        if all(mode == "none" for mode in parent_links.values()):
+            # Nothing waits for a parent key, so everything can go in one wave
+            waves = [[entry for wave in waves for entry in wave]]
+
+        # Only push what is not in Jira yet, so a retried push does not duplicate issues
+        pending_total = sum(1 for _, item in flat if not item.get("jira_issue_key"))
+        push_log.info("Pushing artifacts to Jira", extra={"pending": pending_total, "artifacts": len(flat),
+                                                          "jira_project_key": jira_project_key, "waves": len(waves)})
+
+        created_total = 0
+        failures: List[Dict[str, Any]] = []
+        link_failures: List[Dict[str, Any]] = []
+        wave_timings: List[Dict[str, Any]] = []
+        for wave in waves:
+            wave_started = time.monotonic()
+            pending = []
+            issues = []
+            orphaned = 0
+            for level, item, parent in wave:
+                mode = parent_links.get(level)
+                parent_key = (parent or {}).get("jira_issue_key")
+                if parent is not None and mode in ("parent", "link") and not parent_key:
+                    if not item.get("jira_issue_key"):
+                        item["jira_status"] = STATUS_FAILED
+                        item["jira_error"] = PARENT_NOT_PUSHED
+                        failures.append({"ref": item.get(f"{level}_id"), "error": PARENT_NOT_PUSHED})
+                        orphaned += 1
+                    continue
+                issue = {
+                    "summary": _summary(level, item),
+                    "description": _description(level, item),
+                    "issue_type": issue_types[level],
+                    "external_ref": item.get(f"{level}_id"),
+                }
+                if item.get("jira_issue_key"):
+                    if mode != "link" or item.get("jira_linked_to") == parent_key:
+                        continue
+                    # Pushed before but its link failed: the Jira MCP only links it
+                    issue.update({field: item.get(field) for field in ("jira_issue_id", "jira_issue_key", "jira_issue_url")})
+                if mode == "parent":
+                    issue["parent_key"] = parent_key
+                elif mode == "link":
+                    issue["link_key"] = parent_key
+                pending.append((level, item, parent))
+                issues.append(issue)
+
+            created, failed = await self._create_jira_issues(issues, jira_project_key, project_id) if issues else ({}, {})
+            for index, (level, item, _) in enumerate(pending):
+                if index in created:
+                    entry = created[index]
+                    item["jira_issue_id"] = str(entry.get("jira_issue_id") or "")
+                    item["jira_issue_key"] = entry.get("jira_issue_key")
+                    item["jira_issue_url"] = entry.get("jira_issue_url")
+                    item["jira_status"] = STATUS_PUSHED
+                    item.pop("jira_error", None)
+                    if entry.get("linked_to"):
+                        item["jira_linked_to"] = entry["linked_to"]
+                        item.pop("jira_link_error", None)
+                    if entry.get("link_error"):
+                        item["jira_link_error"] = entry["link_error"]
+                        link_failures.append({"ref": issues[index]["external_ref"], "error": entry["link_error"]})
+                else:
+                    item["jira_status"] = STATUS_FAILED
+                    item["jira_error"] = failed.get(index, "no result returned")
+                    failures.append({"ref": issues[index]["external_ref"], "error": item["jira_error"]})
+
+            created_total += sum(1 for entry in created.values() if not entry.get("existing"))
+            levels = list(dict.fromkeys(level for level, _, _ in wave))
+            wave_failed = len(issues) - len(created) + orphaned
+            wave_link_errors = sum(1 for entry in created.values() if entry.get("link_error"))
+            wave_timings.append({
+                "level": levels[0] if len(levels) == 1 else "all",
+                "issues": len(issues),
+                "created": len(created),
+                "failed": wave_failed,
+                "link_errors": wave_link_errors,
+                "seconds": round(time.monotonic() - wave_started, 3),
+            })
+            metrics.observe_stage("push", f"jira_{wave_timings[-1]['level']}", wave_timings[-1]["seconds"],
+                                  "error" if wave_failed or wave_link_errors else "success")
+            # Prefixed: "created" is a LogRecord attribute
+            push_log.info("Jira wave finished", extra={f"wave_{key}": value for key, value in wave_timings[-1].items()})
+        jira_seconds = time.monotonic() - started
+
+        firestore_started = time.monotonic()
+        try:
+            firestore_result = await mcp_connections.get_toolset("firestore").call_tool(
+                "bulk_write_epics_structure", {"project_id": project_id, "epics": epics}
+            )
+        except Exception as e:
+            firestore_result = {"success": False, "error": str(e)}
+        firestore_seconds = time.monotonic() - firestore_started
+        metrics.observe_stage("push", "firestore", firestore_seconds,
+                              "success" if isinstance(firestore_result, dict) and firestore_result.get("success") else "error")
+
+        counts = {level: 0 for level in LEVELS}
+        for level, _ in flat:
+            counts[level] += 1
+        stored = isinstance(firestore_result, dict) and bool(firestore_result.get("success"))
+
+        complete = stored and not failures and not link_failures
+        return {
+            "success": complete,
+            "project_id": project_id,
+            "jira_project_key": jira_project_key,
+            "epics_pushed": counts["epic"],
+            "features_pushed": counts["feature"],
+            "use_cases_pushed": counts["use_case"],
+            "test_cases_pushed": counts["test_case"],
+            "jira_issues_created": created_total,
+            "jira_issues_failed": len(failures),
+            "jira_issues_already_pushed": len(flat) - pending_total,
+            "jira_failures": failures,
+            "jira_link_failures": link_failures,
+            # Also true when a retry finds every issue already in Jira
+            "pushed_to_jira": not failures and not link_failures,
+            "stored_in_firestore": stored,
+            "firestore_result": firestore_result,
+            "jira_waves": wave_timings,
+            "timings_seconds": {
+                "jira": round(jira_seconds, 3),
+                "firestore": round(firestore_seconds, 3),
+                "total": round(time.monotonic() - started, 3),
+            },
+            "status": "push_completed" if complete else "push_incomplete",
+            # The hierarchy with the Jira keys copied on, so a retried push skips what was created
+            "epics": epics,
+        }
+
+
+# Create a singleton instance
+push_pipeline = PushPipeline()
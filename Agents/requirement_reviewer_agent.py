@@ -6,6 +6,8 @@ from dotenv import load_dotenv
 from google.adk.agents import Agent
 from google.cloud import logging as google_cloud_logging
 
+from session_compaction import fetch_requirement_blob
+
 # Load environment variables from .env file in root directory
 root_dir = Path(__file__).parent.parent
 dotenv_path = root_dir / ".env"
@@ -225,9 +227,6 @@ You may receive:
 - Use healthcare-relevant terminology consistently.
 - Ensure GDPR and regulatory compliance.
 - Keep all responses machine-readable and conversationally clear.
-"""
+""",
+    tools=[fetch_requirement_blob],
 )
-
-
-
-
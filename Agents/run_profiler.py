@@ -0,0 +1,214 @@
+"""
+Timeline profiles of agent runs.
+
+Each /query run gets a `RunProfile` fed with the ADK events of the run. It
+records a timeline of steps:
+
+- model_turn: an LLM response, timed from the previous event of the run to
+  this one, with the prompt / completion / cached token counts from the
+  event's usage metadata,
+- tool_call: from the function call to its function response,
+- transfer: an agent handing the conversation to another agent.
+
+The summary adds up wall time and tokens per agent and per tool, so the
+sub-agent or tool that dominates latency and cost stands out. The last
+RUN_PROFILE_HISTORY profiles are kept in memory and served at
+GET /runs/{run_id}/profile; a one-line summary goes into the run's debug_info.
+"""
+
+import os
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+import metrics
+
+
+class RunProfile:
+    """Timeline of one agent run."""
+
+    def __init__(self, run: str, session_id: Optional[str] = None):
+        self.run_id = uuid.uuid4().hex[:12]
+        self.run = run
+        self.session_id = session_id
+        self.started_at = datetime.now(timezone.utc).isoformat()
+        self.status = "running"
+        self.error: Optional[str] = None
+        self.wall_seconds: Optional[float] = None
+        self.event_count = 0
+        self.steps: List[Dict[str, Any]] = []
+        self._started = time.perf_counter()
+        self._last_event = self._started
+        self._open_tools: Dict[str, Dict[str, Any]] = {}
+
+    def _offset(self, moment: float) -> float:
+        return round(moment - self._started, 3)
+
+    def event(self, event) -> None:
+        """Add an ADK event of the run to the timeline."""
+        self.event_count += 1
+        # Streamed chunks: the final chunk of the response carries the turn
+        if event.partial:
+            return
+        now = time.perf_counter()
+        responses = event.get_function_responses()
+        transfer_to = event.actions.transfer_to_agent if event.actions else None
+
+        if responses:
+            for response in responses:
+                step = self._open_tools.pop(response.id, None)
+                if step is None:
+                    continue
+                result = response.response if isinstance(response.response, dict) else {}
+                step["duration_seconds"] = round(self._offset(now) - step["start"], 3)
+                step["success"] = not (result.get("success") is False or result.get("isError"))
+        elif event.content or event.usage_metadata:
+            usage = event.usage_metadata
+            prompt_tokens = (usage.prompt_token_count or 0) if usage else 0
+            # Thinking tokens are billed as output
+            completion_tokens = ((usage.candidates_token_count or 0) + (usage.thoughts_token_count or 0)) if usage else 0
+            function_calls = event.get_function_calls()
+            self.steps.append({
+                "type": "model_turn",
+                "agent": event.author,
+                "start": self._offset(self._last_event),
+                "duration_seconds": round(now - self._last_event, 3),
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "cached_tokens": (usage.cached_content_token_count or 0) if usage else 0,
+                "function_calls": [call.name for call in function_calls],
+            })
+            metrics.record_tokens(event.author, prompt_tokens, completion_tokens)
+            for call in function_calls:
+                step = {
+                    "type": "tool_call",
+                    "agent": event.author,
+                    "tool": call.name,
+                    "start": self._offset(now),
+                    "duration_seconds": None,
+                    "success": None,
+                }
+                self.steps.append(step)
+                self._open_tools[call.id] = step
+        else:
+            # Nothing produced (e.g. a bare state update): the time counts towards the next turn
+            return
+
+        if transfer_to:
+            self.steps.append({
+                "type": "transfer",
+                "agent": event.author,
+                "to_agent": transfer_to,
+                "start": self._offset(now),
+                "duration_seconds": 0.0,
+            })
+        self._last_event = now
+
+    def finish(self, error: Optional[str] = None) -> None:
+        """Close the run; tool calls still waiting for a response are marked failed."""
+        if self.wall_seconds is not None:
+            return
+        now = time.perf_counter()
+        for step in self._open_tools.values():
+            step["duration_seconds"] = round(self._offset(now) - step["start"], 3)
+            step["success"] = False
+        self._open_tools.clear()
+        self.wall_seconds = self._offset(now)
+        self.status = "error" if error else "completed"
+        self.error = error
+
+    def summary(self) -> Dict[str, Any]:
+        by_agent: Dict[str, Dict[str, Any]] = {}
+        by_tool: Dict[str, Dict[str, Any]] = {}
+        for step in self.steps:
+            agent = by_agent.setdefault(step["agent"], {
+                "model_turns": 0, "model_seconds": 0.0, "prompt_tokens": 0, "completion_tokens": 0,
+                "tool_calls": 0, "tool_seconds": 0.0,
+            })
+            if step["type"] == "model_turn":
+                agent["model_turns"] += 1
+                agent["model_seconds"] += step["duration_seconds"]
+                agent["prompt_tokens"] += step["prompt_tokens"]
+                agent["completion_tokens"] += step["completion_tokens"]
+            elif step["type"] == "tool_call":
+                seconds = step["duration_seconds"] or 0.0
+                agent["tool_calls"] += 1
+                agent["tool_seconds"] += seconds
+                tool = by_tool.setdefault(step["tool"], {"calls": 0, "seconds": 0.0, "errors": 0})
+                tool["calls"] += 1
+                tool["seconds"] += seconds
+                tool["errors"] += step["success"] is False
+        for stats in list(by_agent.values()) + list(by_tool.values()):
+            for key in ("model_seconds", "tool_seconds", "seconds"):
+                if key in stats:
+                    stats[key] = round(stats[key], 3)
+
+        turns = [step for step in self.steps if step["type"] == "model_turn"]
+        timed = [step for step in self.steps if step["duration_seconds"]]
+        slowest = max(timed, key=lambda step: step["duration_seconds"]) if timed else None
+        return {
+            "run_id": self.run_id,
+            "run": self.run,
+            "status": self.status,
+            "started_at": self.started_at,
+            "wall_seconds": self.wall_seconds if self.wall_seconds is not None else self._offset(time.perf_counter()),
+            "events": self.event_count,
+            "model_turns": len(turns),
+            "tool_calls": sum(step["type"] == "tool_call" for step in self.steps),
+            "transfers": sum(step["type"] == "transfer" for step in self.steps),
+            "prompt_tokens": sum(step["prompt_tokens"] for step in turns),
+            "completion_tokens": sum(step["completion_tokens"] for step in turns),
+            "cached_tokens": sum(step["cached_tokens"] for step in turns),
+            "by_agent": by_agent,
+            "by_tool": by_tool,
+            "slowest_step": slowest,
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            **self.summary(),
+            "session_id": self.session_id,
+            "error": self.error,
+            "steps": self.steps,
+        }
+
+    def debug_summary(self) -> str:
+        """One line for debug_info: totals and the agent that took the longest."""
+        summary = self.summary()
+        line = (f"_Run {self.run_id}: {summary['wall_seconds']:.1f}s, {summary['model_turns']} model turns "
+                f"({summary['prompt_tokens']:,} prompt / {summary['completion_tokens']:,} completion tokens), "
+                f"{summary['tool_calls']} tool calls, {summary['transfers']} transfers")
+        if summary["by_agent"]:
+            agent, stats = max(summary["by_agent"].items(),
+                               key=lambda item: item[1]["model_seconds"] + item[1]["tool_seconds"])
+            line += f"; slowest agent {agent} ({stats['model_seconds']:.1f}s model, {stats['tool_seconds']:.1f}s tools)"
+        return line + f". Profile: /runs/{self.run_id}/profile_"
+
+
+class RunProfiler:
+    """Keeps the profiles of the most recent runs."""
+
+    def __init__(self, max_runs: int):
+        self.max_runs = max(1, max_runs)
+        self._profiles: "OrderedDict[str, RunProfile]" = OrderedDict()
+
+    def start(self, run: str, session_id: Optional[str] = None) -> RunProfile:
+        profile = RunProfile(run, session_id)
+        self._profiles[profile.run_id] = profile
+        while len(self._profiles) > self.max_runs:
+            self._profiles.popitem(last=False)
+        return profile
+
+    def get(self, run_id: str) -> Optional[RunProfile]:
+        return self._profiles.get(run_id)
+
+    def recent(self, limit: int = 20) -> List[Dict[str, Any]]:
+        """Summaries of the latest runs, newest first."""
+        profiles = list(self._profiles.values())[-max(0, limit):] if limit > 0 else []
+        return [profile.summary() for profile in reversed(profiles)]
+
+
+# Create a singleton instance
+run_profiler = RunProfiler(max_runs=int(os.getenv("RUN_PROFILE_HISTORY", "100")))
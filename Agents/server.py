@@ -7,9 +7,8 @@ from google.adk.cli.fast_api import get_fast_api_app
 from pydantic import BaseModel
 from typing import Literal
 from google.cloud import logging as google_cloud_logging
-#from tracing import CloudTraceLoggingSpanExporter
-from opentelemetry import trace
-from opentelemetry.sdk.trace import TracerProvider, export
+
+import tracing
 
 
 # Load environment variables from .env file
@@ -36,13 +35,10 @@ else:
         severity="WARNING",
     )
 
-"""provider = TracerProvider()
-processor = export.BatchSpanProcessor(CloudTraceLoggingSpanExporter())
-provider.add_span_processor(processor)
-trace.set_tracer_provider(provider)"""
-
 # Create FastAPI app with appropriate arguments
 app: FastAPI = get_fast_api_app(**app_args)
+# Request spans plus ADK's own spans, exported per TRACING_EXPORTER
+tracing.install(app)
 
 app.title = "master-agent"
 app.description = "API for interacting with the Agent master-agent"
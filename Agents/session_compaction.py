@@ -0,0 +1,396 @@
+"""
+Session history compaction for long clarification loops.
+
+Requirement review and enhancement chats keep appending to one session, and
+every turn resends the whole transcript to the model - including pasted
+requirement documents that can run to megabytes. Once a session's estimated
+token count crosses a threshold, `SessionCompactor` rewrites it:
+
+- Large text parts and tool responses are moved into a blob store and
+  replaced by a short reference with an excerpt. Agents can read the full
+  text on demand with the `fetch_requirement_blob` tool.
+- Turns older than the most recent few are replaced by a single summary
+  event (LLM summary, with an extractive fallback).
+
+The rewritten history is stored as a new session, which becomes the active
+one, so per-turn prompt size stays roughly flat instead of growing with the
+length of the conversation. A session is not compacted while a run is still
+streaming into it (see `track_run`); the old session is kept unless
+SESSION_COMPACTION_DELETE_OLD is set.
+"""
+
+import asyncio
+import copy
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+from google import genai
+from google.adk.events import Event
+from google.adk.sessions import State
+from google.genai.types import Content, Part
+
+import logs
+from sqlite_session_service import _get_store
+
+compaction_log = logs.get_logger("compaction")
+
+BLOB_SCHEMA = """
+CREATE TABLE IF NOT EXISTS session_blobs (
+    id TEXT PRIMARY KEY,
+    text TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+"""
+
+SUMMARY_AUTHOR = "session_compactor"
+
+SUMMARY_PROMPT = """
+You are compacting the conversation history of a healthcare test-generation assistant.
+Summarize the conversation below so the assistant can continue without the original turns.
+Keep: project names and IDs, Jira project keys, uploaded documents and their blob references,
+the requirement review outcome, every open and answered clarification question with its answer,
+approved scope and estimated counts, decisions, and any generated/pushed artifact IDs.
+Drop greetings, repetition and tool-call noise. Use concise bullet points.
+
+CONVERSATION:
+{transcript}
+"""
+
+
+class BlobStore:
+    """Content-addressed store for text moved out of session history.
+
+    The SQLite database is opened on first use, and reads and writes run on a
+    worker thread, so multi-megabyte blobs never block the event loop.
+    """
+
+    def __init__(self, db_path: Optional[str] = None):
+        self.db_path = db_path
+        self._memory: Dict[str, str] = {}
+        self._lock = threading.Lock()
+        self._store = None
+
+    def _sqlite(self):
+        if self._store is None:
+            with self._lock:
+                if self._store is None:
+                    store = _get_store(self.db_path)
+                    store.run_sync(lambda conn: conn.executescript(BLOB_SCHEMA))
+                    self._store = store
+        return self._store
+
+    async def put(self, text: str) -> str:
+        """Store `text` and return its ID; identical text is stored only once."""
+        blob_id = "blob_" + hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
+        if not self.db_path:
+            with self._lock:
+                self._memory[blob_id] = text
+            return blob_id
+        store = await asyncio.to_thread(self._sqlite)
+        await store.run(lambda conn: conn.execute(
+            "INSERT OR IGNORE INTO session_blobs (id, text, created_at) VALUES (?, ?, ?)",
+            (blob_id, text, time.time()),
+        ))
+        return blob_id
+
+    async def get(self, blob_id: str) -> Optional[str]:
+        if not self.db_path:
+            with self._lock:
+                return self._memory.get(blob_id)
+        store = await asyncio.to_thread(self._sqlite)
+        row = await store.run(lambda conn: conn.execute(
+            "SELECT text FROM session_blobs WHERE id = ?", (blob_id,)
+        ).fetchone())
+        return row[0] if row else None
+
+
+blob_store = BlobStore(
+    os.getenv("AGENT_SESSION_DB_PATH", "data/agent_sessions.db")
+    if os.getenv("AGENT_SESSION_BACKEND", "sqlite").lower() == "sqlite" else None
+)
+
+
+async def fetch_requirement_blob(blob_id: str, offset: int = 0, length: int = 20000) -> dict:
+    """Read text that was moved out of the conversation history during compaction.
+
+    Use this when the conversation contains a reference such as
+    "[Stored as blob_...]" and you need the full requirement document or tool
+    output. Large blobs can be read in pages with `offset` and `length`.
+
+    Args:
+        blob_id: The blob ID from the reference, e.g. "blob_3f2a9c1d0e7b4a55".
+        offset: Character offset to start reading from.
+        length: Maximum number of characters to return.
+
+    Returns:
+        dict with the requested text slice and the total blob size.
+    """
+    text = await blob_store.get(blob_id)
+    if text is None:
+        return {"success": False, "error": f"Blob {blob_id} not found"}
+    offset = max(0, offset)
+    chunk = text[offset:offset + max(1, length)]
+    return {
+        "success": True,
+        "blob_id": blob_id,
+        "offset": offset,
+        "text": chunk,
+        "total_chars": len(text),
+        "has_more": offset + len(chunk) < len(text),
+    }
+
+
+def _part_chars(part: Part) -> int:
+    if part.text:
+        return len(part.text)
+    if part.function_call:
+        return len(json.dumps(part.function_call.args or {}, default=str))
+    if part.function_response:
+        return len(json.dumps(part.function_response.response or {}, default=str))
+    return 0
+
+
+def _event_chars(event: Event) -> int:
+    if not event.content or not event.content.parts:
+        return 0
+    return sum(_part_chars(part) for part in event.content.parts)
+
+
+def _event_text(event: Event) -> str:
+    if not event.content or not event.content.parts:
+        return ""
+    texts = []
+    for part in event.content.parts:
+        if part.text:
+            texts.append(part.text)
+        elif part.function_call:
+            texts.append(f"(called tool {part.function_call.name})")
+        elif part.function_response:
+            texts.append(f"(tool {part.function_response.name} responded)")
+    return "\n".join(texts)
+
+
+_REFERENCE_RE = re.compile(r"\[Stored as (blob_[0-9a-f]+) [^\]]*\]\n.*?\n\[End of excerpt\]", re.DOTALL)
+
+
+async def expand_blob_references(text: str) -> str:
+    """Replace blob references in `text` with the stored content."""
+    pieces, position = [], 0
+    for match in _REFERENCE_RE.finditer(text):
+        stored = await blob_store.get(match.group(1))
+        pieces.append(text[position:match.start()])
+        pieces.append(stored if stored is not None else match.group(0))
+        position = match.end()
+    pieces.append(text[position:])
+    return "".join(pieces)
+
+
+class SessionCompactor:
+    """Summarizes old turns and offloads large blobs once a session gets too big."""
+
+    def __init__(self):
+        self.enabled = os.getenv("SESSION_COMPACTION_ENABLED", "true").lower() == "true"
+        self.token_threshold = int(os.getenv("SESSION_COMPACTION_TOKEN_THRESHOLD", "60000"))
+        self.keep_recent_events = int(os.getenv("SESSION_COMPACTION_KEEP_RECENT_EVENTS", "8"))
+        self.blob_min_chars = int(os.getenv("SESSION_COMPACTION_BLOB_MIN_CHARS", "4000"))
+        self.excerpt_chars = int(os.getenv("SESSION_COMPACTION_EXCERPT_CHARS", "600"))
+        self.summary_model = os.getenv("SESSION_COMPACTION_MODEL", os.getenv("AGENT_MODEL", "gemini-2.5-flash"))
+        self.delete_old = os.getenv("SESSION_COMPACTION_DELETE_OLD", "false").lower() == "true"
+        self.compactions_total = 0
+        self.skipped_busy_total = 0
+        self.last_compaction: Dict[str, Any] = {}
+        self._client = None
+        # Runs (and compactions) in flight per session ID
+        self._active: Dict[str, int] = {}
+        # Compacted session ID -> the session that replaced it
+        self._replaced: Dict[str, str] = {}
+
+    @contextmanager
+    def track_run(self, session_id: str) -> Iterator[None]:
+        """Mark a session as in use; it is not compacted (or deleted) until every run has left it."""
+        self._active[session_id] = self._active.get(session_id, 0) + 1
+        try:
+            yield
+        finally:
+            self._active[session_id] -= 1
+            if not self._active[session_id]:
+                del self._active[session_id]
+
+    @staticmethod
+    def estimate_tokens(events: List[Event]) -> int:
+        """Rough token estimate (about four characters per token)."""
+        return sum(_event_chars(event) for event in events) // 4
+
+    async def _offload_blobs(self, event: Event) -> Event:
+        """Return a copy of `event` with large text/tool payloads replaced by blob references."""
+        event = event.model_copy(deep=True)
+        # State deltas were already applied; the new session starts from the final state
+        event.actions.state_delta = {}
+        if not event.content or not event.content.parts:
+            return event
+
+        parts = []
+        for part in event.content.parts:
+            if part.text and len(part.text) >= self.blob_min_chars and event.author != SUMMARY_AUTHOR:
+                blob_id = await blob_store.put(part.text)
+                parts.append(Part(text=(
+                    f"[Stored as {blob_id} ({len(part.text)} chars). "
+                    f"Call fetch_requirement_blob(\"{blob_id}\") for the full text.]\n"
+                    f"{part.text[:self.excerpt_chars]}\n[End of excerpt]"
+                )))
+            elif part.function_response and _part_chars(part) >= self.blob_min_chars:
+                payload = json.dumps(part.function_response.response or {}, default=str)
+                blob_id = await blob_store.put(payload)
+                compacted = part.model_copy(deep=True)
+                compacted.function_response.response = {
+                    "blob_ref": blob_id,
+                    "note": f"Response ({len(payload)} chars) moved out of history; use fetch_requirement_blob to read it.",
+                    "excerpt": payload[:self.excerpt_chars],
+                }
+                parts.append(compacted)
+            else:
+                parts.append(part)
+        event.content = Content(role=event.content.role, parts=parts)
+        return event
+
+    def _split_index(self, events: List[Event]) -> int:
+        """Index of the first kept event: the start of a user turn among the recent events."""
+        index = max(0, len(events) - self.keep_recent_events)
+        while index > 0:
+            event = events[index]
+            is_user_message = event.author == "user" and event.content and any(
+                part.text for part in (event.content.parts or [])
+            )
+            if is_user_message:
+                return index
+            index -= 1
+        return 0
+
+    @staticmethod
+    def _extractive_summary(events: List[Event], max_chars: int = 8000) -> str:
+        lines = []
+        for event in events:
+            text = _event_text(event).strip()
+            if text:
+                lines.append(f"- [{event.author}] {text[:400]}")
+        summary = "\n".join(lines)
+        return summary if len(summary) <= max_chars else summary[-max_chars:]
+
+    async def _summarize(self, events: List[Event]) -> str:
+        transcript = "\n\n".join(
+            f"[{event.author}] {_event_text(event)}" for event in events if _event_text(event).strip()
+        )
+        try:
+            if self._client is None:
+                self._client = genai.Client()
+            response = await self._client.aio.models.generate_content(
+                model=self.summary_model,
+                contents=SUMMARY_PROMPT.format(transcript=transcript[-400000:]),
+            )
+            if response.text:
+                return response.text
+        except Exception as e:
+            compaction_log.warning("Summary model call failed, using extractive summary", extra={"error": str(e)})
+        return self._extractive_summary(events)
+
+    async def maybe_compact(self, session_service, session, new_session_id: Optional[str] = None):
+        """Compact `session` if it is over the token threshold.
+
+        Returns the session to use for the next turn: either the original one
+        or a newly created, compacted session.
+        """
+        if not self.enabled:
+            return session
+        # A concurrent caller already compacted it: continue on the replacement
+        replacement_id = self._replaced.get(session.id)
+        if replacement_id:
+            replacement = await session_service.get_session(
+                app_name=session.app_name, user_id=session.user_id, session_id=replacement_id
+            )
+            if replacement is not None:
+                return replacement
+        # Events a streaming run appends after the copy would be missing from the new session
+        if self._active.get(session.id):
+            self.skipped_busy_total += 1
+            return session
+        with self.track_run(session.id):
+            return await self._compact(session_service, session, new_session_id)
+
+    async def _compact(self, session_service, session, new_session_id: Optional[str]):
+        full_session = await session_service.get_session(
+            app_name=session.app_name, user_id=session.user_id, session_id=session.id
+        )
+        if full_session is None:
+            return session
+        tokens_before = self.estimate_tokens(full_session.events)
+        if tokens_before < self.token_threshold:
+            return session
+
+        started = time.monotonic()
+        events = full_session.events
+        split = self._split_index(events)
+        older, recent = events[:split], events[split:]
+        compaction_log.info("Compacting session", extra={"session_id": session.id, "tokens_before": tokens_before,
+                                                         "summarized_events": len(older), "kept_events": len(recent)})
+
+        compacted_events: List[Event] = []
+        if older:
+            summary = await self._summarize([await self._offload_blobs(event) for event in older])
+            compacted_events.append(Event(
+                invocation_id=older[-1].invocation_id,
+                author=SUMMARY_AUTHOR,
+                timestamp=older[-1].timestamp,
+                content=Content(role="model", parts=[Part(text=f"Summary of the earlier conversation:\n{summary}")]),
+            ))
+        compacted_events.extend([await self._offload_blobs(event) for event in recent])
+
+        session_state = {
+            key: copy.deepcopy(value) for key, value in full_session.state.items()
+            if not key.startswith((State.APP_PREFIX, State.USER_PREFIX, State.TEMP_PREFIX))
+        }
+        new_session = await session_service.create_session(
+            app_name=session.app_name, user_id=session.user_id, state=session_state, session_id=new_session_id
+        )
+        for event in compacted_events:
+            await session_service.append_event(new_session, event)
+
+        self._replaced[session.id] = new_session.id
+        # Only the compacted copy remains afterwards; runs that started on the
+        # old session during compaction keep it alive until a later compaction
+        if self.delete_old and self._active.get(session.id, 0) <= 1:
+            await session_service.delete_session(app_name=session.app_name, user_id=session.user_id, session_id=session.id)
+
+        tokens_after = self.estimate_tokens(compacted_events)
+        self.compactions_total += 1
+        self.last_compaction = {
+            "old_session_id": session.id,
+            "new_session_id": new_session.id,
+            "tokens_before": tokens_before,
+            "tokens_after": tokens_after,
+            "events_before": len(events),
+            "events_after": len(compacted_events),
+            "duration_seconds": round(time.monotonic() - started, 3),
+        }
+        compaction_log.info("Compaction finished", extra=self.last_compaction)
+        return new_session
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "token_threshold": self.token_threshold,
+            "keep_recent_events": self.keep_recent_events,
+            "delete_old": self.delete_old,
+            "compactions_total": self.compactions_total,
+            "skipped_busy_total": self.skipped_busy_total,
+            "last_compaction": self.last_compaction,
+        }
+
+
+# Create a singleton instance
+session_compactor = SessionCompactor()
@@ -0,0 +1,432 @@
+"""
+SQLite-backed session and memory services for ADK runners.
+
+`InMemorySessionService` / `InMemoryMemoryService` lose the clarification
+history on every restart, and each Agents replica sees only its own sessions.
+These implementations keep sessions, events, app/user state and memory in a
+single SQLite database:
+
+- WAL journaling so readers never block the writer and several processes
+  (replicas sharing a volume on the same host) can use the same file.
+- Events are stored as zlib-compressed JSON with `None` fields dropped, which
+  keeps the large requirement/test-case payloads small on disk.
+- Appends run in a single IMMEDIATE transaction and apply the event's state
+  delta to the stored state, so concurrent runs and replicas writing to the
+  same session never overwrite each other's keys.
+
+Note: SQLite locking is not reliable over network filesystems (NFS, SMB,
+Cloud Storage FUSE); replicas must share a local or block-storage volume.
+"""
+
+import asyncio
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import uuid
+import zlib
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from google.adk.events import Event
+from google.adk.memory import BaseMemoryService
+from google.adk.memory.base_memory_service import SearchMemoryResponse
+from google.adk.memory.memory_entry import MemoryEntry
+from google.adk.sessions import BaseSessionService, Session, State
+from google.adk.sessions.base_session_service import GetSessionConfig, ListSessionsResponse
+from google.genai.types import Content
+
+import logs
+
+session_log = logs.get_logger("session")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    app_name TEXT NOT NULL,
+    user_id TEXT NOT NULL,
+    id TEXT NOT NULL,
+    state TEXT NOT NULL,
+    create_time REAL NOT NULL,
+    update_time REAL NOT NULL,
+    PRIMARY KEY (app_name, user_id, id)
+);
+CREATE INDEX IF NOT EXISTS idx_sessions_update_time ON sessions (app_name, user_id, update_time);
+CREATE TABLE IF NOT EXISTS events (
+    app_name TEXT NOT NULL,
+    user_id TEXT NOT NULL,
+    session_id TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    id TEXT NOT NULL,
+    timestamp REAL NOT NULL,
+    data BLOB NOT NULL,
+    PRIMARY KEY (app_name, user_id, session_id, seq)
+);
+CREATE TABLE IF NOT EXISTS app_states (
+    app_name TEXT PRIMARY KEY,
+    state TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS user_states (
+    app_name TEXT NOT NULL,
+    user_id TEXT NOT NULL,
+    state TEXT NOT NULL,
+    PRIMARY KEY (app_name, user_id)
+);
+CREATE TABLE IF NOT EXISTS memory_events (
+    app_name TEXT NOT NULL,
+    user_id TEXT NOT NULL,
+    session_id TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    author TEXT,
+    timestamp REAL NOT NULL,
+    words TEXT NOT NULL,
+    content BLOB NOT NULL,
+    PRIMARY KEY (app_name, user_id, session_id, seq)
+);
+"""
+
+
+def _compress(data: str) -> bytes:
+    return zlib.compress(data.encode("utf-8"), 6)
+
+
+def _decompress(blob: bytes) -> str:
+    return zlib.decompress(blob).decode("utf-8")
+
+
+def _extract_words_lower(text: str) -> set:
+    return set(word.lower() for word in re.findall(r"[A-Za-z]+", text))
+
+
+class _SqliteStore:
+    """A shared SQLite connection with WAL enabled, guarded by a lock."""
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        directory = os.path.dirname(os.path.abspath(db_path))
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA busy_timeout=30000")
+        self._conn.executescript(SCHEMA)
+
+    def run_sync(self, func, *args):
+        """Run `func(conn, *args)` while holding the connection lock."""
+        with self._lock:
+            return func(self._conn, *args)
+
+    async def run(self, func, *args):
+        """Run `func(conn, *args)` on a worker thread so the event loop is not blocked."""
+        return await asyncio.to_thread(self.run_sync, func, *args)
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+_stores: Dict[str, _SqliteStore] = {}
+
+
+def _get_store(db_path: str) -> _SqliteStore:
+    """Session and memory services pointing at the same file share one connection."""
+    key = os.path.abspath(db_path)
+    if key not in _stores:
+        _stores[key] = _SqliteStore(db_path)
+    return _stores[key]
+
+
+class SqliteSessionService(BaseSessionService):
+    """Durable ADK session service stored in a local SQLite database."""
+
+    def __init__(self, db_path: str):
+        self.store = _get_store(db_path)
+
+    @staticmethod
+    def _load_state(conn, app_name: str, user_id: str, session_state: Dict[str, Any]) -> Dict[str, Any]:
+        """Merge app- and user-scoped state into a session's own state."""
+        state = dict(session_state)
+        row = conn.execute("SELECT state FROM app_states WHERE app_name = ?", (app_name,)).fetchone()
+        if row:
+            for key, value in json.loads(row[0]).items():
+                state[State.APP_PREFIX + key] = value
+        row = conn.execute(
+            "SELECT state FROM user_states WHERE app_name = ? AND user_id = ?", (app_name, user_id)
+        ).fetchone()
+        if row:
+            for key, value in json.loads(row[0]).items():
+                state[State.USER_PREFIX + key] = value
+        return state
+
+    @staticmethod
+    def _split_state(state: Dict[str, Any]):
+        """Split a state dict into app, user and session scopes (temp keys dropped)."""
+        app_state, user_state, session_state = {}, {}, {}
+        for key, value in (state or {}).items():
+            if key.startswith(State.APP_PREFIX):
+                app_state[key.removeprefix(State.APP_PREFIX)] = value
+            elif key.startswith(State.USER_PREFIX):
+                user_state[key.removeprefix(State.USER_PREFIX)] = value
+            elif not key.startswith(State.TEMP_PREFIX):
+                session_state[key] = value
+        return app_state, user_state, session_state
+
+    @staticmethod
+    def _merge_scoped_state(conn, app_name: str, user_id: str, app_delta: Dict[str, Any], user_delta: Dict[str, Any]):
+        if app_delta:
+            row = conn.execute("SELECT state FROM app_states WHERE app_name = ?", (app_name,)).fetchone()
+            app_state = json.loads(row[0]) if row else {}
+            app_state.update(app_delta)
+            conn.execute(
+                "INSERT INTO app_states (app_name, state) VALUES (?, ?) "
+                "ON CONFLICT (app_name) DO UPDATE SET state = excluded.state",
+                (app_name, json.dumps(app_state)),
+            )
+        if user_delta:
+            row = conn.execute(
+                "SELECT state FROM user_states WHERE app_name = ? AND user_id = ?", (app_name, user_id)
+            ).fetchone()
+            user_state = json.loads(row[0]) if row else {}
+            user_state.update(user_delta)
+            conn.execute(
+                "INSERT INTO user_states (app_name, user_id, state) VALUES (?, ?, ?) "
+                "ON CONFLICT (app_name, user_id) DO UPDATE SET state = excluded.state",
+                (app_name, user_id, json.dumps(user_state)),
+            )
+
+    async def create_session(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        state: Optional[Dict[str, Any]] = None,
+        session_id: Optional[str] = None,
+    ) -> Session:
+        session_id = session_id.strip() if session_id and session_id.strip() else str(uuid.uuid4())
+        now = time.time()
+
+        def create(conn):
+            app_delta, user_delta, session_state = self._split_state(state)
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                exists = conn.execute(
+                    "SELECT 1 FROM sessions WHERE app_name = ? AND user_id = ? AND id = ?",
+                    (app_name, user_id, session_id),
+                ).fetchone()
+                if exists:
+                    raise ValueError(f"Session {session_id} already exists")
+                self._merge_scoped_state(conn, app_name, user_id, app_delta, user_delta)
+                conn.execute(
+                    "INSERT INTO sessions (app_name, user_id, id, state, create_time, update_time) VALUES (?, ?, ?, ?, ?, ?)",
+                    (app_name, user_id, session_id, json.dumps(session_state), now, now),
+                )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            return self._load_state(conn, app_name, user_id, session_state)
+
+        merged_state = await self.store.run(create)
+        return Session(app_name=app_name, user_id=user_id, id=session_id, state=merged_state, last_update_time=now)
+
+    async def get_session(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        session_id: str,
+        config: Optional[GetSessionConfig] = None,
+    ) -> Optional[Session]:
+        def get(conn):
+            row = conn.execute(
+                "SELECT state, update_time FROM sessions WHERE app_name = ? AND user_id = ? AND id = ?",
+                (app_name, user_id, session_id),
+            ).fetchone()
+            if row is None:
+                return None
+
+            where = "app_name = ? AND user_id = ? AND session_id = ?"
+            params: List[Any] = [app_name, user_id, session_id]
+            if config and config.after_timestamp:
+                where += " AND timestamp >= ?"
+                params.append(config.after_timestamp)
+            if config and config.num_recent_events:
+                rows = conn.execute(
+                    f"SELECT data FROM (SELECT data, seq FROM events WHERE {where} ORDER BY seq DESC LIMIT ?) ORDER BY seq",
+                    params + [config.num_recent_events],
+                ).fetchall()
+            else:
+                rows = conn.execute(f"SELECT data FROM events WHERE {where} ORDER BY seq", params).fetchall()
+
+            state = self._load_state(conn, app_name, user_id, json.loads(row[0]))
+            return state, row[1], [_decompress(event_row[0]) for event_row in rows]
+
+        result = await self.store.run(get)
+        if result is None:
+            return None
+        state, update_time, event_payloads = result
+        return Session(
+            app_name=app_name,
+            user_id=user_id,
+            id=session_id,
+            state=state,
+            events=[Event.model_validate_json(payload) for payload in event_payloads],
+            last_update_time=update_time,
+        )
+
+    async def list_sessions(self, *, app_name: str, user_id: str) -> ListSessionsResponse:
+        def list_rows(conn):
+            rows = conn.execute(
+                "SELECT id, state, update_time FROM sessions WHERE app_name = ? AND user_id = ? ORDER BY update_time",
+                (app_name, user_id),
+            ).fetchall()
+            return [(row[0], self._load_state(conn, app_name, user_id, json.loads(row[1])), row[2]) for row in rows]
+
+        rows = await self.store.run(list_rows)
+        return ListSessionsResponse(sessions=[
+            Session(app_name=app_name, user_id=user_id, id=session_id, state=state, last_update_time=update_time)
+            for session_id, state, update_time in rows
+        ])
+
+    async def delete_session(self, *, app_name: str, user_id: str, session_id: str) -> None:
+        def delete(conn):
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute(
+                    "DELETE FROM events WHERE app_name = ? AND user_id = ? AND session_id = ?",
+                    (app_name, user_id, session_id),
+                )
+                conn.execute(
+                    "DELETE FROM sessions WHERE app_name = ? AND user_id = ? AND id = ?",
+                    (app_name, user_id, session_id),
+                )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+        await self.store.run(delete)
+
+    async def append_event(self, session: Session, event: Event) -> Event:
+        if event.partial:
+            return event
+
+        def append(conn):
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute(
+                    "SELECT state, update_time FROM sessions WHERE app_name = ? AND user_id = ? AND id = ?",
+                    (session.app_name, session.user_id, session.id),
+                ).fetchone()
+                if row is None:
+                    raise ValueError(f"Session {session.id} not found")
+                # Concurrent runs share the session; deltas are merged into the
+                # stored state rather than overwriting it, so nothing is lost
+                merged = row[1] > session.last_update_time
+
+                session_state = json.loads(row[0])
+                if event.actions and event.actions.state_delta:
+                    app_delta, user_delta, session_delta = self._split_state(event.actions.state_delta)
+                    self._merge_scoped_state(conn, session.app_name, session.user_id, app_delta, user_delta)
+                    session_state.update(session_delta)
+
+                seq = conn.execute(
+                    "SELECT COALESCE(MAX(seq), 0) + 1 FROM events WHERE app_name = ? AND user_id = ? AND session_id = ?",
+                    (session.app_name, session.user_id, session.id),
+                ).fetchone()[0]
+                conn.execute(
+                    "INSERT INTO events (app_name, user_id, session_id, seq, id, timestamp, data) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (session.app_name, session.user_id, session.id, seq, event.id, event.timestamp,
+                     _compress(event.model_dump_json(exclude_none=True))),
+                )
+                update_time = max(event.timestamp, row[1])
+                conn.execute(
+                    "UPDATE sessions SET state = ?, update_time = ? WHERE app_name = ? AND user_id = ? AND id = ?",
+                    (json.dumps(session_state), update_time, session.app_name, session.user_id, session.id),
+                )
+                conn.execute("COMMIT")
+                return update_time, merged
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+        update_time, merged = await self.store.run(append)
+        if merged:
+            session_log.debug("Session changed since it was loaded; merged event",
+                              extra={"session_id": session.id, "event_id": event.id})
+        await super().append_event(session=session, event=event)
+        session.last_update_time = update_time
+        return event
+
+    def close(self) -> None:
+        self.store.close()
+        _stores.pop(os.path.abspath(self.store.db_path), None)
+
+
+class SqliteMemoryService(BaseMemoryService):
+    """Keyword-search memory stored alongside the sessions in SQLite.
+
+    Matches the InMemoryMemoryService semantics: an event is returned when it
+    shares at least one word with the query.
+    """
+
+    def __init__(self, db_path: str):
+        self.store = _get_store(db_path)
+
+    async def add_session_to_memory(self, session: Session):
+        rows = []
+        for seq, event in enumerate(session.events):
+            if not event.content or not event.content.parts:
+                continue
+            text = " ".join(part.text for part in event.content.parts if part.text)
+            words = _extract_words_lower(text)
+            if not words:
+                continue
+            rows.append((
+                session.app_name, session.user_id, session.id, seq, event.author, event.timestamp,
+                " " + " ".join(sorted(words)) + " ",
+                _compress(event.content.model_dump_json(exclude_none=True)),
+            ))
+
+        def replace(conn):
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute(
+                    "DELETE FROM memory_events WHERE app_name = ? AND user_id = ? AND session_id = ?",
+                    (session.app_name, session.user_id, session.id),
+                )
+                conn.executemany(
+                    "INSERT INTO memory_events (app_name, user_id, session_id, seq, author, timestamp, words, content) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    rows,
+                )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+        await self.store.run(replace)
+
+    async def search_memory(self, *, app_name: str, user_id: str, query: str) -> SearchMemoryResponse:
+        words = sorted(_extract_words_lower(query))
+        response = SearchMemoryResponse()
+        if not words:
+            return response
+
+        def search(conn):
+            clause = " OR ".join("words LIKE ?" for _ in words)
+            return conn.execute(
+                f"SELECT author, timestamp, content FROM memory_events WHERE app_name = ? AND user_id = ? AND ({clause}) "
+                "ORDER BY timestamp",
+                [app_name, user_id] + [f"% {word} %" for word in words],
+            ).fetchall()
+
+        for author, timestamp, content in await self.store.run(search):
+            response.memories.append(MemoryEntry(
+                content=Content.model_validate_json(_decompress(content)),
+                author=author,
+                timestamp=datetime.fromtimestamp(timestamp).isoformat(),
+            ))
+        return response
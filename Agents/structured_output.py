@@ -0,0 +1,292 @@
+"""
+Schema-constrained output for the test generation stages.
+
+Each stage of the generation pipeline describes its JSON output in the prompt
+and the caller then fishes the JSON out of free-form text, re-prompting when
+it does not parse. This module provides:
+
+- Pydantic response schemas (epics -> features -> use_cases -> test_cases)
+  that are passed to the model as `output_schema`, so Gemini returns JSON in
+  that shape instead of prose around a code block.
+- `IncrementalEpicParser`, which consumes streamed text chunks and yields each
+  epic as soon as its closing brace arrives, so completed epics are available
+  before the whole response has been generated.
+- `repair_json`, which fixes the usual defects of truncated or sloppy model
+  JSON (fences, trailing commas, unterminated strings, unclosed brackets)
+  locally instead of asking the model again.
+"""
+
+import json
+import re
+from typing import Any, Dict, List, Optional
+
+from pydantic import BaseModel, ValidationError
+
+from json_extraction import extract_json
+import logs
+
+generation_log = logs.get_logger("generation")
+
+
+class TestCase(BaseModel):
+    test_case_id: str
+    test_case_title: Optional[str] = None
+    preconditions: List[str] = []
+    test_steps: List[str] = []
+    expected_result: Optional[str] = None
+    test_type: Optional[str] = None
+    compliance_mapping: List[str] = []
+    model_explanation: Optional[str] = None
+    requires_manual_verification: Optional[bool] = None
+    review_status: Optional[str] = None
+    comments: Optional[str] = None
+
+
+class UseCase(BaseModel):
+    use_case_id: str
+    title: str
+    description: Optional[str] = None
+    test_scenarios_outline: List[str] = []
+    acceptance_criteria: List[str] = []
+    compliance_mapping: List[str] = []
+    ai_explainability: Optional[str] = None
+    model_explanation: Optional[str] = None
+    risk_level: Optional[str] = None
+    traceability_id: Optional[str] = None
+    validation_notes: Optional[str] = None
+    compliance_gap: Optional[bool] = None
+    clarification_required: Optional[bool] = None
+    review_status: Optional[str] = None
+    comments: Optional[str] = None
+    test_cases: List[TestCase] = []
+
+
+class Feature(BaseModel):
+    feature_id: str
+    feature_name: str
+    description: Optional[str] = None
+    priority: Optional[str] = None
+    use_cases: List[UseCase] = []
+
+
+class Epic(BaseModel):
+    epic_id: str
+    epic_name: str
+    description: Optional[str] = None
+    priority: Optional[str] = None
+    features: List[Feature] = []
+
+
+class PlanOutput(BaseModel):
+    """planner_agent: epics, features and use cases without test cases."""
+    plan_summary: Optional[str] = None
+    epics: List[Epic]
+
+
+class ComplianceOutput(BaseModel):
+    """compliance_agent: the plan annotated with compliance mappings and risk."""
+    validated_epics: List[Epic]
+    compliance_summary: Optional[str] = None
+
+
+class TestSuiteOutput(BaseModel):
+    """test_engineer_agent: the full hierarchy down to test cases."""
+    epics: List[Epic]
+    coverage_summary: Optional[str] = None
+
+
+class ReviewSummary(BaseModel):
+    total_use_cases: Optional[int] = None
+    total_test_cases: Optional[int] = None
+    approved: Optional[int] = None
+    clarifications_required: Optional[int] = None
+    overall_status: Optional[str] = None
+
+
+class ReviewOutput(BaseModel):
+    """reviewer_agent: the reviewed hierarchy with a review status per item."""
+    epics: List[Epic]
+    review_summary: Optional[ReviewSummary] = None
+    ready_for_integration: Optional[bool] = None
+
+
+STAGE_SCHEMAS = {
+    "planner_agent": PlanOutput,
+    "compliance_agent": ComplianceOutput,
+    "test_engineer_agent": TestSuiteOutput,
+    "reviewer_agent": ReviewOutput,
+}
+
+
+def _strip_fences(text: str) -> str:
+    text = text.strip()
+    text = re.sub(r"^```(?:json)?\s*", "", text, flags=re.IGNORECASE)
+    return re.sub(r"\s*```\s*$", "", text)
+
+
+def repair_json(text: str) -> Optional[Any]:
+    """Decode model JSON, repairing common defects. Returns None if it cannot be salvaged."""
+    if not text:
+        return None
+    data = extract_json(text)
+    if data is not None:
+        return data
+
+    text = _strip_fences(text)
+    start = text.find("{")
+    if start == -1:
+        return None
+    text = text[start:]
+
+    # Walk the text once, dropping trailing commas and remembering open containers
+    out: List[str] = []
+    stack: List[str] = []
+    in_string = False
+    escaped = False
+    for char in text:
+        if in_string:
+            out.append(char)
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+            elif char == "\n":
+                # Raw newlines are invalid inside JSON strings
+                out[-1] = "\\n"
+            continue
+        if char == '"':
+            in_string = True
+        elif char in "{[":
+            stack.append("}" if char == "{" else "]")
+        elif char in "}]":
+            while out and out[-1] in " \t\r\n,":
+                if out.pop() == ",":
+                    break
+            if stack:
+                stack.pop()
+            out.append(char)
+            if not stack:
+                break
+            continue
+        out.append(char)
+
+    # Close whatever the truncated output left open
+    if in_string:
+        if escaped:
+            out.pop()
+        out.append('"')
+    repaired = "".join(out).rstrip()
+    repaired = re.sub(r'(,|:)\s*$', "", repaired)
+    if stack and stack[-1] == "}":
+        # A trailing string directly inside an object is a key without a value
+        repaired = re.sub(r'([,{])\s*"(?:[^"\\]|\\.)*"$', lambda m: "" if m.group(1) == "," else "{", repaired)
+    repaired += "".join(reversed(stack))
+    try:
+        return json.loads(repaired)
+    except ValueError:
+        return None
+
+
+def validate_stage_output(stage_name: str, data: Any) -> Any:
+    """Normalize `data` with the stage's schema; unknown stages or invalid data pass through."""
+    schema = STAGE_SCHEMAS.get(stage_name)
+    if schema is None or not isinstance(data, dict):
+        return data
+    try:
+        return schema.model_validate(data).model_dump(exclude_none=True)
+    except ValidationError as e:
+        generation_log.warning("Stage output does not match its schema; using it as is",
+                               extra={"stage": stage_name, "errors": e.error_count()})
+        return data
+
+
+class IncrementalEpicParser:
+    """Yields epics from a streamed JSON response as soon as each one is complete.
+
+    Feed text chunks in order with `feed()`; it returns the epics whose closing
+    brace arrived in that chunk. Epics are the objects directly inside the
+    top-level "epics" (or "validated_epics") array.
+    """
+
+    EPIC_KEYS = ("epics", "validated_epics")
+
+    def __init__(self):
+        self.text = ""
+        self.epics: List[Dict[str, Any]] = []
+        self._position = 0
+        self._root_started = False
+        # Open containers as (bracket, key the container was stored under)
+        self._stack: List[tuple] = []
+        self._in_string = False
+        self._escaped = False
+        self._string_start = 0
+        self._last_string: Optional[str] = None
+        self._key: Optional[str] = None
+        self._epic_start: Optional[int] = None
+
+    def _in_epic_array(self) -> bool:
+        return (
+            len(self._stack) == 2 and self._stack[0][0] == "{"
+            and self._stack[1][0] == "[" and self._stack[1][1] in self.EPIC_KEYS
+        )
+
+    def feed(self, chunk: str) -> List[Dict[str, Any]]:
+        self.text += chunk
+        completed = []
+        text = self.text
+        for index in range(self._position, len(text)):
+            char = text[index]
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+                    self._last_string = text[self._string_start + 1:index]
+                continue
+            if not self._root_started:
+                # Skip prose or a code fence before the JSON document
+                if char == "{":
+                    self._root_started = True
+                    self._stack.append(("{", None))
+                continue
+            if char == '"':
+                self._in_string = True
+                self._string_start = index
+            elif char == ":":
+                self._key = self._last_string
+            elif char == ",":
+                self._key = None
+            elif char in "{[":
+                if char == "{" and self._in_epic_array():
+                    self._epic_start = index
+                parent_is_object = self._stack and self._stack[-1][0] == "{"
+                self._stack.append((char, self._key if parent_is_object else None))
+                self._key = None
+            elif char in "}]" and self._stack:
+                self._stack.pop()
+                self._key = None
+                if char == "}" and self._epic_start is not None and self._in_epic_array():
+                    block = text[self._epic_start:index + 1]
+                    self._epic_start = None
+                    try:
+                        epic = json.loads(block)
+                    except ValueError:
+                        epic = repair_json(block)
+                    if isinstance(epic, dict):
+                        self.epics.append(epic)
+                        completed.append(epic)
+        self._position = len(text)
+        return completed
+
+    def result(self) -> Optional[Dict[str, Any]]:
+        """The whole document: parsed, repaired, or rebuilt from the epics seen so far."""
+        data = repair_json(self.text)
+        if isinstance(data, dict):
+            return data
+        if self.epics:
+            return {"epics": list(self.epics)}
+        return None
@@ -4,10 +4,11 @@ from pathlib import Path
 import google.auth
 from dotenv import load_dotenv
 from google.adk.agents import Agent,SequentialAgent
-from google.adk.tools.mcp_tool.mcp_toolset import MCPToolset
-from google.adk.tools.mcp_tool.mcp_session_manager import StreamableHTTPConnectionParams
 from google.cloud import logging as google_cloud_logging
 
+from session_compaction import fetch_requirement_blob
+from mcp_connections import mcp_connections
+
 # Load environment variables from .env file in root directory
 root_dir = Path(__file__).parent.parent
 dotenv_path = root_dir / ".env"
@@ -18,22 +19,12 @@ os.environ.setdefault("GOOGLE_CLOUD_PROJECT", "gen-lang-client-0182599221")
 os.environ.setdefault("GOOGLE_CLOUD_LOCATION", "global")
 os.environ.setdefault("GOOGLE_GENAI_USE_VERTEXAI", "True")
 
-FIRESTORE_MCP_URL = os.getenv('FIRESTORE_MCP_URL', 'http://localhost:8084')
-JIRA_MCP_URL = os.getenv('JIRA_MCP_URL', 'http://localhost:8085')
-
 logging_client = google_cloud_logging.Client()
 logger = logging_client.logger("test_generator_agent")
 
-FireStoreMCP_Tool = MCPToolset(
-                                connection_params=StreamableHTTPConnectionParams(
-                                    url=FIRESTORE_MCP_URL,
-                                ),
-                              )
-JiraMCP_Tool = MCPToolset(
-                              connection_params=StreamableHTTPConnectionParams(
-                                  url=JIRA_MCP_URL,
-                              ),
-                            )
+# Shared with the master agent; see mcp_connections.py
+FireStoreMCP_Tool = mcp_connections.get_toolset("firestore")
+JiraMCP_Tool = mcp_connections.get_toolset("jira")
 
 
 planner_agent = Agent(
@@ -890,5 +881,6 @@ Once test case generation is complete:
 2. Include the key `next_action` = "push_to_mcp" to indicate the master agent should push results to Firestore and Jira.
 3. Do not attempt to call MCP tools directly. Let the master agent handle tool execution.
 
-"""
+""",
+    tools=[fetch_requirement_blob],
 )
@@ -0,0 +1,81 @@
+"""
+OpenTelemetry tracing for the Agents API.
+
+- Incoming requests become server spans; a W3C traceparent header from the
+  Backend makes them part of the Backend's trace.
+- /query, /generate_parallel and /push_artifacts run in an "agent_run" span.
+  ADK adds its own spans underneath (invocation, agent_run [name], call_llm,
+  execute_tool) once a tracer provider is installed.
+- `RunSpans` adds one span per ADK event (the time it took to produce it) and
+  one per tool call (from the function call event to its response).
+- MCP tool calls carry the trace context in the `_meta` field of the
+  tools/call request, so the MCP servers' spans join the same trace.
+
+The exporter, sampling, span helpers and the ASGI server span middleware are
+shared with the other services (medassure_telemetry.tracing, which also lists
+the TRACING_* settings); the service name defaults to medassure-agents.
+"""
+
+import time
+from typing import Any, Dict
+
+from medassure_telemetry import tracing as shared_tracing
+# Re-exported for the rest of the service
+from medassure_telemetry.tracing import OTEL_AVAILABLE, TRACING_ENABLED, inject_meta, span
+
+if OTEL_AVAILABLE:
+    from opentelemetry import context as otel_context
+    from opentelemetry.trace import Status, StatusCode
+
+tracer = shared_tracing.configure("medassure-agents", "medassure.agents")
+
+
+class RunSpans:
+    """Spans for the events of one ADK run, parented to the span current when it is created."""
+
+    def __init__(self):
+        self._parent = otel_context.get_current() if TRACING_ENABLED else None
+        self._last_event_ns = time.time_ns()
+        self._tool_spans: Dict[str, Any] = {}
+
+    def event(self, event) -> None:
+        if not TRACING_ENABLED:
+            return
+        now = time.time_ns()
+        function_calls = event.get_function_calls()
+        usage = event.usage_metadata
+        event_span = tracer.start_span(f"adk.event {event.author}", context=self._parent, start_time=self._last_event_ns,
+                                       attributes={"adk.event.id": event.id, "adk.event.author": event.author,
+                                                   "adk.event.partial": bool(event.partial),
+                                                   "adk.event.final": event.is_final_response(),
+                                                   "adk.event.function_calls": [call.name for call in function_calls],
+                                                   "adk.event.transfer_to_agent": (event.actions.transfer_to_agent
+                                                                                   if event.actions else None) or "",
+                                                   "gen_ai.usage.input_tokens": (usage.prompt_token_count or 0) if usage else 0,
+                                                   "gen_ai.usage.output_tokens": (usage.candidates_token_count or 0) if usage else 0})
+        event_span.end(end_time=now)
+        self._last_event_ns = now
+
+        for call in function_calls:
+            self._tool_spans[call.id] = tracer.start_span(
+                f"tool_call {call.name}", context=self._parent, start_time=now,
+                attributes={"adk.tool.name": call.name, "adk.tool.call_id": call.id or "", "adk.agent": event.author})
+        for response in event.get_function_responses():
+            tool_span = self._tool_spans.pop(response.id, None)
+            if tool_span is not None:
+                result = response.response if isinstance(response.response, dict) else {}
+                if result.get("success") is False or result.get("isError"):
+                    tool_span.set_status(Status(StatusCode.ERROR, str(result.get("error", ""))[:200]))
+                tool_span.end(end_time=now)
+
+    def close(self) -> None:
+        """End tool spans whose response never arrived (the run failed or was cut short)."""
+        for tool_span in self._tool_spans.values():
+            tool_span.set_status(Status(StatusCode.ERROR, "no function response"))
+            tool_span.end()
+        self._tool_spans.clear()
+
+
+def install(app) -> None:
+    """Set up tracing and add the server span middleware to a FastAPI app."""
+    shared_tracing.install_fastapi(app)
@@ -7,7 +7,7 @@ from datetime import datetime
 import httpx
 from fastapi import FastAPI, HTTPException, File, UploadFile, Form, Query
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel
 from dotenv import load_dotenv
 
@@ -18,6 +18,11 @@ load_dotenv()
 from upload_and_extract_service import upload_extract_service
 from content_storage_service import content_storage_service
 from firestore_service import firestore_service
+from job_service import job_service
+from jira_sync_service import jira_sync_service
+import logs
+import metrics
+import tracing
 
 # Firestore integration - Now handled by firestore_service
 try:
@@ -31,6 +36,12 @@ except ImportError:
 # Environment variables with Cloud Run friendly defaults
 AGENTS_API_URL = os.getenv("AGENTS_API_URL", "http://localhost:8082/query")
 RESET_AGENT_SESSION_API_URL = os.getenv("RESET_AGENT_SESSION_API_URL","http://localhost:8082/reset-session")
+AGENTS_PARALLEL_API_URL = os.getenv("AGENTS_PARALLEL_API_URL", "http://localhost:8082/generate_parallel")
+# "agent" asks the master agent to generate; "parallel" uses per-epic fan-out
+TEST_GENERATION_MODE = os.getenv("TEST_GENERATION_MODE", "agent").lower()
+AGENTS_PUSH_API_URL = os.getenv("AGENTS_PUSH_API_URL", "http://localhost:8082/push_artifacts")
+# "direct" pushes the generated hierarchy in code; "agent" asks the master agent to do it
+PUSH_MODE = os.getenv("PUSH_MODE", "direct").lower()
 TIMEOUT = float(os.getenv("AGENTS_API_TIMEOUT", "600"))
 PORT = int(os.getenv("PORT", "8083"))  # Cloud Run sets PORT environment variable
 ENVIRONMENT = os.getenv("ENVIRONMENT", "development")
@@ -62,6 +73,16 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Route latency, Firestore I/O per request and Agents API calls at GET /metrics for Prometheus
+metrics.install(app)
+# Request, Agents API, Firestore and Jira spans, exported per TRACING_EXPORTER
+tracing.install(app)
+
+# Structured, queued logs (LOG_LEVELS / LOG_SAMPLE_RATES per category)
+agents_log = logs.get_logger("agents")
+upload_log = logs.get_logger("upload")
+generation_log = logs.get_logger("generation")
+
 class PromptRequest(BaseModel):
     prompt: str
     metadata: Optional[dict] = None
@@ -144,13 +165,38 @@ class ProjectCreationResponse(BaseModel):
     notification_email: str
     created_at: str
 
-async def call_agents_api(prompt: str) -> AgentResponse:
+async def call_agents_api(prompt: str, priority: str = "normal", url: str = AGENTS_API_URL) -> AgentResponse:
+    """Forward a prompt to the Agents API.
+
+    `priority` ("high", "normal" or "low") orders the request in the Agents
+    admission queue. When the Agents API sheds load (429) the status and its
+    Retry-After header are passed through to the caller.
+    """
     payload = {"query": prompt}
-    async with httpx.AsyncClient(timeout=TIMEOUT) as client:
-        try:
-            r = await client.post(AGENTS_API_URL, json=payload)
-        except httpx.RequestError as exc:
-            raise HTTPException(status_code=502, detail=f"Error contacting Agents API: {exc}")
+    path = httpx.URL(url).path
+    with metrics.agents_api_call(path) as call, \
+            tracing.span(f"Agents POST {path}", "client", **{"http.request.method": "POST", "url.full": url,
+                                                              "agents.priority": priority}):
+        async with httpx.AsyncClient(timeout=TIMEOUT) as client:
+            try:
+                # traceparent makes the Agents API's spans part of this request's trace
+                r = await client.post(url, json=payload, params={"priority": priority},
+                                      headers=tracing.inject_headers())
+            except httpx.RequestError as exc:
+                raise HTTPException(status_code=502, detail=f"Error contacting Agents API: {exc}")
+        call["status"] = str(r.status_code)
+        tracing.set_attributes(**{"http.response.status_code": r.status_code})
+        if r.status_code >= 400:
+            tracing.set_error(f"HTTP {r.status_code}")
+    agents_log.info("Agents API call", extra={"endpoint": path, "priority": priority, "status": r.status_code,
+                                               "prompt_chars": len(prompt), "response_chars": len(r.content)})
+
+    if r.status_code == 429:
+        raise HTTPException(
+            status_code=429,
+            detail=f"Agents API is busy: {r.text}",
+            headers={"Retry-After": r.headers.get("Retry-After", "30")}
+        )
 
     if r.status_code != 200:
         raise HTTPException(status_code=502, detail=f"Agents API returned {r.status_code}: {r.text}")
@@ -162,13 +208,11 @@ async def reset_agent_session():
     """Reset the agent session to start fresh."""
     async with httpx.AsyncClient(timeout=TIMEOUT) as client:
         try:
-            r = await client.post(RESET_AGENT_SESSION_API_URL)
-            if DEBUG:
-                print(f"Agent session reset response: {r.status_code}")
+            r = await client.post(RESET_AGENT_SESSION_API_URL, headers=tracing.inject_headers())
+            agents_log.debug("Agent session reset", extra={"status": r.status_code})
             return r.status_code == 200
         except httpx.RequestError as exc:
-            if DEBUG:
-                print(f"Error resetting agent session: {exc}")
+            agents_log.warning("Error resetting agent session", extra={"error": str(exc)})
             return False
 
 @app.post("/upload_requirement_file", response_model=UploadResponse)
@@ -191,8 +235,8 @@ async def upload_requirement_file(
             processed_files=result["processed_files"]
         )
         
-        if DEBUG:
-            print(f"Processed {result['total_files']} files for project {project_name} ({project_id})")
+        upload_log.info("Processed requirement files", extra={"project_id": project_id, "files": result["total_files"],
+                                                               "text_chars": result["total_text_length"]})
         
         return UploadResponse(
             success=True,
@@ -206,8 +250,7 @@ async def upload_requirement_file(
         # Re-raise HTTP exceptions as-is
         raise
     except Exception as e:
-        if DEBUG:
-            print(f"Unexpected error in upload: {str(e)}")
+        upload_log.exception("Unexpected error in upload", extra={"project_id": project_id})
         raise HTTPException(
             status_code=500,
             detail=f"Unexpected error during file processing: {str(e)}"
@@ -233,13 +276,11 @@ async def review_requirement_specifications(req: ReviewRequest):
             detail="No text content was extracted from the uploaded files."
         )
     
-    if DEBUG:
-        print(f"Processing review for project {req.project_name} with {len(extracted_content)} characters of content")
-    
     # Reset agent session to start fresh for this requirement review
     session_reset = await reset_agent_session()
-    if DEBUG:
-        print(f"Agent session reset: {'successful' if session_reset else 'failed'}")
+    generation_log.info("Reviewing requirements", extra={"project_id": req.project_id,
+                                                          "content_chars": len(extracted_content),
+                                                          "session_reset": session_reset})
     
     # Build a comprehensive prompt for the agent
     prompt = f"""
@@ -255,24 +296,9 @@ async def review_requirement_specifications(req: ReviewRequest):
     # Update the stored data with review timestamp using the storage service
     content_storage_service.update_review_timestamp(req.project_name, req.project_id)
     
-    return await call_agents_api(prompt)
-
-@app.post("/generate_test_cases", response_model=AgentResponse)
-async def generate_test_cases(req: PromptRequest):
-    """Generate test cases using the previously reviewed and approved requirement details."""
-    prompt = f"""
-    Generate complete test cases using the previously validated and approved requirement details available in memory. 
-    Follow the standard MedAssureAI process and use the connected sub-agents (test_generator_agent) 
-    to generate test cases in a structured format.
-
-    User instruction: {req.prompt}
-    """
-    response = await call_agents_api(prompt)
+    return await call_agents_api(prompt, priority="high")
 
-    print("DEBUG: Received response from agent")
-    print(f"Response (first 1000 chars): {response.response[:1000]}...")
-
-    prompt_pushdata = """
+PUSH_ARTIFACTS_PROMPT = """
     
     Push artifacts (Epics → Features → Use Cases → Test Cases) to Jira in a single batch, then write the enriched hierarchy to Firestore in one bulk write.
 
@@ -320,19 +346,123 @@ async def generate_test_cases(req: PromptRequest):
         MCP function messages must contain only JSON—no prose, no formatting, no code blocks.
 
     """
-    response_FirestoreJira_status = await call_agents_api(prompt_pushdata)
 
-    print("DEBUG: Received response from agent after pushing data to Firestore and Jira")
-    print(f"Response (first 1000 chars): {response_FirestoreJira_status.response[:1000]}...")
+async def run_test_generation_stage(user_prompt: str) -> AgentResponse:
+    """Stage 1: ask the agents to generate the test case hierarchy."""
+    if TEST_GENERATION_MODE == "parallel":
+        response = await call_agents_api(user_prompt, priority="low", url=AGENTS_PARALLEL_API_URL)
+        generation_log.info("Parallel generation finished", extra={"stats": response.debug_info})
+        return response
 
+    prompt = f"""
+    Generate complete test cases using the previously validated and approved requirement details available in memory. 
+    Follow the standard MedAssureAI process and use the connected sub-agents (test_generator_agent) 
+    to generate test cases in a structured format.
+
+    User instruction: {user_prompt}
+    """
+    response = await call_agents_api(prompt, priority="low")
+
+    generation_log.info("Test generation finished", extra={"response": response.response})
+    return response
+
+async def run_push_artifacts_stage(user_prompt: str = "") -> AgentResponse:
+    """Stage 2: push the generated artifacts to Jira and Firestore."""
+    if PUSH_MODE == "direct":
+        response = await call_agents_api(user_prompt, priority="low", url=AGENTS_PUSH_API_URL)
+        generation_log.info("Direct push finished", extra={"timings": response.debug_info})
+        return response
+
+    response_FirestoreJira_status = await call_agents_api(PUSH_ARTIFACTS_PROMPT, priority="low")
+
+    generation_log.info("Push to Firestore and Jira finished", extra={"response": response_FirestoreJira_status.response})
     return response_FirestoreJira_status
 
+@app.post("/generate_test_cases", response_model=AgentResponse)
+async def generate_test_cases(req: PromptRequest):
+    """Generate test cases using the previously reviewed and approved requirement details."""
+    await run_test_generation_stage(req.prompt)
+    return await run_push_artifacts_stage(req.prompt)
+
+# ================================
+# BACKGROUND JOB ENDPOINTS
+# ================================
+
+@app.post("/jobs/generate_test_cases", status_code=202)
+async def submit_generate_test_cases_job(req: PromptRequest):
+    """Queue test generation and the Jira/Firestore push as a background job.
+
+    Returns immediately with a job ID; poll GET /jobs/{job_id} or subscribe to
+    GET /jobs/{job_id}/events (Server-Sent Events) for progress and results.
+    """
+
+    async def generation_stage(context: Dict[str, Any]) -> Dict[str, Any]:
+        response = await run_test_generation_stage(req.prompt)
+        return response.model_dump()
+
+    async def push_stage(context: Dict[str, Any]) -> Dict[str, Any]:
+        response = await run_push_artifacts_stage(req.prompt)
+        return response.model_dump()
+
+    job = job_service.submit(
+        "generate_test_cases",
+        [("generation", generation_stage), ("push_to_jira_and_firestore", push_stage)],
+        metadata=req.metadata,
+    )
+    return {
+        "job_id": job.job_id,
+        "status": job.status,
+        "status_url": f"/jobs/{job.job_id}",
+        "events_url": f"/jobs/{job.job_id}/events",
+    }
+
+@app.get("/jobs")
+async def list_jobs():
+    """List known background jobs (without their results)."""
+    return {"jobs": job_service.list_jobs()}
+
+@app.get("/jobs/{job_id}")
+async def get_job_status(job_id: str):
+    """Get status, per-stage timings and (once finished) the result of every completed stage."""
+    job = job_service.get_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+    return job.to_dict()
+
+@app.get("/jobs/{job_id}/events")
+async def stream_job_events(job_id: str):
+    """Stream job progress as Server-Sent Events until the job finishes."""
+    if not job_service.get_job(job_id):
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+    return StreamingResponse(
+        job_service.stream_events(job_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+# ================================
+# JIRA STATUS SYNC
+# ================================
+
+@app.post("/jira/sync")
+async def run_jira_sync(project_id: Optional[str] = None):
+    """Pull Jira changes since the last sync into Firestore now (one project or all linked projects)."""
+    result = await jira_sync_service.sync(project_id)
+    if not result.get("success") and result.get("error"):
+        raise HTTPException(status_code=503, detail=result["error"])
+    return result
+
+@app.get("/jira/sync/status")
+async def get_jira_sync_status():
+    """Background sync configuration and the outcome of the last run."""
+    return jira_sync_service.status()
+
 
 @app.post("/enhance_test_cases_chat", response_model=AgentResponse)
 async def enhance_test_cases_chat(req: PromptRequest):
     """Enhance existing test cases."""
 
-    print(f"DEBUG: Starting enhance_test_cases_chat() - User Prompt - {req.prompt}")
+    generation_log.debug("Enhance request", extra={"prompt": req.prompt})
 
     prompt = f"""
         This is a clarification for any specific use case or test case request from the user.
@@ -345,9 +475,8 @@ async def enhance_test_cases_chat(req: PromptRequest):
         - Return with the calrification or changed/ enhanced use case/ test case in user friendly format not in JSON format.
         - User message: {req.prompt}    
         """
-    response = await call_agents_api(prompt)
-    print("DEBUG: Received response from agent")
-    print(f"Response: {response}")
+    response = await call_agents_api(prompt, priority="high")
+    generation_log.debug("Enhance response", extra={"response": response.response})
 
     return response
 
@@ -380,7 +509,7 @@ async def req_clarification_chat_with_agent(req: PromptRequest):
     - User message: {req.prompt}
     
     """
-    return await call_agents_api(prompt)
+    return await call_agents_api(prompt, priority="high")
 
 @app.post("/reset_agentsession")
 async def reset_agent_session_endpoint():
@@ -996,6 +1125,14 @@ async def health():
         "total_content_length": storage_stats["total_content_length"]
     }
 
+@app.on_event("startup")
+async def startup_event():
+    jira_sync_service.start()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    await jira_sync_service.stop()
+
 @app.get("/")
 async def root():
     """Root endpoint for Cloud Run health checks."""
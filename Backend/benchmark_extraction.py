@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+"""
+Extraction benchmark for uploaded requirement documents.
+
+Runs every extractor backend over the corpus from extraction_corpus.py and
+reports, per document and backend:
+
+- pages per second (best of --repeat runs),
+- peak RSS of the extracting process,
+- output size (characters and KiB of extracted text).
+
+Backends:
+- service            UploadAndExtractService (PyPDF2 / python-docx paragraphs), what uploads use today
+- docx_with_tables   python-docx paragraphs and table cells in document order
+- pypdf, pymupdf, pdfplumber, pdfminer, docx2txt
+                     alternatives, measured when the package is installed
+
+Each (document, backend) pair runs in a fresh process, so peak RSS is not
+inflated by earlier runs or imports of other backends.
+
+Usage:
+    python benchmark_extraction.py --generate                      # build the default corpus first
+    python benchmark_extraction.py --corpus /tmp/corpus --backends service,pypdf --repeat 3
+    python benchmark_extraction.py --json extraction_results.json
+"""
+
+import argparse
+import glob
+import json
+import multiprocessing
+import os
+import re
+import resource
+import sys
+import time
+from typing import Any, Callable, Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from extraction_corpus import DEFAULT_OUT, DEFAULT_PAGES, generate
+
+
+def _service_extractor(fmt: str) -> Callable[[str], str]:
+    from upload_and_extract_service import upload_extract_service
+    return upload_extract_service.extract_text_from_pdf if fmt == "pdf" else upload_extract_service.extract_text_from_docx
+
+
+def _docx_with_tables(path: str) -> str:
+    from docx import Document
+    from docx.table import Table
+    from docx.text.paragraph import Paragraph
+
+    document = Document(path)
+    parts = []
+    for block in document.element.body.iterchildren():
+        if block.tag.endswith("}p"):
+            parts.append(Paragraph(block, document).text)
+        elif block.tag.endswith("}tbl"):
+            for row in Table(block, document).rows:
+                parts.append(" | ".join(cell.text for cell in row.cells))
+    return "\n".join(parts).strip()
+
+
+def _pypdf(path: str) -> str:
+    from pypdf import PdfReader
+    return "\n".join(page.extract_text() or "" for page in PdfReader(path).pages)
+
+
+def _pymupdf(path: str) -> str:
+    import fitz
+    with fitz.open(path) as document:
+        return "\n".join(page.get_text() for page in document)
+
+
+def _pdfplumber(path: str) -> str:
+    import pdfplumber
+    with pdfplumber.open(path) as document:
+        return "\n".join(page.extract_text() or "" for page in document.pages)
+
+
+def _pdfminer(path: str) -> str:
+    from pdfminer.high_level import extract_text
+    return extract_text(path)
+
+
+def _docx2txt(path: str) -> str:
+    import docx2txt
+    return docx2txt.process(path)
+
+
+# name -> (module that must be importable, {format: extractor factory})
+BACKENDS: Dict[str, tuple] = {
+    "service": ("upload_and_extract_service", {"pdf": lambda: _service_extractor("pdf"),
+                                               "docx": lambda: _service_extractor("docx")}),
+    "docx_with_tables": ("docx", {"docx": lambda: _docx_with_tables}),
+    "pypdf": ("pypdf", {"pdf": lambda: _pypdf}),
+    "pymupdf": ("fitz", {"pdf": lambda: _pymupdf}),
+    "pdfplumber": ("pdfplumber", {"pdf": lambda: _pdfplumber}),
+    "pdfminer": ("pdfminer", {"pdf": lambda: _pdfminer}),
+    "docx2txt": ("docx2txt", {"docx": lambda: _docx2txt}),
+}
+
+
+def available_backends(names: List[str]) -> List[str]:
+    import importlib.util
+
+    available = []
+    for name in names:
+        if name not in BACKENDS:
+            raise SystemExit(f"Unknown backend {name}; choose from {', '.join(BACKENDS)}")
+        if importlib.util.find_spec(BACKENDS[name][0]) is None:
+            print(f"⚠️  Skipping {name}: {BACKENDS[name][0]} is not installed")
+            continue
+        available.append(name)
+    return available
+
+
+def _peak_rss_mib() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and KiB on Linux
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def _measure(backend: str, fmt: str, path: str, repeat: int, results) -> None:
+    """Child process: extract `path` `repeat` times and report timings and peak RSS."""
+    try:
+        extract = BACKENDS[backend][1][fmt]()
+        baseline = _peak_rss_mib()
+        durations = []
+        text = ""
+        for _ in range(repeat):
+            started = time.perf_counter()
+            text = extract(path)
+            durations.append(time.perf_counter() - started)
+        results.put({"durations": durations, "chars": len(text), "bytes": len(text.encode("utf-8")),
+                     "baseline_rss_mib": baseline, "peak_rss_mib": _peak_rss_mib()})
+    except Exception as e:
+        results.put({"error": str(e)})
+
+
+def document_pages(path: str) -> int:
+    match = re.search(r"_(\d+)p\.\w+$", path)
+    if match:
+        return int(match.group(1))
+    if path.endswith(".pdf"):
+        import PyPDF2
+        return len(PyPDF2.PdfReader(path).pages)
+    return 1
+
+
+def run_one(backend: str, path: str, repeat: int, timeout: float) -> Dict[str, Any]:
+    fmt = path.rsplit(".", 1)[-1].lower()
+    context = multiprocessing.get_context("spawn")
+    results = context.Queue()
+    process = context.Process(target=_measure, args=(backend, fmt, path, repeat, results))
+    process.start()
+    try:
+        outcome = results.get(timeout=timeout)
+    except Exception:
+        outcome = {"error": f"timed out after {timeout:.0f}s"}
+    process.join(timeout=5)
+    if process.is_alive():
+        process.kill()
+
+    pages = document_pages(path)
+    row: Dict[str, Any] = {
+        "document": os.path.basename(path),
+        "format": fmt,
+        "backend": backend,
+        "pages": pages,
+        "file_kib": round(os.path.getsize(path) / 1024, 1),
+    }
+    if "error" in outcome:
+        row["error"] = outcome["error"]
+        return row
+    best = min(outcome["durations"])
+    row.update({
+        "seconds_best": round(best, 4),
+        "seconds_median": round(sorted(outcome["durations"])[len(outcome["durations"]) // 2], 4),
+        "pages_per_second": round(pages / best, 1) if best else None,
+        "peak_rss_mib": round(outcome["peak_rss_mib"], 1),
+        "rss_growth_mib": round(outcome["peak_rss_mib"] - outcome["baseline_rss_mib"], 1),
+        "output_chars": outcome["chars"],
+        "output_kib": round(outcome["bytes"] / 1024, 1),
+    })
+    return row
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark PDF/DOCX text extraction")
+    parser.add_argument("--corpus", default=DEFAULT_OUT, help="folder with spec_NNNNp.pdf/.docx files")
+    parser.add_argument("--generate", action="store_true", help="generate missing corpus files first")
+    parser.add_argument("--pages", default=DEFAULT_PAGES, help="page counts for --generate")
+    parser.add_argument("--backends", default=",".join(BACKENDS), help="comma-separated backends")
+    parser.add_argument("--formats", default="pdf,docx")
+    parser.add_argument("--repeat", type=int, default=3, help="extractions per document and backend (best is reported)")
+    parser.add_argument("--timeout", type=float, default=900, help="seconds per document and backend")
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+
+    formats = [fmt.strip() for fmt in args.formats.split(",") if fmt.strip()]
+    if args.generate:
+        generate(args.corpus, [int(p) for p in args.pages.split(",") if p.strip()], formats)
+    documents = sorted(path for fmt in formats for path in glob.glob(os.path.join(args.corpus, f"*.{fmt}")))
+    if not documents:
+        raise SystemExit(f"No documents in {args.corpus}; run with --generate or extraction_corpus.py first")
+
+    backends = available_backends([name.strip() for name in args.backends.split(",") if name.strip()])
+    print(f"🚀 Benchmarking {len(documents)} documents with {', '.join(backends)} (best of {args.repeat})")
+    print(f"   {'document':<18} {'backend':<17} {'pages':>6} {'pages/s':>9} {'best s':>8} {'peak MiB':>9} "
+          f"{'+MiB':>6} {'out KiB':>8}")
+
+    results = []
+    for path in documents:
+        fmt = path.rsplit(".", 1)[-1].lower()
+        for backend in backends:
+            if fmt not in BACKENDS[backend][1]:
+                continue
+            row = run_one(backend, path, args.repeat, args.timeout)
+            results.append(row)
+            if "error" in row:
+                print(f"   {row['document']:<18} {backend:<17} {row['pages']:>6}  ❌ {row['error']}")
+            else:
+                print(f"   {row['document']:<18} {backend:<17} {row['pages']:>6} {row['pages_per_second']:>9} "
+                      f"{row['seconds_best']:>8} {row['peak_rss_mib']:>9} {row['rss_growth_mib']:>6} {row['output_kib']:>8}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"corpus": args.corpus, "config": vars(args), "results": results}, f, indent=2)
+        print(f"\n📋 Results written to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,6 +2,10 @@ import os
 from typing import Dict, Any, Optional
 from datetime import datetime
 
+import logs
+
+upload_log = logs.get_logger("upload")
+
 
 class ContentStorageService:
     """Service for managing extracted content storage."""
@@ -38,18 +42,16 @@ class ContentStorageService:
             "file_count": len(processed_files)
         }
         
-        if self.debug:
-            print(f"Stored content for project {project_name} ({project_id}) - {len(extracted_content)} characters")
+        upload_log.debug("Stored extracted content", extra={"project_id": project_id, "content_chars": len(extracted_content)})
     
     def get_content(self, project_name: str, project_id: str) -> Optional[Dict[str, Any]]:
         """Retrieve stored content."""
         content_key = self.generate_content_key(project_name, project_id)
         
-        if self.debug:
-            print(f"Looking for content with key: {content_key}")
-            print(f"Available keys: {list(self.extracted_content_store.keys())}")
-        
-        return self.extracted_content_store.get(content_key)
+        content = self.extracted_content_store.get(content_key)
+        upload_log.debug("Content lookup", extra={"content_key": content_key, "found": content is not None,
+                                                   "stored_projects": len(self.extracted_content_store)})
+        return content
     
     def update_review_timestamp(self, project_name: str, project_id: str) -> bool:
         """Update the review timestamp for a project."""
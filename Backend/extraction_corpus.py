@@ -0,0 +1,261 @@
+#!/usr/bin/env python3
+"""
+Generates the extraction benchmark corpus: requirement-style PDF and DOCX
+documents from 1 to 2000 pages.
+
+Every document mixes the layouts real specifications use:
+- single-column prose with a requirements table,
+- two- and three-column prose,
+- headings on every page.
+
+PDFs are written directly (Helvetica, Flate-compressed content streams), so
+no PDF library is needed. DOCX files use python-docx, with multi-column
+sections and tables; a page break separates pages. Output is deterministic
+for a given seed, so results stay comparable between runs.
+
+Usage:
+    python extraction_corpus.py                          # 1,10,100,500,2000 pages, PDF and DOCX
+    python extraction_corpus.py --pages 1,50 --formats pdf --out /tmp/corpus
+"""
+
+import argparse
+import os
+import random
+import time
+import zlib
+from typing import List
+
+try:
+    from docx import Document
+    from docx.enum.text import WD_BREAK
+    from docx.oxml.ns import qn
+    from docx.enum.section import WD_SECTION
+    DOCX_AVAILABLE = True
+except ImportError:
+    DOCX_AVAILABLE = False
+
+DEFAULT_PAGES = "1,10,100,500,2000"
+DEFAULT_OUT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "extraction_corpus")
+
+SUBJECTS = ["The system", "The clinician portal", "The audit service", "The patient record module",
+            "The device gateway", "The reporting engine", "The consent manager"]
+ACTIONS = ["shall record", "shall validate", "shall encrypt", "shall display", "shall reject",
+           "shall retain", "shall notify the administrator of"]
+OBJECTS = ["every signature on a patient record", "access to protected health information",
+           "dosage changes above the configured threshold", "failed login attempts",
+           "exported reports", "device telemetry older than 30 days", "consent withdrawals"]
+CONDITIONS = ["within 2 seconds", "before the record is saved", "using AES-256", "for at least 6 years",
+              "when the session has expired", "according to IEC 62304 clause 5.1", "as required by HIPAA 164.312"]
+STANDARDS = ["HIPAA 164.312(b)", "IEC 62304 5.1", "ISO 13485 7.3", "FDA 21 CFR 11.10", "GDPR Art. 32"]
+
+PAGE_WIDTH, PAGE_HEIGHT, MARGIN = 612, 792, 54
+LAYOUTS = ("table", "two_column", "three_column")
+
+
+def sentence(rng: random.Random, number: int) -> str:
+    return (f"REQ-{number:05d}: {rng.choice(SUBJECTS)} {rng.choice(ACTIONS)} {rng.choice(OBJECTS)} "
+            f"{rng.choice(CONDITIONS)}.")
+
+
+def table_rows(rng: random.Random, first: int, count: int) -> List[List[str]]:
+    return [["ID", "Requirement", "Priority", "Compliance"]] + [
+        [f"REQ-{first + row:05d}", f"{rng.choice(SUBJECTS)} {rng.choice(ACTIONS)} {rng.choice(OBJECTS)}",
+         rng.choice(["High", "Medium", "Low"]), rng.choice(STANDARDS)]
+        for row in range(count)
+    ]
+
+
+def _wrap(text: str, max_chars: int) -> List[str]:
+    lines, line = [], ""
+    for word in text.split():
+        if line and len(line) + 1 + len(word) > max_chars:
+            lines.append(line)
+            line = word
+        else:
+            line = f"{line} {word}" if line else word
+    if line:
+        lines.append(line)
+    return lines
+
+
+def _pdf_text(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+class PdfBuilder:
+    """Minimal PDF writer: Helvetica text, lines and rectangles."""
+
+    def __init__(self):
+        self.pages: List[bytes] = []
+
+    def add_page(self, operations: List[str]) -> None:
+        self.pages.append(zlib.compress("\n".join(operations).encode("latin-1", "replace")))
+
+    def save(self, path: str) -> None:
+        objects = [
+            b"<< /Type /Catalog /Pages 2 0 R >>",
+            None,  # page tree, filled in once page object numbers are known
+            b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>",
+            b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica-Bold /Encoding /WinAnsiEncoding >>",
+        ]
+        page_numbers = []
+        for content in self.pages:
+            objects.append(b"<< /Length %d /Filter /FlateDecode >>\nstream\n" % len(content) + content + b"\nendstream")
+            content_number = len(objects)
+            objects.append(
+                b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %d %d] /Resources << /Font << /F1 3 0 R /F2 4 0 R >> >> "
+                b"/Contents %d 0 R >>" % (PAGE_WIDTH, PAGE_HEIGHT, content_number)
+            )
+            page_numbers.append(len(objects))
+        kids = b" ".join(b"%d 0 R" % number for number in page_numbers)
+        objects[1] = b"<< /Type /Pages /Kids [" + kids + b"] /Count %d >>" % len(page_numbers)
+
+        with open(path, "wb") as f:
+            f.write(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+            offsets = []
+            for number, body in enumerate(objects, start=1):
+                offsets.append(f.tell())
+                f.write(b"%d 0 obj\n" % number + body + b"\nendobj\n")
+            xref = f.tell()
+            f.write(b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1))
+            for offset in offsets:
+                f.write(b"%010d 00000 n \n" % offset)
+            f.write(b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref))
+
+
+def _text_ops(x: float, y: float, text: str, size: float = 9, font: str = "F1") -> str:
+    return f"BT /{font} {size} Tf {x:.1f} {y:.1f} Td ({_pdf_text(text)}) Tj ET"
+
+
+def write_pdf(path: str, pages: int, seed: int = 7) -> None:
+    rng = random.Random(seed)
+    pdf = PdfBuilder()
+    number = 1
+    line_height = 11
+    for page in range(1, pages + 1):
+        layout = LAYOUTS[(page - 1) % len(LAYOUTS)]
+        ops = [_text_ops(MARGIN, PAGE_HEIGHT - MARGIN, f"Section {page}: Requirement Specification", 14, "F2")]
+        top = PAGE_HEIGHT - MARGIN - 28
+        bottom = MARGIN
+
+        if layout == "table":
+            rows = table_rows(rng, number, 12)
+            number += 12
+            widths = [70, 300, 60, 74]
+            y = top
+            for row_index, row in enumerate(rows):
+                x = MARGIN
+                for width, cell in zip(widths, row):
+                    ops.append(f"{x:.1f} {y - 4:.1f} {width} 16 re S")
+                    ops.append(_text_ops(x + 3, y + 1, cell[: int(width / 4.6)], 8, "F2" if row_index == 0 else "F1"))
+                    x += width
+                y -= 16
+            top = y - 20
+            columns = 1
+        else:
+            columns = 2 if layout == "two_column" else 3
+
+        gutter = 18
+        column_width = (PAGE_WIDTH - 2 * MARGIN - gutter * (columns - 1)) / columns
+        max_chars = int(column_width / (9 * 0.5))
+        column, y = 0, top
+        while column < columns:
+            for line in _wrap(sentence(rng, number), max_chars):
+                if y < bottom:
+                    column += 1
+                    y = top
+                    if column >= columns:
+                        break
+                ops.append(_text_ops(MARGIN + column * (column_width + gutter), y, line))
+                y -= line_height
+            number += 1
+            y -= 4
+        ops.append(_text_ops(PAGE_WIDTH / 2 - 10, MARGIN / 2, str(page), 8))
+        pdf.add_page(ops)
+    pdf.save(path)
+
+
+def _set_columns(section, count: int) -> None:
+    cols = section._sectPr.find(qn("w:cols"))
+    if cols is None:
+        cols = section._sectPr.makeelement(qn("w:cols"), {})
+        section._sectPr.append(cols)
+    cols.set(qn("w:num"), str(count))
+    cols.set(qn("w:space"), "360")
+
+
+def write_docx(path: str, pages: int, seed: int = 7) -> None:
+    rng = random.Random(seed)
+    document = Document()
+    number = 1
+    current_columns = 1
+    last_paragraph = None
+    for page in range(1, pages + 1):
+        layout = LAYOUTS[(page - 1) % len(LAYOUTS)]
+        columns = {"table": 1, "two_column": 2, "three_column": 3}[layout]
+        if columns != current_columns:
+            # Column count can only change at a section boundary
+            section = document.add_section(WD_SECTION.NEW_PAGE)
+            _set_columns(section, columns)
+            current_columns = columns
+        elif last_paragraph is not None:
+            last_paragraph.add_run().add_break(WD_BREAK.PAGE)
+
+        document.add_heading(f"Section {page}: Requirement Specification", level=1)
+        if layout == "table":
+            rows = table_rows(rng, number, 12)
+            number += 12
+            table = document.add_table(rows=len(rows), cols=len(rows[0]))
+            table.style = "Table Grid"
+            for row, values in zip(table.rows, rows):
+                for cell, value in zip(row.cells, values):
+                    cell.text = value
+            paragraphs = 8
+        else:
+            paragraphs = 24 if columns == 2 else 30
+        for _ in range(paragraphs):
+            last_paragraph = document.add_paragraph(" ".join(sentence(rng, number + offset) for offset in range(2)))
+            number += 2
+    document.save(path)
+
+
+def corpus_file_name(fmt: str, pages: int) -> str:
+    return f"spec_{pages:04d}p.{fmt}"
+
+
+def generate(out_dir: str, page_counts: List[int], formats: List[str], seed: int = 7, force: bool = False) -> List[str]:
+    """Write the corpus into `out_dir`, skipping files that already exist unless `force`."""
+    os.makedirs(out_dir, exist_ok=True)
+    written = []
+    for fmt in formats:
+        if fmt == "docx" and not DOCX_AVAILABLE:
+            print("⚠️  python-docx is not installed; skipping DOCX files")
+            continue
+        for pages in page_counts:
+            path = os.path.join(out_dir, corpus_file_name(fmt, pages))
+            if os.path.exists(path) and not force:
+                written.append(path)
+                continue
+            started = time.perf_counter()
+            (write_pdf if fmt == "pdf" else write_docx)(path, pages, seed)
+            print(f"   {os.path.basename(path)}: {os.path.getsize(path) / 1024:.0f} KiB in {time.perf_counter() - started:.1f}s")
+            written.append(path)
+    return written
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate the PDF/DOCX extraction benchmark corpus")
+    parser.add_argument("--out", default=DEFAULT_OUT)
+    parser.add_argument("--pages", default=DEFAULT_PAGES, help="comma-separated page counts")
+    parser.add_argument("--formats", default="pdf,docx")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--force", action="store_true", help="regenerate files that already exist")
+    args = parser.parse_args()
+
+    print(f"🚀 Generating extraction corpus in {args.out}")
+    generate(args.out, [int(p) for p in args.pages.split(",") if p.strip()],
+             [f.strip() for f in args.formats.split(",") if f.strip()], args.seed, args.force)
+
+
+if __name__ == "__main__":
+    main()
@@ -11,6 +11,9 @@ import logging
 from uuid import uuid4
 import re
 
+from metrics import counted_reads, record_reads, record_writes
+from tracing import traced
+
 try:
     from google.cloud import firestore
     from google.oauth2 import service_account
@@ -104,6 +107,7 @@ class FirestoreService:
     # PROJECT OPERATIONS
     # ================================
 
+    @traced("Firestore create_project")
     def create_project(self, project_data: Dict[str, Any], created_by: Optional[str] = None) -> str:
         """Create a new project"""
         if not self.is_available() or self.client is None:
@@ -133,6 +137,7 @@ class FirestoreService:
             # Store in Firestore
             doc_ref = self.client.collection(self.projects_collection).document(project_id)
             doc_ref.set(project)
+            record_writes("set")
             
             logger.info(f"Created project: {project_id}")
             return project_id
@@ -141,6 +146,7 @@ class FirestoreService:
             logger.error(f"Error creating project: {e}")
             raise
 
+    @traced("Firestore get_all_projects")
     def get_all_projects(self) -> List[Dict[str, Any]]:
         """Get all projects from Firestore"""
         if not self.is_available() or self.client is None:
@@ -148,7 +154,7 @@ class FirestoreService:
 
         try:
             collection_ref = self.client.collection(self.projects_collection)
-            docs = collection_ref.stream()
+            docs = counted_reads("query", collection_ref.stream())
             
             projects = []
             for doc in docs:
@@ -194,6 +200,7 @@ class FirestoreService:
             logger.error(f"Error fetching all projects: {e}")
             return []
 
+    @traced("Firestore get_project_by_id")
     def get_project_by_id(self, project_id: str) -> Optional[Dict[str, Any]]:
         """Get a specific project by ID"""
         if not self.is_available() or self.client is None:
@@ -202,6 +209,7 @@ class FirestoreService:
         try:
             doc_ref = self.client.collection(self.projects_collection).document(project_id)
             doc = doc_ref.get()
+            record_reads("get")
             
             if doc.exists:
                 project_data = doc.to_dict()
@@ -215,6 +223,7 @@ class FirestoreService:
             logger.error(f"Error fetching project {project_id}: {e}")
             return None
 
+    @traced("Firestore update_project")
     def update_project(self, project_id: str, update_data: Dict[str, Any], updated_by: Optional[str] = None) -> bool:
         """Update an existing project"""
         if not self.is_available() or self.client is None:
@@ -223,6 +232,7 @@ class FirestoreService:
         try:
             doc_ref = self.client.collection(self.projects_collection).document(project_id)
             doc = doc_ref.get()
+            record_reads("get")
             
             if not doc.exists:
                 return False
@@ -234,6 +244,7 @@ class FirestoreService:
             
             # Update in Firestore
             doc_ref.update(update_data)
+            record_writes("update")
             
             logger.info(f"Updated project: {project_id}")
             return True
@@ -241,6 +252,7 @@ class FirestoreService:
             logger.error(f"Error updating project {project_id}: {e}")
             return False
 
+    @traced("Firestore delete_project")
     def delete_project(self, project_id: str) -> bool:
         """Delete a project"""
         if not self.is_available() or self.client is None:
@@ -249,12 +261,14 @@ class FirestoreService:
         try:
             doc_ref = self.client.collection(self.projects_collection).document(project_id)
             doc = doc_ref.get()
+            record_reads("get")
             
             if not doc.exists:
                 return False
             
             # Delete the project document
             doc_ref.delete()
+            record_writes("delete")
             
             logger.info(f"Deleted project: {project_id}")
             return True
@@ -262,6 +276,7 @@ class FirestoreService:
             logger.error(f"Error deleting project {project_id}: {e}")
             return False
 
+    @traced("Firestore list_projects")
     def list_projects(self, filters: Optional[Dict[str, Any]] = None, limit: int = 100) -> List[Dict[str, Any]]:
         """List projects with optional filtering"""
         if not self.is_available() or self.client is None:
@@ -283,7 +298,7 @@ class FirestoreService:
             query = query.order_by("created_at", direction=firestore.Query.DESCENDING).limit(limit)
             
             # Execute query
-            docs = query.stream()
+            docs = counted_reads("query", query.stream())
             
             projects = []
             for doc in docs:
@@ -0,0 +1,329 @@
+"""
+Incremental Jira -> Firestore status sync.
+
+Jira issue IDs, keys and statuses are copied into the project hierarchy when
+artifacts are pushed and are never refreshed afterwards. This service keeps
+them current. For every Firestore project linked to a Jira project
+(`jira_project_key`), it:
+
+1. Asks Jira only for issues updated since that project's last sync. The
+   JQL is `updated >= -<N>m` with a small overlap, which avoids time zone
+   mismatches between Jira and the server.
+2. Pages through the changed issues, fetching only status, key and summary.
+3. When something changed, patches the matching artifacts in a Firestore
+   transaction.
+4. Records the new watermark on the project document.
+
+A sync with no changes costs one Jira request and one small field update per
+project, however large the project is.
+"""
+
+import asyncio
+import base64
+import math
+import os
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+from firestore_service import firestore_service, JiraStatus
+import logs
+from metrics import counted_reads, record_jira_call, record_reads, record_writes
+import tracing
+from tracing import traced
+
+try:
+    from google.cloud import firestore
+    FIRESTORE_AVAILABLE = True
+except ImportError:
+    FIRESTORE_AVAILABLE = False
+
+JIRA_BASE_URL = os.getenv("JIRA_BASE_URL", "")
+JIRA_EMAIL = os.getenv("JIRA_EMAIL", "")
+JIRA_API_TOKEN = os.getenv("JIRA_API_TOKEN", "")
+
+sync_log = logs.get_logger("jira_sync")
+
+# Key holding the children of each level, starting below epics
+CHILD_KEYS = {"features": "use_cases", "use_cases": "test_cases", "test_cases": None}
+
+
+def _iter_artifacts(epics: List[Dict[str, Any]]):
+    """Yield every epic, feature, use case and test case dict in the hierarchy."""
+    stack = [(item, "features") for item in reversed(epics or [])]
+    while stack:
+        item, children_key = stack.pop()
+        yield item
+        if children_key:
+            for child in reversed(item.get(children_key) or []):
+                stack.append((child, CHILD_KEYS[children_key]))
+
+
+def _retry_after_seconds(response: httpx.Response) -> Optional[float]:
+    """Parse Retry-After (seconds or an HTTP date)."""
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class JiraSyncService:
+    """Background job that pulls Jira status changes into Firestore."""
+
+    def __init__(self):
+        self.interval = float(os.getenv("JIRA_SYNC_INTERVAL_SECONDS", "300"))
+        self.overlap_minutes = int(os.getenv("JIRA_SYNC_OVERLAP_MINUTES", "2"))
+        # First sync of a project looks back this far
+        self.initial_lookback_minutes = int(os.getenv("JIRA_SYNC_INITIAL_LOOKBACK_MINUTES", "10080"))
+        self.page_size = min(100, max(1, int(os.getenv("JIRA_SYNC_PAGE_SIZE", "100"))))
+        self.search_path = os.getenv("JIRA_SEARCH_PATH", "/rest/api/3/search")
+        # 429 answers retried per page before the project's sync fails
+        self.max_throttle_retries = max(0, int(os.getenv("JIRA_SYNC_MAX_THROTTLE_RETRIES", "3")))
+        self.max_throttle_wait = float(os.getenv("JIRA_SYNC_MAX_THROTTLE_WAIT_SECONDS", "60"))
+        self._client: Optional[httpx.AsyncClient] = None
+        self._task: Optional[asyncio.Task] = None
+        self._lock: Optional[asyncio.Lock] = None
+        self.last_run: Dict[str, Any] = {}
+        self.runs_total = 0
+
+    def is_configured(self) -> bool:
+        return bool(JIRA_BASE_URL and JIRA_EMAIL and JIRA_API_TOKEN) and firestore_service.is_available()
+
+    def _http(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            token = base64.b64encode(f"{JIRA_EMAIL}:{JIRA_API_TOKEN}".encode()).decode()
+            self._client = httpx.AsyncClient(
+                base_url=JIRA_BASE_URL,
+                headers={"Authorization": f"Basic {token}", "Accept": "application/json"},
+                timeout=30.0,
+            )
+        return self._client
+
+    async def _changed_issues(self, jira_project_key: str, minutes: int) -> Dict[str, Dict[str, Any]]:
+        """Issues in the project updated in the last `minutes`, keyed by issue ID."""
+        jql = f'project = "{jira_project_key}" AND updated >= -{minutes}m ORDER BY updated ASC'
+        changed: Dict[str, Dict[str, Any]] = {}
+        start_at = 0
+        next_page_token = None
+        throttled = 0
+        while True:
+            params: Dict[str, Any] = {"jql": jql, "fields": "status,summary,updated", "maxResults": self.page_size}
+            if next_page_token:
+                params["nextPageToken"] = next_page_token
+            else:
+                params["startAt"] = start_at
+            started = time.perf_counter()
+            with tracing.span(f"Jira GET {self.search_path}", "client", **{"http.request.method": "GET",
+                                                                            "url.path": self.search_path}):
+                try:
+                    response = await self._http().get(self.search_path, params=params)
+                except httpx.TransportError:
+                    record_jira_call(self.search_path, "error", time.perf_counter() - started)
+                    raise
+                record_jira_call(self.search_path, str(response.status_code), time.perf_counter() - started)
+                tracing.set_attributes(**{"http.response.status_code": response.status_code})
+                if response.status_code >= 400:
+                    tracing.set_error(f"HTTP {response.status_code}")
+            if response.status_code == 429 and throttled < self.max_throttle_retries:
+                throttled += 1
+                retry_after = _retry_after_seconds(response)
+                delay = min(self.max_throttle_wait, retry_after if retry_after is not None else 5.0 * throttled)
+                sync_log.warning("Jira search throttled", extra={"jira_project_key": jira_project_key,
+                                                                 "attempt": throttled, "delay_seconds": delay})
+                await asyncio.sleep(delay)
+                continue
+            response.raise_for_status()
+            throttled = 0
+            data = response.json()
+
+            issues = data.get("issues") or []
+            for issue in issues:
+                fields = issue.get("fields") or {}
+                changed[str(issue["id"])] = {
+                    "key": issue.get("key"),
+                    "status": (fields.get("status") or {}).get("name"),
+                    "updated": fields.get("updated"),
+                }
+            start_at += len(issues)
+            next_page_token = data.get("nextPageToken")
+            if not issues or data.get("isLast"):
+                break
+            if "total" in data and start_at >= data["total"]:
+                break
+            if "total" not in data and not next_page_token:
+                break
+        return changed
+
+    @traced("Firestore linked_projects")
+    def _linked_projects(self, project_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Projects with a Jira key, reading only the fields the sync needs."""
+        collection = firestore_service.client.collection(firestore_service.projects_collection)
+        fields = ["jira_project_key", "jira_last_synced_at"]
+        if project_id:
+            doc = collection.document(project_id).get(field_paths=fields)
+            record_reads("get")
+            docs = [doc] if doc.exists else []
+        else:
+            docs = counted_reads("query", collection.select(fields).stream())
+        projects = []
+        for doc in docs:
+            data = doc.to_dict() or {}
+            if data.get("jira_project_key"):
+                projects.append({"project_id": doc.id, **data})
+        return projects
+
+    @traced("Firestore apply_jira_changes")
+    def _apply_changes(self, project_id: str, changed: Dict[str, Dict[str, Any]], synced_at: str) -> int:
+        """Patch artifacts that reference changed issues, inside a transaction."""
+        doc_ref = firestore_service.client.collection(firestore_service.projects_collection).document(project_id)
+        by_key = {issue["key"]: issue_id for issue_id, issue in changed.items() if issue.get("key")}
+        transaction = firestore_service.client.transaction()
+
+        @firestore.transactional
+        def update(transaction) -> int:
+            snapshot = doc_ref.get(field_paths=["epics"], transaction=transaction)
+            record_reads("transaction_get")
+            epics = (snapshot.to_dict() or {}).get("epics") or []
+            updated = 0
+            for item in _iter_artifacts(epics):
+                issue_id = str(item.get("jira_issue_id") or "")
+                if issue_id not in changed:
+                    issue_id = by_key.get(item.get("jira_issue_key") or "")
+                if not issue_id:
+                    continue
+                issue = changed[issue_id]
+                patch = {
+                    "jira_issue_id": issue_id,
+                    "jira_issue_key": issue["key"],
+                    "jira_issue_status": issue["status"],
+                    "jira_status": JiraStatus.SYNCED,
+                }
+                if any(item.get(field) != value for field, value in patch.items()):
+                    item.update(patch)
+                    item["jira_synced_at"] = synced_at
+                    updated += 1
+            fields = {"jira_last_synced_at": synced_at}
+            if updated:
+                # Firestore cannot address elements of the nested arrays; rewrite the hierarchy
+                fields["epics"] = epics
+                fields["last_updated"] = synced_at
+            transaction.update(doc_ref, fields)
+            record_writes("transaction_update")
+            return updated
+
+        return update(transaction)
+
+    @traced("Firestore set_jira_watermark")
+    def _set_watermark(self, project_id: str, synced_at: str) -> None:
+        doc_ref = firestore_service.client.collection(firestore_service.projects_collection).document(project_id)
+        doc_ref.update({"jira_last_synced_at": synced_at})
+        record_writes("update")
+
+    async def _sync_project(self, project: Dict[str, Any]) -> Dict[str, Any]:
+        with tracing.span("Jira sync project", project_id=project["project_id"],
+                          jira_project_key=project["jira_project_key"]):
+            return await self._sync_project_changes(project)
+
+    async def _sync_project_changes(self, project: Dict[str, Any]) -> Dict[str, Any]:
+        started = time.monotonic()
+        now = datetime.now(timezone.utc)
+        last_synced = project.get("jira_last_synced_at")
+        if last_synced:
+            elapsed = (now - datetime.fromisoformat(last_synced)).total_seconds() / 60
+            minutes = math.ceil(elapsed) + self.overlap_minutes
+        else:
+            minutes = self.initial_lookback_minutes
+
+        changed = await self._changed_issues(project["jira_project_key"], minutes)
+        synced_at = now.isoformat()
+        if changed:
+            updated = await asyncio.to_thread(self._apply_changes, project["project_id"], changed, synced_at)
+        else:
+            updated = 0
+            await asyncio.to_thread(self._set_watermark, project["project_id"], synced_at)
+        return {
+            "project_id": project["project_id"],
+            "jira_project_key": project["jira_project_key"],
+            "lookback_minutes": minutes,
+            "changed_issues": len(changed),
+            "artifacts_updated": updated,
+            "duration_seconds": round(time.monotonic() - started, 3),
+        }
+
+    async def sync(self, project_id: Optional[str] = None) -> Dict[str, Any]:
+        """Sync one project, or every project linked to Jira."""
+        if not self.is_configured():
+            return {"success": False, "error": "Jira credentials or Firestore are not configured"}
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+
+        async with self._lock:
+            started = time.monotonic()
+            projects = await asyncio.to_thread(self._linked_projects, project_id)
+            results = []
+            errors = []
+            for project in projects:
+                try:
+                    results.append(await self._sync_project(project))
+                except Exception as e:
+                    sync_log.error("Jira sync failed for project", extra={"project_id": project["project_id"], "error": str(e)})
+                    errors.append({"project_id": project["project_id"], "error": str(e)})
+
+            self.runs_total += 1
+            self.last_run = {
+                "success": not errors,
+                "finished_at": datetime.now(timezone.utc).isoformat(),
+                "projects_checked": len(projects),
+                "changed_issues": sum(result["changed_issues"] for result in results),
+                "artifacts_updated": sum(result["artifacts_updated"] for result in results),
+                "duration_seconds": round(time.monotonic() - started, 3),
+                "projects": results,
+                "errors": errors,
+            }
+            return self.last_run
+
+    async def _loop(self) -> None:
+        while True:
+            try:
+                result = await self.sync()
+                if result.get("artifacts_updated"):
+                    sync_log.info("Jira sync updated artifacts", extra={"artifacts_updated": result["artifacts_updated"]})
+            except Exception:
+                sync_log.exception("Jira sync error")
+            await asyncio.sleep(self.interval)
+
+    def start(self) -> None:
+        if self.interval <= 0 or not self.is_configured():
+            sync_log.info("Jira status sync disabled (no interval, Jira credentials or Firestore)")
+            return
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+        if self._client is not None:
+            await self._client.aclose()
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "configured": self.is_configured(),
+            "running": self._task is not None and not self._task.done(),
+            "interval_seconds": self.interval,
+            "runs_total": self.runs_total,
+            "last_run": self.last_run,
+        }
+
+
+# Create a singleton instance
+jira_sync_service = JiraSyncService()
@@ -0,0 +1,223 @@
+import os
+import json
+import time
+import asyncio
+from uuid import uuid4
+from datetime import datetime
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+
+import logs
+
+jobs_log = logs.get_logger("jobs")
+
+
+# A stage receives the job's shared context (metadata plus the results of the
+# stages that already ran) and returns its own result.
+StageFunc = Callable[[Dict[str, Any]], Awaitable[Any]]
+
+
+class JobStatus:
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+
+    TERMINAL = (SUCCEEDED, FAILED)
+
+
+class Job:
+    """A multi-stage background job and its progress."""
+
+    def __init__(self, job_type: str, stages: List[Tuple[str, StageFunc]], metadata: Optional[dict] = None):
+        self.job_id = uuid4().hex
+        self.job_type = job_type
+        self.metadata = metadata or {}
+        self.status = JobStatus.QUEUED
+        self.created_at = datetime.now().isoformat()
+        self.started_at: Optional[str] = None
+        self.finished_at: Optional[str] = None
+        self.error: Optional[str] = None
+        # Results of the stages that completed, by stage name
+        self.results: Dict[str, Any] = {}
+        self.stage_funcs = stages
+        self.stages = [
+            {
+                "name": name,
+                "status": JobStatus.QUEUED,
+                "started_at": None,
+                "finished_at": None,
+                "duration_seconds": None,
+                "error": None,
+            }
+            for name, _ in stages
+        ]
+        self.finished_monotonic: Optional[float] = None
+        self.subscribers: List[asyncio.Queue] = []
+
+    @property
+    def progress(self) -> float:
+        done = sum(1 for stage in self.stages if stage["status"] == JobStatus.SUCCEEDED)
+        return round(done / len(self.stages), 3) if self.stages else 1.0
+
+    @property
+    def current_stage(self) -> Optional[str]:
+        for stage in self.stages:
+            if stage["status"] == JobStatus.RUNNING:
+                return stage["name"]
+        return None
+
+    def to_dict(self, include_results: bool = True) -> Dict[str, Any]:
+        data = {
+            "job_id": self.job_id,
+            "job_type": self.job_type,
+            "status": self.status,
+            "progress": self.progress,
+            "current_stage": self.current_stage,
+            "stages": self.stages,
+            "metadata": self.metadata,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "error": self.error,
+        }
+        if include_results:
+            data["results"] = self.results
+        return data
+
+
+class JobService:
+    """In-process job queue with background workers.
+
+    Jobs run on worker tasks owned by the service rather than by the HTTP
+    request that submitted them, so a client can disconnect and later poll
+    `get_job` or subscribe to `stream_events` for progress and results.
+    """
+
+    def __init__(self):
+        # One worker by default: generation and push share the single agent session
+        self.max_workers = int(os.getenv("JOB_MAX_WORKERS", "1"))
+        self.retention_seconds = float(os.getenv("JOB_RETENTION_SECONDS", "3600"))
+        self.jobs: Dict[str, Job] = {}
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+
+    def _ensure_workers(self) -> None:
+        """Start the worker pool on first use (needs a running event loop)."""
+        if self._queue is None:
+            self._queue = asyncio.Queue()
+        self._workers = [worker for worker in self._workers if not worker.done()]
+        while len(self._workers) < self.max_workers:
+            self._workers.append(asyncio.create_task(self._worker()))
+
+    def _prune(self) -> None:
+        """Drop finished jobs that are older than the retention window."""
+        now = time.monotonic()
+        expired = [
+            job_id for job_id, job in self.jobs.items()
+            if job.finished_monotonic is not None and now - job.finished_monotonic > self.retention_seconds
+        ]
+        for job_id in expired:
+            del self.jobs[job_id]
+
+    def submit(self, job_type: str, stages: List[Tuple[str, StageFunc]], metadata: Optional[dict] = None) -> Job:
+        """Queue a new job and return it immediately."""
+        self._prune()
+        self._ensure_workers()
+
+        job = Job(job_type, stages, metadata)
+        self.jobs[job.job_id] = job
+        self._queue.put_nowait(job)
+
+        jobs_log.info("Queued job", extra={"job_id": job.job_id, "job_type": job_type,
+                                           "stages": [name for name, _ in stages]})
+        self._publish(job, "queued")
+        return job
+
+    def get_job(self, job_id: str) -> Optional[Job]:
+        return self.jobs.get(job_id)
+
+    def list_jobs(self) -> List[Dict[str, Any]]:
+        return [job.to_dict(include_results=False) for job in self.jobs.values()]
+
+    def _publish(self, job: Job, event: str) -> None:
+        message = {"event": event, "job": job.to_dict(include_results=job.status in JobStatus.TERMINAL)}
+        for queue in job.subscribers:
+            queue.put_nowait(message)
+
+    async def _worker(self) -> None:
+        while True:
+            job = await self._queue.get()
+            try:
+                await self._run_job(job)
+            finally:
+                self._queue.task_done()
+
+    async def _run_job(self, job: Job) -> None:
+        job.status = JobStatus.RUNNING
+        job.started_at = datetime.now().isoformat()
+        context: Dict[str, Any] = {"metadata": job.metadata, "results": job.results}
+        self._publish(job, "started")
+
+        for stage, (name, func) in zip(job.stages, job.stage_funcs):
+            stage["status"] = JobStatus.RUNNING
+            stage["started_at"] = datetime.now().isoformat()
+            self._publish(job, "stage_started")
+            started = time.monotonic()
+            try:
+                context["results"][name] = await func(context)
+            except Exception as e:
+                stage["status"] = JobStatus.FAILED
+                stage["error"] = str(getattr(e, "detail", None) or e)
+                stage["finished_at"] = datetime.now().isoformat()
+                stage["duration_seconds"] = round(time.monotonic() - started, 3)
+                job.status = JobStatus.FAILED
+                job.error = f"Stage '{name}' failed: {stage['error']}"
+                jobs_log.warning("Job stage failed", extra={"job_id": job.job_id, "stage": name,
+                                                            "error": stage["error"]})
+                break
+            stage["status"] = JobStatus.SUCCEEDED
+            stage["finished_at"] = datetime.now().isoformat()
+            stage["duration_seconds"] = round(time.monotonic() - started, 3)
+            jobs_log.info("Job stage finished", extra={"job_id": job.job_id, "stage": name,
+                                                       "duration_seconds": stage["duration_seconds"]})
+            self._publish(job, "stage_completed")
+        else:
+            job.status = JobStatus.SUCCEEDED
+
+        job.finished_at = datetime.now().isoformat()
+        job.finished_monotonic = time.monotonic()
+        self._publish(job, "completed" if job.status == JobStatus.SUCCEEDED else "failed")
+
+    async def stream_events(self, job_id: str, keepalive_seconds: float = 15.0) -> AsyncIterator[str]:
+        """Yield Server-Sent Events for a job until it finishes.
+
+        The first event is a snapshot of the current state, so late subscribers
+        (or clients that reconnect) never miss the outcome.
+        """
+        job = self.jobs.get(job_id)
+        if job is None:
+            return
+
+        queue: asyncio.Queue = asyncio.Queue()
+        job.subscribers.append(queue)
+        try:
+            snapshot = {"event": "snapshot", "job": job.to_dict(include_results=job.status in JobStatus.TERMINAL)}
+            yield f"event: snapshot\ndata: {json.dumps(snapshot, default=str)}\n\n"
+            if job.status in JobStatus.TERMINAL:
+                return
+
+            while True:
+                try:
+                    message = await asyncio.wait_for(queue.get(), timeout=keepalive_seconds)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                yield f"event: {message['event']}\ndata: {json.dumps(message, default=str)}\n\n"
+                if message["event"] in ("completed", "failed"):
+                    return
+        finally:
+            job.subscribers.remove(queue)
+
+
+# Create a singleton instance
+job_service = JobService()
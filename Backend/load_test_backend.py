@@ -0,0 +1,409 @@
+#!/usr/bin/env python3
+"""
+Async load test for the Backend API.
+
+Drives a weighted mix of the calls the Frontend makes against
+`app.py`:
+
+- upload     POST /upload_requirement_file (a generated DOCX)
+- review     POST /review_requirement_specifications
+- chat       POST /requirement_clarification_chat and /enhance_test_cases_chat
+- hierarchy  GET  /firestore/projects/{project_id}/hierarchy
+- analytics  GET  /analytics/overview and /analytics/recent-activity
+
+By default the Backend and a scripted stub of the Agents API
+(stub_agents_api.py) are started in-process, each on its own thread and
+event loop. That keeps agent latency and response size under control and
+lets the harness sample the Backend's event-loop lag directly. Pass
+--backend-url and/or --agents-url to test servers that are already running
+(Backend loop lag is then not available).
+
+The in-process Backend reads the same .env as a real deployment, and the
+upload scenario writes documents. It therefore only starts when Firestore
+and Cloud Storage point at emulators (FIRESTORE_EMULATOR_HOST,
+STORAGE_EMULATOR_HOST), unless --allow-real-backends is passed. The Jira
+status sync loop is always disabled during the test.
+
+Load is closed-loop (--concurrency workers back to back) or open-loop
+(--rate requests per second, Poisson arrivals). The report shows
+throughput, latency percentiles and errors per scenario, the event-loop lag
+of the Backend and of the generator, and the average number of requests in
+flight (throughput x latency). That average is the number to compare with
+the Cloud Run --concurrency setting.
+
+Usage:
+    python load_test_backend.py --duration 30 --concurrency 20
+    python load_test_backend.py --mix chat=5,analytics=3,hierarchy=2 --rate 50 --agents-latency-ms 2000
+    python load_test_backend.py --agents-script stub_script.json --json load_results.json
+"""
+
+import argparse
+import asyncio
+import io
+import json
+import os
+import random
+import statistics
+import sys
+import threading
+import time
+import uuid
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+try:
+    from docx import Document
+    DOCX_AVAILABLE = True
+except ImportError:
+    DOCX_AVAILABLE = False
+
+DEFAULT_MIX = "upload=1,review=1,chat=4,hierarchy=3,analytics=3"
+DOCX_MIME = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+PROJECT_NAME = "loadtest"
+# Services the in-process Backend writes to, and the variable that points each at an emulator
+EMULATOR_HOSTS = {"Firestore": "FIRESTORE_EMULATOR_HOST", "Cloud Storage": "STORAGE_EMULATOR_HOST"}
+
+
+def percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))]
+
+
+class ServerThread:
+    """Runs an ASGI app with uvicorn on its own thread and event loop."""
+
+    def __init__(self, app, port: int):
+        import uvicorn
+
+        self.server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.url = f"http://127.0.0.1:{port}"
+
+    def _run(self) -> None:
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_until_complete(self.server.serve())
+
+    def start(self) -> "ServerThread":
+        self.thread.start()
+        deadline = time.monotonic() + 30
+        while not self.server.started:
+            if time.monotonic() > deadline:
+                raise RuntimeError(f"Server on {self.url} did not start")
+            time.sleep(0.05)
+        return self
+
+    def stop(self) -> None:
+        self.server.should_exit = True
+        self.thread.join(timeout=10)
+
+
+class LoopLagProbe:
+    """Samples how late an event loop wakes up from a short sleep."""
+
+    def __init__(self, interval: float = 0.05):
+        self.interval = interval
+        self.samples: List[float] = []
+        self.running = True
+
+    async def run(self) -> None:
+        while self.running:
+            started = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            self.samples.append(max(0.0, time.perf_counter() - started - self.interval))
+
+    def summary(self) -> Dict[str, float]:
+        return {
+            "p50_ms": round(percentile(self.samples, 50) * 1000, 2),
+            "p99_ms": round(percentile(self.samples, 99) * 1000, 2),
+            "max_ms": round(max(self.samples, default=0.0) * 1000, 2),
+        }
+
+
+def make_docx(paragraphs: int) -> bytes:
+    document = Document()
+    document.add_heading("Requirement Specification - Load Test", 0)
+    for index in range(paragraphs):
+        document.add_paragraph(
+            f"REQ-{index:04d}: The system shall record an audit entry whenever a clinician signs patient "
+            f"record {index}, including the user, timestamp and the fields that changed."
+        )
+    buffer = io.BytesIO()
+    document.save(buffer)
+    return buffer.getvalue()
+
+
+class LoadTest:
+    def __init__(self, args, backend_url: str):
+        self.args = args
+        self.backend_url = backend_url
+        self.mix = self._parse_mix(args.mix)
+        self.latencies: Dict[str, List[float]] = {name: [] for name in self.mix}
+        self.errors: Dict[str, Dict[str, int]] = {name: {} for name in self.mix}
+        self.uploaded: List[str] = []
+        self.hierarchy_project_id = args.project_id
+        self.document = make_docx(args.upload_paragraphs) if DOCX_AVAILABLE else b""
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    def _parse_mix(self, mix: str) -> Dict[str, float]:
+        weights = {}
+        for part in mix.split(","):
+            name, _, weight = part.partition("=")
+            weights[name.strip()] = float(weight or 1)
+        if "upload" in weights and not DOCX_AVAILABLE:
+            print("⚠️  python-docx is not installed; dropping upload from the mix")
+            weights.pop("upload")
+        unknown = set(weights) - {"upload", "review", "chat", "hierarchy", "analytics"}
+        if unknown:
+            raise SystemExit(f"Unknown scenarios in --mix: {', '.join(sorted(unknown))}")
+        return {name: weight for name, weight in weights.items() if weight > 0}
+
+    async def upload(self, client: httpx.AsyncClient) -> httpx.Response:
+        project_id = f"LT{uuid.uuid4().hex[:8]}"
+        response = await client.post(
+            "/upload_requirement_file",
+            data={"project_name": PROJECT_NAME, "project_id": project_id},
+            files={"files": ("requirements.docx", self.document, DOCX_MIME)},
+        )
+        if response.status_code == 200:
+            self.uploaded.append(project_id)
+        return response
+
+    async def review(self, client: httpx.AsyncClient) -> httpx.Response:
+        if not self.uploaded:
+            await self.upload(client)
+        project_id = random.choice(self.uploaded) if self.uploaded else "LTmissing"
+        return await client.post("/review_requirement_specifications",
+                                 json={"project_id": project_id, "project_name": PROJECT_NAME})
+
+    async def chat(self, client: httpx.AsyncClient) -> httpx.Response:
+        path = random.choice(["/requirement_clarification_chat", "/enhance_test_cases_chat"])
+        return await client.post(path, json={"prompt": "Use REQ-0012 as complete; the audit entry must include the IP address."})
+
+    async def hierarchy(self, client: httpx.AsyncClient) -> httpx.Response:
+        return await client.get(f"/firestore/projects/{self.hierarchy_project_id}/hierarchy")
+
+    async def analytics(self, client: httpx.AsyncClient) -> httpx.Response:
+        return await client.get(random.choice(["/analytics/overview", "/analytics/recent-activity"]))
+
+    async def setup(self, client: httpx.AsyncClient) -> None:
+        """Upload a few documents for review calls and find a project for hierarchy calls."""
+        if "upload" in self.mix or "review" in self.mix:
+            for _ in range(self.args.seed_uploads if DOCX_AVAILABLE else 0):
+                await self.upload(client)
+        if "hierarchy" in self.mix and not self.hierarchy_project_id:
+            try:
+                projects = (await client.get("/firestore/projects")).json()
+                self.hierarchy_project_id = projects[0]["project_id"] if isinstance(projects, list) and projects else None
+            except (httpx.HTTPError, ValueError, KeyError):
+                self.hierarchy_project_id = None
+            if not self.hierarchy_project_id:
+                print("⚠️  No Firestore project found; hierarchy calls will measure the not-found path")
+                self.hierarchy_project_id = "LOADTEST_MISSING"
+
+    async def one_request(self, client: httpx.AsyncClient) -> None:
+        name = random.choices(list(self.mix), weights=list(self.mix.values()))[0]
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        started = time.perf_counter()
+        try:
+            response = await getattr(self, name)(client)
+            status = None if response.status_code < 400 else str(response.status_code)
+        except httpx.HTTPError as e:
+            status = type(e).__name__
+        finally:
+            self.in_flight -= 1
+        if status is None:
+            self.latencies[name].append(time.perf_counter() - started)
+        else:
+            self.errors[name][status] = self.errors[name].get(status, 0) + 1
+
+    async def closed_loop(self, client: httpx.AsyncClient, deadline: float) -> None:
+        async def worker():
+            while time.monotonic() < deadline:
+                await self.one_request(client)
+
+        await asyncio.gather(*[worker() for _ in range(self.args.concurrency)])
+
+    async def open_loop(self, client: httpx.AsyncClient, deadline: float) -> None:
+        tasks = set()
+        while time.monotonic() < deadline:
+            if self.in_flight < self.args.max_in_flight:
+                task = asyncio.create_task(self.one_request(client))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            await asyncio.sleep(random.expovariate(self.args.rate))
+        if tasks:
+            await asyncio.gather(*tasks)
+
+    async def run(self, backend_loop: Optional[asyncio.AbstractEventLoop]) -> Dict[str, Any]:
+        limits = httpx.Limits(max_connections=max(self.args.concurrency, self.args.max_in_flight) + 10)
+        async with httpx.AsyncClient(base_url=self.backend_url, timeout=self.args.timeout, limits=limits) as client:
+            await self.setup(client)
+            for name in self.latencies:
+                self.latencies[name].clear()
+                self.errors[name].clear()
+
+            generator_lag = LoopLagProbe()
+            generator_probe = asyncio.create_task(generator_lag.run())
+            backend_lag = LoopLagProbe() if backend_loop else None
+            if backend_lag:
+                backend_probe = asyncio.run_coroutine_threadsafe(backend_lag.run(), backend_loop)
+
+            started = time.monotonic()
+            deadline = started + self.args.duration
+            if self.args.rate:
+                await self.open_loop(client, deadline)
+            else:
+                await self.closed_loop(client, deadline)
+            elapsed = time.monotonic() - started
+
+            generator_lag.running = False
+            await generator_probe
+            if backend_lag:
+                backend_lag.running = False
+                await asyncio.wrap_future(backend_probe)
+
+        return self.report(elapsed, generator_lag, backend_lag)
+
+    def report(self, elapsed: float, generator_lag: LoopLagProbe, backend_lag: Optional[LoopLagProbe]) -> Dict[str, Any]:
+        scenarios = []
+        all_latencies: List[float] = []
+        total_errors = 0
+        for name in self.mix:
+            latencies = self.latencies[name]
+            errors = sum(self.errors[name].values())
+            total_errors += errors
+            all_latencies.extend(latencies)
+            scenarios.append({
+                "scenario": name,
+                "ok": len(latencies),
+                "errors": errors,
+                "errors_by_status": dict(self.errors[name]),
+                "throughput_rps": round(len(latencies) / elapsed, 2),
+                "p50_ms": round(percentile(latencies, 50) * 1000, 1),
+                "p95_ms": round(percentile(latencies, 95) * 1000, 1),
+                "p99_ms": round(percentile(latencies, 99) * 1000, 1),
+            })
+        throughput = len(all_latencies) / elapsed
+        mean_latency = statistics.mean(all_latencies) if all_latencies else 0.0
+        return {
+            "duration_seconds": round(elapsed, 2),
+            "mode": f"open loop {self.args.rate}/s" if self.args.rate else f"closed loop x{self.args.concurrency}",
+            "requests_ok": len(all_latencies),
+            "requests_failed": total_errors,
+            "throughput_rps": round(throughput, 2),
+            "p50_ms": round(percentile(all_latencies, 50) * 1000, 1),
+            "p95_ms": round(percentile(all_latencies, 95) * 1000, 1),
+            "p99_ms": round(percentile(all_latencies, 99) * 1000, 1),
+            # Little's law: average concurrent requests the Backend instance carried
+            "avg_in_flight": round(throughput * mean_latency, 1),
+            "max_in_flight": self.max_in_flight,
+            "backend_loop_lag": backend_lag.summary() if backend_lag else None,
+            "generator_loop_lag": generator_lag.summary(),
+            "scenarios": scenarios,
+        }
+
+
+def print_report(result: Dict[str, Any]) -> None:
+    print(f"\n📊 {result['mode']} for {result['duration_seconds']}s: {result['requests_ok']} ok, "
+          f"{result['requests_failed']} failed, {result['throughput_rps']} req/s")
+    print(f"   latency p50 {result['p50_ms']}ms  p95 {result['p95_ms']}ms  p99 {result['p99_ms']}ms")
+    print(f"   in flight: avg {result['avg_in_flight']}, max {result['max_in_flight']}")
+    if result["backend_loop_lag"]:
+        lag = result["backend_loop_lag"]
+        print(f"   Backend event-loop lag: p50 {lag['p50_ms']}ms  p99 {lag['p99_ms']}ms  max {lag['max_ms']}ms")
+    lag = result["generator_loop_lag"]
+    print(f"   Generator event-loop lag: p50 {lag['p50_ms']}ms  p99 {lag['p99_ms']}ms  max {lag['max_ms']}ms")
+    print(f"\n   {'scenario':<10} {'ok':>7} {'errors':>7} {'req/s':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for row in result["scenarios"]:
+        print(f"   {row['scenario']:<10} {row['ok']:>7} {row['errors']:>7} {row['throughput_rps']:>8} "
+              f"{row['p50_ms']:>9} {row['p95_ms']:>9} {row['p99_ms']:>9}"
+              f"{'  ' + json.dumps(row['errors_by_status']) if row['errors'] else ''}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the Backend API with a stub Agents API")
+    parser.add_argument("--backend-url", help="test a running Backend instead of starting one in-process")
+    parser.add_argument("--agents-url", help="use a running Agents API (or stub) instead of starting the stub")
+    parser.add_argument("--backend-port", type=int, default=18083)
+    parser.add_argument("--agents-port", type=int, default=18082)
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="weighted scenarios, e.g. chat=4,analytics=3")
+    parser.add_argument("--duration", type=float, default=30, help="seconds of load")
+    parser.add_argument("--concurrency", type=int, default=20, help="closed-loop workers")
+    parser.add_argument("--rate", type=float, default=0, help="open-loop arrivals per second (overrides --concurrency)")
+    parser.add_argument("--max-in-flight", type=int, default=500, help="open-loop cap on outstanding requests")
+    parser.add_argument("--timeout", type=float, default=120)
+    parser.add_argument("--project-id", help="Firestore project for hierarchy calls (default: first project found)")
+    parser.add_argument("--seed-uploads", type=int, default=3, help="documents uploaded before the run for review calls")
+    parser.add_argument("--upload-paragraphs", type=int, default=200, help="paragraphs in the uploaded DOCX")
+    parser.add_argument("--agents-latency-ms", type=float, default=800)
+    parser.add_argument("--agents-jitter-ms", type=float, default=400)
+    parser.add_argument("--agents-response-bytes", type=int, default=2000)
+    parser.add_argument("--agents-busy-rate", type=float, default=0)
+    parser.add_argument("--agents-script", help="stub_agents_api.py rule script (JSON)")
+    parser.add_argument("--allow-real-backends", action="store_true",
+                        help="let the in-process Backend use real Firestore / Cloud Storage when no emulator is set")
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+
+    if not args.backend_url:
+        from dotenv import load_dotenv
+
+        # What app.py will see when it loads .env at import
+        load_dotenv()
+        real = [service for service, variable in EMULATOR_HOSTS.items() if not os.getenv(variable)]
+        if real and not args.allow_real_backends:
+            sys.exit(f"Refusing to load test against real {' and '.join(real)}: set "
+                     f"{', '.join(EMULATOR_HOSTS[service] for service in real)} to an emulator "
+                     f"or pass --allow-real-backends")
+        # Keep the background Jira sync away from Jira while the test runs
+        os.environ["JIRA_SYNC_INTERVAL_SECONDS"] = "0"
+
+    servers = []
+    agents_url = args.agents_url
+    if not agents_url:
+        from stub_agents_api import create_app, load_script
+
+        stub_args = argparse.Namespace(latency_ms=args.agents_latency_ms, jitter_ms=args.agents_jitter_ms,
+                                       response_bytes=args.agents_response_bytes, busy_rate=args.agents_busy_rate)
+        servers.append(ServerThread(create_app(load_script(args.agents_script, stub_args)), args.agents_port).start())
+        agents_url = servers[-1].url
+
+    backend_url = args.backend_url
+    backend_loop = None
+    if not backend_url:
+        # app.py reads the Agents URLs at import time
+        os.environ["AGENTS_API_URL"] = f"{agents_url}/query"
+        os.environ["RESET_AGENT_SESSION_API_URL"] = f"{agents_url}/reset-session"
+        os.environ["AGENTS_PARALLEL_API_URL"] = f"{agents_url}/generate_parallel"
+        os.environ["AGENTS_PUSH_API_URL"] = f"{agents_url}/push_artifacts"
+        from app import app
+
+        servers.append(ServerThread(app, args.backend_port).start())
+        backend_url = servers[-1].url
+        backend_loop = servers[-1].loop
+
+    print(f"🚀 Load testing {backend_url} (Agents API: {agents_url}) with mix {args.mix}")
+    try:
+        result = asyncio.run(LoadTest(args, backend_url).run(backend_loop))
+    finally:
+        for server in reversed(servers):
+            server.stop()
+
+    print_report(result)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"backend_url": backend_url, "agents_url": agents_url, "config": vars(args), "result": result}, f, indent=2)
+        print(f"\n📋 Results written to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,15 @@
+"""
+Structured logging for the Backend.
+
+Request-path logs go through category loggers (`get_logger("agents")` is the
+"backend.agents" logger) instead of print(). The JSON/text format, the queue
+and writer thread, and the LOG_* settings are shared with the other services
+(medassure_telemetry.logs); e.g. LOG_LEVELS="agents=DEBUG,upload=WARNING" or
+LOG_SAMPLE_RATES="agents=0.1".
+"""
+
+from medassure_telemetry import logs as shared_logs
+# Re-exported for the rest of the service
+from medassure_telemetry.logs import get_logger
+
+shared_logs.configure("backend")
@@ -0,0 +1,119 @@
+"""
+Prometheus metrics for the Backend.
+
+GET /metrics exposes:
+
+- backend_http_request_duration_seconds{method,route,status}: latency per route
+  template, and backend_http_requests_in_flight{method},
+- backend_firestore_documents_read_total{operation} and
+  backend_firestore_documents_written_total{operation},
+- backend_firestore_reads_per_request{route} and
+  backend_firestore_writes_per_request{route}: documents each request read and wrote,
+- backend_agents_api_call_duration_seconds{endpoint,status} and
+  backend_agents_api_calls_in_flight{endpoint}: calls to the Agents API,
+- backend_jira_api_calls_total{endpoint,status} and
+  backend_jira_api_call_duration_seconds{endpoint}: Jira calls of the status sync.
+
+Firestore operations outside a request (the Jira sync loop, background jobs)
+only count towards the totals. Metrics are optional: without
+prometheus_client, or with METRICS_ENABLED=false, every helper is a no-op and
+/metrics is not registered.
+"""
+
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator
+
+from medassure_telemetry import metrics as shared_metrics
+from medassure_telemetry.metrics import METRICS_ENABLED
+
+if METRICS_ENABLED:
+    from prometheus_client import Counter, Gauge, Histogram
+
+HTTP_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+
+documents = shared_metrics.DocumentCounters("backend_firestore", "request", "route")
+record_reads = documents.record_reads
+record_writes = documents.record_writes
+counted_reads = documents.counted_reads
+
+if METRICS_ENABLED:
+    HTTP_DURATION = Histogram("backend_http_request_duration_seconds", "HTTP request latency",
+                              ["method", "route", "status"], buckets=HTTP_BUCKETS)
+    HTTP_IN_FLIGHT = Gauge("backend_http_requests_in_flight", "HTTP requests being handled", ["method"])
+    AGENTS_DURATION = Histogram("backend_agents_api_call_duration_seconds", "Agents API call latency",
+                                ["endpoint", "status"], buckets=HTTP_BUCKETS)
+    AGENTS_IN_FLIGHT = Gauge("backend_agents_api_calls_in_flight", "Agents API calls awaiting a response", ["endpoint"])
+    JIRA_CALLS = Counter("backend_jira_api_calls_total", "Jira REST requests sent", ["endpoint", "status"])
+    JIRA_DURATION = Histogram("backend_jira_api_call_duration_seconds", "Jira REST request latency", ["endpoint"],
+                              buckets=HTTP_BUCKETS)
+
+
+@contextmanager
+def agents_api_call(endpoint: str) -> Iterator[Dict[str, str]]:
+    """Time a call to the Agents API; the caller sets call["status"] once it has a response."""
+    call = {"status": "error"}
+    if not METRICS_ENABLED:
+        yield call
+        return
+    AGENTS_IN_FLIGHT.labels(endpoint).inc()
+    started = time.perf_counter()
+    try:
+        yield call
+    finally:
+        AGENTS_IN_FLIGHT.labels(endpoint).dec()
+        AGENTS_DURATION.labels(endpoint, call["status"]).observe(time.perf_counter() - started)
+
+
+def record_jira_call(endpoint: str, status: str, seconds: float) -> None:
+    if METRICS_ENABLED:
+        JIRA_CALLS.labels(endpoint, status).inc()
+        JIRA_DURATION.labels(endpoint).observe(seconds)
+
+
+class HttpMetricsMiddleware:
+    """ASGI middleware recording latency per route template, requests in flight and Firestore I/O per request."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = {"code": 500}
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        method = scope["method"]
+        HTTP_IN_FLIGHT.labels(method).inc()
+        started = time.perf_counter()
+        with documents.unit() as io:
+            try:
+                await self.app(scope, receive, send_with_status)
+            finally:
+                HTTP_IN_FLIGHT.labels(method).dec()
+                # The router stores the matched route in the scope; unmatched paths share one label
+                route = getattr(scope.get("route"), "path", "unmatched")
+                HTTP_DURATION.labels(method, route, str(status["code"])).observe(time.perf_counter() - started)
+                documents.observe(route, io)
+
+
+def install(app) -> None:
+    """Add the HTTP middleware and GET /metrics to a FastAPI app."""
+    if not METRICS_ENABLED:
+        shared_metrics.report_disabled()
+        return
+
+    from fastapi import Response
+
+    app.add_middleware(HttpMetricsMiddleware)
+
+    @app.get("/metrics", include_in_schema=False)
+    async def prometheus_metrics():
+        body, content_type = shared_metrics.exposition()
+        return Response(body, media_type=content_type)
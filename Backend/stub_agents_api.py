@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Scripted stand-in for the Agents API, for Backend load tests.
+
+Serves the endpoints the Backend calls (/query, /generate_parallel,
+/push_artifacts, /reset-session, /health) without running any model. Each
+response waits a configurable latency and returns a response of a
+configurable size, so Backend throughput can be measured independently of
+Gemini.
+
+Behaviour is chosen per request by a script of rules; the first rule whose
+`route` and `match` (a substring of the query) both fit wins:
+
+    {
+      "default": {"latency_ms": 800, "jitter_ms": 400, "response_bytes": 2000},
+      "rules": [
+        {"match": "requirement_reviewer_agent", "latency_ms": 6000, "response_bytes": 12000},
+        {"match": "enhance_testcase_agent", "latency_ms": 2500, "response_bytes": 3000},
+        {"route": "/generate_parallel", "latency_ms": 20000, "response_bytes": 60000},
+        {"route": "/push_artifacts", "latency_ms": 4000, "response_bytes": 1500, "busy_rate": 0.05}
+      ]
+    }
+
+`busy_rate` answers that fraction of requests with 429 + Retry-After, like
+the Agents admission control does under load.
+
+Usage:
+    python stub_agents_api.py --port 8082 --latency-ms 800 --response-bytes 2000
+    python stub_agents_api.py --script stub_script.json
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import time
+from typing import Any, Dict, Optional
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+FILLER = (
+    "Epic E001 covers patient record management. Feature F001 handles signing; use case UC001 "
+    "verifies that signed records show an audit entry. "
+)
+
+
+class StubScript:
+    """Picks latency, response size and busy rate for a request."""
+
+    def __init__(self, script: Optional[Dict[str, Any]] = None, latency_ms: float = 800, jitter_ms: float = 400,
+                 response_bytes: int = 2000, busy_rate: float = 0):
+        script = script or {}
+        self.default = {"latency_ms": latency_ms, "jitter_ms": jitter_ms, "response_bytes": response_bytes,
+                        "busy_rate": busy_rate, **(script.get("default") or {})}
+        self.rules = script.get("rules") or []
+        self.requests: Dict[str, int] = {}
+        self.busy = 0
+        self.started = time.monotonic()
+
+    def behaviour(self, route: str, query: str) -> Dict[str, Any]:
+        for rule in self.rules:
+            if rule.get("route") not in (None, route):
+                continue
+            if rule.get("match") and rule["match"] not in query:
+                continue
+            return {**self.default, **rule}
+        return self.default
+
+    def stats(self) -> Dict[str, Any]:
+        return {"requests": dict(self.requests), "requests_total": sum(self.requests.values()), "busy": self.busy,
+                "uptime_seconds": round(time.monotonic() - self.started, 3)}
+
+
+def _response_text(size: int) -> str:
+    return (FILLER * (size // len(FILLER) + 1))[:size]
+
+
+def create_app(script: StubScript) -> FastAPI:
+    app = FastAPI(title="Stub Agents API")
+
+    async def respond(route: str, request: Request):
+        try:
+            query = (await request.json()).get("query", "")
+        except ValueError:
+            query = ""
+        script.requests[route] = script.requests.get(route, 0) + 1
+        behaviour = script.behaviour(route, query)
+        if behaviour.get("busy_rate") and random.random() < behaviour["busy_rate"]:
+            script.busy += 1
+            return JSONResponse({"detail": "Server busy"}, status_code=429, headers={"Retry-After": "1"})
+        await asyncio.sleep((behaviour["latency_ms"] + random.uniform(0, behaviour.get("jitter_ms", 0))) / 1000)
+        return {"response": _response_text(int(behaviour["response_bytes"])), "debug_info": f"stub {route}"}
+
+    @app.post("/query")
+    async def query(request: Request):
+        return await respond("/query", request)
+
+    @app.post("/generate_parallel")
+    async def generate_parallel(request: Request):
+        return await respond("/generate_parallel", request)
+
+    @app.post("/push_artifacts")
+    async def push_artifacts(request: Request):
+        return await respond("/push_artifacts", request)
+
+    @app.post("/reset-session")
+    async def reset_session():
+        script.requests["/reset-session"] = script.requests.get("/reset-session", 0) + 1
+        return {"message": "Session reset", "success": True}
+
+    @app.get("/health")
+    async def health():
+        return {"status": "healthy", "service": "stub-agents-api"}
+
+    @app.get("/_stub/stats")
+    async def stats():
+        return script.stats()
+
+    return app
+
+
+def load_script(path: Optional[str], args) -> StubScript:
+    data = None
+    if path:
+        with open(path) as f:
+            data = json.load(f)
+    return StubScript(data, args.latency_ms, args.jitter_ms, args.response_bytes, args.busy_rate)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a scripted stub of the Agents API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8082)
+    parser.add_argument("--script", help="JSON file with default behaviour and per-request rules")
+    parser.add_argument("--latency-ms", type=float, default=800)
+    parser.add_argument("--jitter-ms", type=float, default=400)
+    parser.add_argument("--response-bytes", type=int, default=2000)
+    parser.add_argument("--busy-rate", type=float, default=0, help="fraction of requests answered with 429")
+    args = parser.parse_args()
+
+    import uvicorn
+
+    script = load_script(args.script, args)
+    print(f"🚀 Stub Agents API on http://{args.host}:{args.port} ({len(script.rules)} rules, default {script.default})")
+    uvicorn.run(create_app(script), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
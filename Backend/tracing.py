@@ -0,0 +1,31 @@
+"""
+OpenTelemetry tracing for the Backend.
+
+Incoming requests become server spans (named after the route template).
+Calls to the Agents API become client spans and carry the W3C trace context
+in a traceparent header, so the Agents API, and through it the MCP servers,
+record their spans in the same trace. Firestore operations and the Jira
+status sync's requests become client spans as well (see `traced`).
+
+The exporter, sampling, span helpers and the ASGI server span middleware are
+shared with the other services (medassure_telemetry.tracing, which also lists
+the TRACING_* settings); the service name defaults to medassure-backend.
+"""
+
+from typing import Any
+
+from medassure_telemetry import tracing as shared_tracing
+# Re-exported for the rest of the service
+from medassure_telemetry.tracing import inject_headers, set_attributes, set_error, span
+
+tracer = shared_tracing.configure("medassure-backend", "medassure.backend")
+
+
+def traced(name: str, kind: str = "client", **attributes: Any):
+    """Decorator running a sync or async Firestore operation in a span."""
+    return shared_tracing.traced(name, kind, **{"db.system": "firestore", **attributes})
+
+
+def install(app) -> None:
+    """Set up tracing and add the server span middleware to a FastAPI app."""
+    shared_tracing.install_fastapi(app)
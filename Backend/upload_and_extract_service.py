@@ -7,6 +7,10 @@ from docx import Document
 from google.cloud import storage
 from fastapi import HTTPException, UploadFile
 
+import logs
+
+upload_log = logs.get_logger("upload")
+
 
 class UploadAndExtractService:
     """Service for handling file uploads and text extraction."""
@@ -117,19 +121,16 @@ class UploadAndExtractService:
     def upload_file_to_cloud_storage(self, file_path: str, destination_blob_name: str) -> bool:
         """Upload file to Google Cloud Storage."""
         if not self.storage_client or not self.bucket:
-            if self.debug:
-                print("Cloud storage not available, file stored locally only")
+            upload_log.debug("Cloud storage not available, file stored locally only")
             return True
         
         try:
             blob = self.bucket.blob(destination_blob_name)
             blob.upload_from_filename(file_path)
-            if self.debug:
-                print(f"File uploaded to cloud storage: {destination_blob_name}")
+            upload_log.debug("File uploaded to cloud storage", extra={"blob": destination_blob_name})
             return True
         except Exception as e:
-            if self.debug:
-                print(f"Error uploading to cloud storage: {e}")
+            upload_log.warning("Error uploading to cloud storage", extra={"blob": destination_blob_name, "error": str(e)})
             return False
     
     async def process_files(
@@ -165,10 +166,6 @@ class UploadAndExtractService:
                 # Upload to cloud storage
                 destination_path = f"{project_name}_{project_id}/{file.filename}"
                 
-                if self.debug:
-                    print(f"Generated folder path for project: {project_name}_{project_id}")
-                    print(f"Project ID: {project_id}")
-                
                 upload_success = self.upload_file_to_cloud_storage(temp_file_path, destination_path)
                 
                 processed_files.append({
@@ -182,12 +179,12 @@ class UploadAndExtractService:
                 
                 all_extracted_text += f"\n\n--- Content from {file.filename} ---\n{extracted_text}"
                 
-                if self.debug:
-                    print(f"Processed file: {file.filename}, extracted {len(extracted_text)} characters")
+                upload_log.debug("Processed file", extra={"filename": file.filename, "bytes": len(content),
+                                                          "text_chars": len(extracted_text), "cloud_path": destination_path,
+                                                          "upload_success": upload_success})
                 
             except Exception as e:
-                if self.debug:
-                    print(f"Error processing file {file.filename}: {str(e)}")
+                upload_log.warning("Error processing file", extra={"filename": file.filename, "error": str(e)})
                 raise HTTPException(
                     status_code=500, 
                     detail=f"Error processing file {file.filename}: {str(e)}"
@@ -0,0 +1,376 @@
+#!/usr/bin/env python3
+"""
+Firestore emulator benchmark for the Firestore data layer.
+
+Seeds synthetic projects of configurable size into the local Firestore
+emulator and times the operations the agents and the Backend depend on:
+
+- bulk_write_epics_structure (MCP tool, into a fresh project each run)
+- get_all_projects and get_project_statistics (FirestoreClient)
+- update_test_case (MCP tool, random test case each run)
+- search_test_cases (FirestoreClient)
+- hierarchy conversion (raw project document -> Project model)
+- get_all_projects, get_project_statistics and convert_firestore_to_hierarchy
+  of the Backend's FirestoreService, when the Backend's dependencies are
+  importable (--backend-dir, default ../../Backend)
+
+For each operation it reports p50 / p95 latency together with the gRPC
+calls, documents read, documents written and request / response bytes per
+call, counted by a client-side interceptor on the emulator channel.
+
+The emulator is required; the script refuses to run against a real
+database. Start it with:
+    gcloud emulators firestore start --host-port=localhost:8681
+    export FIRESTORE_EMULATOR_HOST=localhost:8681
+
+Usage:
+    python benchmark_firestore.py
+    python benchmark_firestore.py --projects 20 --epics 5 --features 4 --use-cases 4 --test-cases 6 --runs 20
+    python benchmark_firestore.py --json firestore_bench.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import sys
+import time
+import uuid
+from typing import Any, Callable, Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+if not os.getenv("FIRESTORE_EMULATOR_HOST"):
+    sys.exit("FIRESTORE_EMULATOR_HOST is not set; start the Firestore emulator first (see the module docstring)")
+# Keep benchmark data away from the application's collection, and point the
+# MCP client and the Backend service at the same emulator project
+os.environ.setdefault("PROJECTS_COLLECTION", "bench_testcase_projects")
+os.environ.setdefault("FIRESTORE_PROJECTS_COLLECTION", os.environ["PROJECTS_COLLECTION"])
+os.environ.setdefault("GOOGLE_CLOUD_PROJECT", "medassure-bench")
+os.environ.setdefault("FIRESTORE_PROJECT_ID", os.environ["GOOGLE_CLOUD_PROJECT"])
+
+import grpc
+
+# Top-level modules that exist both here and in the Backend
+SHARED_MODULE_NAMES = ("metrics", "tracing", "logs", "medassure_telemetry")
+
+
+def _shared_modules() -> List[str]:
+    """Loaded modules named in SHARED_MODULE_NAMES, with their submodules."""
+    return [name for name in sys.modules if name.split(".", 1)[0] in SHARED_MODULE_NAMES]
+
+
+def _message_size(message: Any) -> int:
+    pb = getattr(message, "_pb", message)
+    try:
+        return pb.ByteSize()
+    except AttributeError:
+        return 0
+
+
+def _has_field(message: Any, field: str) -> bool:
+    pb = getattr(message, "_pb", message)
+    try:
+        return pb.HasField(field)
+    except (AttributeError, ValueError):
+        return False
+
+
+class RpcCounter(grpc.UnaryUnaryClientInterceptor, grpc.UnaryStreamClientInterceptor):
+    """Counts Firestore RPCs, documents read / written and bytes on the wire."""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self) -> None:
+        self.calls = 0
+        self.reads = 0
+        self.writes = 0
+        self.bytes_sent = 0
+        self.bytes_received = 0
+
+    def snapshot(self) -> Dict[str, int]:
+        return {"rpcs": self.calls, "reads": self.reads, "writes": self.writes,
+                "bytes_sent": self.bytes_sent, "bytes_received": self.bytes_received}
+
+    def _request(self, method: str, request: Any) -> None:
+        self.calls += 1
+        self.bytes_sent += _message_size(request)
+        if method.endswith("/Commit") or method.endswith("/BatchWrite"):
+            self.writes += len(getattr(request, "writes", []) or [])
+
+    def _response(self, method: str, response: Any) -> None:
+        self.bytes_received += _message_size(response)
+        if method.endswith("/GetDocument"):
+            self.reads += 1
+        elif method.endswith("/RunQuery") and _has_field(response, "document"):
+            self.reads += 1
+        elif method.endswith("/BatchGetDocuments") and _has_field(response, "found"):
+            self.reads += 1
+
+    def intercept_unary_unary(self, continuation, client_call_details, request):
+        self._request(client_call_details.method, request)
+        outcome = continuation(client_call_details, request)
+        try:
+            self._response(client_call_details.method, outcome.result())
+        except Exception:
+            pass
+        return outcome
+
+    def intercept_unary_stream(self, continuation, client_call_details, request):
+        self._request(client_call_details.method, request)
+        return _CountingStream(continuation(client_call_details, request), client_call_details.method, self)
+
+
+class _CountingStream:
+    """Wraps a streaming call so every response message is counted."""
+
+    def __init__(self, call, method: str, counter: RpcCounter):
+        self._call = call
+        self._method = method
+        self._counter = counter
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        message = next(self._call)
+        self._counter._response(self._method, message)
+        return message
+
+    def __getattr__(self, name):
+        return getattr(self._call, name)
+
+
+def instrument(client, counter: RpcCounter) -> RpcCounter:
+    """Route a google.cloud.firestore.Client's emulator channel through `counter`."""
+    create_channel = client._emulator_channel
+    client._emulator_channel = lambda transport: grpc.intercept_channel(create_channel(transport), counter)
+    client._firestore_api_internal = None
+    return counter
+
+
+def make_epics(epics: int, features: int, use_cases: int, test_cases: int) -> List[Dict[str, Any]]:
+    """A synthetic hierarchy in the shape the generation pipeline produces."""
+    hierarchy = []
+    for e in range(1, epics + 1):
+        epic = {"epic_id": f"E{e:03d}", "epic_name": f"Epic {e}: patient records", "description": "Synthetic epic",
+                "priority": "High", "jira_status": "Not Pushed", "features": []}
+        for f in range(1, features + 1):
+            feature = {"feature_id": f"F{e:03d}{f:02d}", "feature_name": f"Feature {e}.{f}", "description": "Synthetic feature",
+                       "priority": "Medium", "jira_status": "Not Pushed", "use_cases": []}
+            for u in range(1, use_cases + 1):
+                use_case = {"use_case_id": f"UC{e:03d}{f:02d}{u:02d}", "title": f"Use case {e}.{f}.{u}",
+                            "description": "Clinician reviews and signs a patient record",
+                            "acceptance_criteria": ["Record is saved", "Audit entry is written"],
+                            "test_scenarios_outline": ["Happy path", "Missing signature", "Expired session"],
+                            "compliance_mapping": ["HIPAA 164.312(b)", "IEC 62304 5.1"],
+                            "model_explanation": "Derived from requirement section 4.2 " * 3,
+                            "review_status": "Approved", "jira_status": "Not Pushed", "test_cases": []}
+                for t in range(1, test_cases + 1):
+                    use_case["test_cases"].append({
+                        "test_case_id": f"TC{e:03d}{f:02d}{u:02d}{t:02d}",
+                        "test_case_title": f"Verify signed record {e}.{f}.{u}.{t}",
+                        "preconditions": ["User is logged in as clinician", "Patient record exists"],
+                        "test_steps": ["Open the patient record", "Edit the notes", "Sign the record", "Reload the page"],
+                        "expected_result": "The record shows the signature and an audit entry exists",
+                        "test_type": "Functional",
+                        "compliance_mapping": ["HIPAA 164.312(c)"],
+                        "model_explanation": "Covers integrity controls for signed records",
+                        "review_status": "Approved",
+                        "jira_status": "Not Pushed",
+                    })
+                feature["use_cases"].append(use_case)
+            epic["features"].append(feature)
+        hierarchy.append(epic)
+    return hierarchy
+
+
+def as_stored(epics: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Add the field names the Project model expects next to the generated ones."""
+    for epic in epics:
+        for feature in epic["features"]:
+            for use_case in feature["use_cases"]:
+                use_case["use_case_title"] = use_case["title"]
+                for test_case in use_case["test_cases"]:
+                    test_case["title"] = test_case["test_case_title"]
+    return epics
+
+
+def load_backend(backend_dir: str):
+    """The Backend's FirestoreService and hierarchy conversion, or (None, None) if they cannot be imported.
+
+    The Backend and this server both have top-level modules named `metrics`
+    and `tracing`, and their own copy of medassure_telemetry, which holds
+    per-service settings. The Backend is imported with its own copies, found
+    first on sys.path, and this server's modules are put back in sys.modules
+    afterwards.
+    """
+    own = {name: sys.modules.pop(name) for name in _shared_modules()}
+    backend_dir = os.path.abspath(backend_dir)
+    sys.path.insert(0, backend_dir)
+    try:
+        from firestore_service import firestore_service
+        from app import convert_firestore_to_hierarchy
+    except ImportError as e:
+        print(f"⚠️  Skipping Backend FirestoreService benchmarks: {e}")
+        return None, None
+    finally:
+        sys.path.remove(backend_dir)
+        for name in _shared_modules():
+            sys.modules.pop(name)
+        sys.modules.update(own)
+    if not firestore_service.is_available():
+        print("⚠️  Skipping Backend FirestoreService benchmarks: Firestore client not initialized")
+        return None, None
+    return firestore_service, convert_firestore_to_hierarchy
+
+
+def percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))]
+
+
+async def measure(name: str, runs: int, counter: RpcCounter, operation: Callable[[], Any]) -> Dict[str, Any]:
+    durations: List[float] = []
+    errors = 0
+    first_error = None
+    counter.reset()
+    for _ in range(runs):
+        started = time.perf_counter()
+        try:
+            result = operation()
+            if asyncio.iscoroutine(result):
+                result = await result
+            if isinstance(result, dict) and result.get("success") is False:
+                errors += 1
+                first_error = first_error or str(result.get("error"))
+        except Exception as e:
+            errors += 1
+            first_error = first_error or f"{type(e).__name__}: {e}"
+        durations.append(time.perf_counter() - started)
+
+    totals = counter.snapshot()
+    row = {
+        "operation": name,
+        "runs": runs,
+        "errors": errors,
+        "first_error": first_error,
+        "p50_ms": round(percentile(durations, 50) * 1000, 2),
+        "p95_ms": round(percentile(durations, 95) * 1000, 2),
+        "mean_ms": round(statistics.mean(durations) * 1000, 2),
+        **{f"{key}_per_call": round(value / runs, 1) for key, value in totals.items()},
+    }
+    print(f"{name:<40} p50 {row['p50_ms']:>9.2f}ms  p95 {row['p95_ms']:>9.2f}ms | {row['rpcs_per_call']:>7} rpcs "
+          f"{row['reads_per_call']:>7} reads {row['writes_per_call']:>7} writes | "
+          f"{row['bytes_sent_per_call'] / 1024:>8.1f} KiB out {row['bytes_received_per_call'] / 1024:>8.1f} KiB in"
+          f"{f' | {errors} errors' if errors else ''}")
+    if first_error:
+        print(f"   ⚠️  {name}: {first_error}")
+    return row
+
+
+async def run_benchmark(args) -> List[Dict[str, Any]]:
+    import main as firestore_mcp
+
+    firestore_client = firestore_mcp.firestore_client
+    counter = instrument(firestore_client.client, RpcCounter())
+    firestore_service, convert_firestore_to_hierarchy = load_backend(args.backend_dir)
+    if firestore_service is not None:
+        instrument(firestore_service.client, counter)
+    collection = firestore_client.client.collection(firestore_client.projects_collection)
+
+    # Seed projects directly; bulk_write_epics_structure is measured separately
+    print(f"🌱 Seeding {args.projects} projects ({args.epics}x{args.features}x{args.use_cases}x{args.test_cases} hierarchy)")
+    project_ids = []
+    for index in range(args.projects):
+        project_id = firestore_client.create_project({
+            "project_name": f"Benchmark project {index}",
+            "description": "Synthetic benchmark data",
+            "epics": as_stored(make_epics(args.epics, args.features, args.use_cases, args.test_cases)),
+        })
+        project_ids.append(project_id)
+    test_case_paths = [
+        (epic["epic_id"], feature["feature_id"], use_case["use_case_id"], test_case["test_case_id"])
+        for epic in make_epics(args.epics, args.features, args.use_cases, args.test_cases)
+        for feature in epic["features"]
+        for use_case in feature["use_cases"]
+        for test_case in use_case["test_cases"]
+    ]
+    sample_document = collection.document(project_ids[0]).get().to_dict()
+    print(f"   Project document size: {len(json.dumps(sample_document, default=str)) / 1024:.1f} KiB (JSON)")
+
+    bulk_epics = make_epics(args.bulk_epics, args.features, args.use_cases, args.test_cases)
+
+    def bulk_write():
+        project_id = firestore_client.create_project({"project_name": f"Bulk {uuid.uuid4().hex[:6]}", "epics": []})
+        project_ids.append(project_id)
+        # @mcp.tool() wraps the function in a FunctionTool; .fn is the coroutine function itself
+        return firestore_mcp.bulk_write_epics_structure.fn(project_id, bulk_epics)
+
+    def update_random_test_case():
+        epic_id, feature_id, use_case_id, test_case_id = random.choice(test_case_paths)
+        return firestore_mcp.update_test_case.fn(random.choice(project_ids[:args.projects]), epic_id, feature_id, use_case_id,
+                                              test_case_id, comments=f"benchmark {uuid.uuid4().hex[:6]}")
+
+    results = [
+        await measure("bulk_write_epics_structure", args.bulk_runs, counter, bulk_write),
+        await measure("FirestoreClient.get_all_projects", args.runs, counter, firestore_client.get_all_projects),
+        await measure("FirestoreClient.get_project_statistics", args.runs, counter, firestore_client.get_project_statistics),
+        await measure("update_test_case", args.runs, counter, update_random_test_case),
+        await measure("FirestoreClient.search_test_cases", args.runs, counter,
+                      lambda: firestore_client.search_test_cases(random.choice(project_ids[:args.projects]), "signed record 1.")),
+        await measure("FirestoreClient.hierarchy_conversion", args.runs, counter,
+                      lambda: firestore_client._create_project_from_dict(dict(sample_document), project_ids[0])),
+    ]
+    if firestore_service is not None:
+        results += [
+            await measure("FirestoreService.get_all_projects", args.runs, counter, firestore_service.get_all_projects),
+            await measure("FirestoreService.get_project_statistics", args.runs, counter,
+                          firestore_service.get_project_statistics),
+            await measure("convert_firestore_to_hierarchy", args.runs, counter,
+                          lambda: convert_firestore_to_hierarchy({**sample_document, "project_id": project_ids[0]})),
+        ]
+
+    if not args.keep:
+        for project_id in project_ids:
+            collection.document(project_id).delete()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the Firestore MCP data layer against the emulator")
+    parser.add_argument("--projects", type=int, default=10, help="projects to seed")
+    parser.add_argument("--epics", type=int, default=4, help="epics per seeded project")
+    parser.add_argument("--features", type=int, default=3, help="features per epic")
+    parser.add_argument("--use-cases", type=int, default=3, help="use cases per feature")
+    parser.add_argument("--test-cases", type=int, default=5, help="test cases per use case")
+    parser.add_argument("--bulk-epics", type=int, default=2, help="epics per bulk_write_epics_structure call")
+    parser.add_argument("--runs", type=int, default=20, help="runs per read/update operation")
+    parser.add_argument("--bulk-runs", type=int, default=3, help="bulk_write_epics_structure runs")
+    parser.add_argument("--backend-dir", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "Backend"),
+                        help="Backend folder, for the FirestoreService benchmarks")
+    parser.add_argument("--keep", action="store_true", help="keep the seeded projects")
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+
+    print(f"🚀 Firestore benchmark against emulator {os.environ['FIRESTORE_EMULATOR_HOST']} "
+          f"(collection {os.environ['PROJECTS_COLLECTION']})")
+    results = asyncio.run(run_benchmark(args))
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"config": vars(args), "results": results}, f, indent=2)
+        print(f"📋 Results written to {args.json}")
+    # Timings of failed calls are meaningless; do not let them pass as results
+    failed = [row["operation"] for row in results if row["errors"]]
+    if failed:
+        sys.exit(f"❌ {len(failed)} operations had errors: {', '.join(failed)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -5,10 +5,11 @@ This module provides comprehensive CRUD operations for managing test projects,
 epics, features, use cases, and test cases in Google Cloud Firestore.
 """
 
+import copy
 import logging
 import os
 from datetime import datetime
-from typing import List, Optional, Dict, Any, Union
+from typing import List, Optional, Dict, Any, Tuple, Union
 from uuid import uuid4
 
 from google.cloud import firestore
@@ -18,6 +19,9 @@ from dotenv import load_dotenv
 # Load environment variables
 load_dotenv()
 
+from metrics import counted_reads, record_reads, record_writes
+from tracing import traced
+from write_queue import Mutation, ProjectNotFound, ProjectWriteQueue
 from models import (
     Project, Epic, Feature, UseCase, TestCase,
     ProjectSummary, CreateProjectRequest, UpdateProjectRequest,
@@ -37,7 +41,29 @@ class FirestoreClient:
             database=os.getenv("FIRESTORE_DATABASE_Name", "medassureaifirestoredb")
         )
         self.projects_collection = os.getenv("PROJECTS_COLLECTION", "testcase_projects")
+        # Tool writes to a project document are merged into one transaction per batch
+        self.write_queue = ProjectWriteQueue(
+            self.client,
+            self.projects_collection,
+            debounce_seconds=float(os.getenv("FIRESTORE_WRITE_DEBOUNCE_MS", "50")) / 1000,
+            max_batch=int(os.getenv("FIRESTORE_WRITE_MAX_BATCH", "100"))
+        )
         
+    @staticmethod
+    def _add_or_update(items: List[Dict[str, Any]], data: Dict[str, Any], key: str, upsert: bool,
+                       keep: Tuple[str, ...] = ('created_at',)) -> Dict[str, Any]:
+        """Append a copy of `data` to `items`, or with `upsert` update the item whose `key` matches.
+
+        An updated item keeps its children and the `keep` fields.
+        """
+        if upsert and data.get(key):
+            for item in items:
+                if item.get(key) == data[key]:
+                    item.update(copy.deepcopy({field: value for field, value in data.items() if field not in keep}))
+                    return item
+        items.append(copy.deepcopy(data))
+        return items[-1]
+    
     def _generate_id(self, prefix: str = "") -> str:
         """Generate unique ID with optional prefix"""
         return f"{prefix}{uuid4().hex[:8]}" if prefix else uuid4().hex[:8]
@@ -47,11 +73,13 @@ class FirestoreClient:
         data['updated_at'] = datetime.utcnow()
         return data
     
+    @traced("Firestore get_project_data")
     def _safe_get_project_data(self, project_id: str) -> Optional[Dict[str, Any]]:
         """Safely get project data from Firestore"""
         try:
             doc_ref = self.client.collection(self.projects_collection).document(project_id)
             doc = doc_ref.get()
+            record_reads("get")
             
             if not doc.exists:
                 return None
@@ -85,11 +113,13 @@ class FirestoreClient:
         """Get current timestamp"""
         return datetime.utcnow()
     
+    @traced("Firestore update_project_simple")
     def update_project_simple(self, project_id: str, updates: Dict[str, Any]) -> bool:
         """Update project with dictionary data"""
         try:
             doc_ref = self.client.collection(self.projects_collection).document(project_id)
             doc = doc_ref.get()
+            record_reads("get")
             
             if not doc.exists:
                 logger.warning(f"Project {project_id} not found for update")
@@ -97,6 +127,7 @@ class FirestoreClient:
             
             # Update the document
             doc_ref.update(updates)
+            record_writes("update")
             logger.info(f"Updated project: {project_id}")
             return True
             
@@ -108,6 +139,7 @@ class FirestoreClient:
     # PROJECT OPERATIONS
     # ================================
     
+    @traced("Firestore create_project")
     def create_project(self, project_data: Dict[str, Any]) -> str:
         """Create a new project from dictionary data"""
         try:
@@ -121,6 +153,7 @@ class FirestoreClient:
             # Store in Firestore
             doc_ref = self.client.collection(self.projects_collection).document(project_id)
             doc_ref.set(project_data)
+            record_writes("set")
             
             logger.info(f"Created project: {project_id}")
             return project_id
@@ -129,6 +162,7 @@ class FirestoreClient:
             logger.error(f"Error creating project: {e}")
             raise
     
+    @traced("Firestore create_project_async")
     async def create_project_async(self, request: CreateProjectRequest, created_by: Optional[str] = None) -> Project:
         """Create a new project"""
         try:
@@ -149,6 +183,7 @@ class FirestoreClient:
             # Store in Firestore
             doc_ref = self.client.collection(self.projects_collection).document(project_id)
             doc_ref.set(project.dict())
+            record_writes("set")
             
             logger.info(f"Created project: {project_id}")
             return project
@@ -157,11 +192,13 @@ class FirestoreClient:
             logger.error(f"Error creating project: {e}")
             raise
     
+    @traced("Firestore get_project")
     async def get_project(self, project_id: str) -> Optional[Project]:
         """Get project by ID"""
         try:
             doc_ref = self.client.collection(self.projects_collection).document(project_id)
             doc = doc_ref.get()
+            record_reads("get")
             
             if doc.exists:
                 data = doc.to_dict()
@@ -172,10 +209,11 @@ class FirestoreClient:
             logger.error(f"Error getting project {project_id}: {e}")
             raise
     
+    @traced("Firestore get_all_projects")
     def get_all_projects(self) -> List[Dict[str, Any]]:
         """Get all projects from Firestore"""
         try:
-            docs = self.client.collection(self.projects_collection).stream()
+            docs = counted_reads("query", self.client.collection(self.projects_collection).stream())
             projects = []
             
             for doc in docs:
@@ -190,6 +228,7 @@ class FirestoreClient:
             logger.error(f"Error getting all projects: {e}")
             raise
     
+    @traced("Firestore search_projects")
     def search_projects(self, query: str = "", filters: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
         """Search projects with text query and filters"""
         try:
@@ -210,7 +249,7 @@ class FirestoreClient:
                             query_ref = query_ref.where(field, "==", value)
             
             # Execute query
-            docs = query_ref.stream()
+            docs = counted_reads("query", query_ref.stream())
             projects = []
             
             for doc in docs:
@@ -236,11 +275,13 @@ class FirestoreClient:
             logger.error(f"Error searching projects: {e}")
             raise
     
+    @traced("Firestore update_project")
     async def update_project(self, project_id: str, request: UpdateProjectRequest, updated_by: Optional[str] = None) -> Optional[Project]:
         """Update an existing project"""
         try:
             doc_ref = self.client.collection(self.projects_collection).document(project_id)
             doc = doc_ref.get()
+            record_reads("get")
             
             if not doc.exists:
                 return None
@@ -266,9 +307,11 @@ class FirestoreClient:
             
             # Update in Firestore
             doc_ref.update(update_data)
+            record_writes("update")
             
             # Return updated project
             updated_doc = doc_ref.get()
+            record_reads("get")
             data = updated_doc.to_dict()
             return self._create_project_from_dict(data, project_id)
             
@@ -276,17 +319,20 @@ class FirestoreClient:
             logger.error(f"Error updating project {project_id}: {e}")
             raise
     
+    @traced("Firestore delete_project")
     async def delete_project(self, project_id: str) -> bool:
         """Delete a project and all its data"""
         try:
             doc_ref = self.client.collection(self.projects_collection).document(project_id)
             doc = doc_ref.get()
+            record_reads("get")
             
             if not doc.exists:
                 return False
             
             # Delete the project document
             doc_ref.delete()
+            record_writes("delete")
             
             logger.info(f"Deleted project: {project_id}")
             return True
@@ -295,6 +341,7 @@ class FirestoreClient:
             logger.error(f"Error deleting project {project_id}: {e}")
             raise
     
+    @traced("Firestore list_projects")
     async def list_projects(self, filters: Optional[SearchFilter] = None, limit: int = 100) -> List[ProjectSummary]:
         """List projects with optional filtering"""
         try:
@@ -313,7 +360,7 @@ class FirestoreClient:
             query = query.order_by("created_at", direction=firestore.Query.DESCENDING).limit(limit)
             
             # Execute query
-            docs = query.stream()
+            docs = counted_reads("query", query.stream())
             
             summaries = []
             for doc in docs:
@@ -357,6 +404,7 @@ class FirestoreClient:
     # EPIC OPERATIONS
     # ================================
     
+    @traced("Firestore get_project_epics")
     def get_project_epics(self, project_id: str) -> List[Dict[str, Any]]:
         """Get all epics for a project"""
         try:
@@ -373,47 +421,47 @@ class FirestoreClient:
             logger.error(f"Error getting epics for project {project_id}: {e}")
             return []
     
-    def add_epic_to_project(self, project_id: str, epic_data: Dict[str, Any]) -> str:
+    def epic_mutation(self, project_id: str, epic_data: Dict[str, Any], upsert: bool = False) -> Tuple[str, Mutation]:
+        """Write-queue mutation adding an epic to a project; the epic ID is assigned up front.
+
+        With `upsert`, an epic with the same ID is updated instead.
+        """
+        # Generate epic ID if not provided
+        if not epic_data.get('epic_id'):
+            epic_data['epic_id'] = self._generate_id("EPIC_")
+        
+        # Add timestamps
+        epic_data['created_at'] = datetime.utcnow()
+        epic_data['updated_at'] = datetime.utcnow()
+        
+        def add_epic(project_data: Dict[str, Any]) -> str:
+            self._add_or_update(project_data.setdefault('epics', []), epic_data, 'epic_id', upsert)
+            project_data['updated_at'] = datetime.utcnow()
+            return epic_data['epic_id']
+        
+        return epic_data['epic_id'], add_epic
+    
+    @traced("Firestore add_epic_to_project")
+    async def add_epic_to_project(self, project_id: str, epic_data: Dict[str, Any]) -> str:
         """Add an epic to a project (simple version)"""
         try:
-            doc_ref = self.client.collection(self.projects_collection).document(project_id)
-            doc = doc_ref.get()
+            epic_id, mutation = self.epic_mutation(project_id, epic_data)
+            await self.write_queue.write(project_id, mutation)
             
-            if not doc.exists:
-                raise ValueError(f"Project {project_id} not found")
-            
-            project_data = doc.to_dict()
-            if not project_data:
-                raise ValueError(f"Project {project_id} has no data")
-                
-            epics = project_data.get('epics', [])
-            
-            # Generate epic ID if not provided
-            if not epic_data.get('epic_id'):
-                epic_data['epic_id'] = self._generate_id("EPIC_")
-            
-            # Add timestamps
-            epic_data['created_at'] = datetime.utcnow()
-            epic_data['updated_at'] = datetime.utcnow()
-            
-            # Add epic to list
-            epics.append(epic_data)
-            
-            # Update project with new epic
-            doc_ref.update({'epics': epics, 'updated_at': datetime.utcnow()})
-            
-            logger.info(f"Added epic {epic_data['epic_id']} to project {project_id}")
-            return epic_data['epic_id']
+            logger.info(f"Added epic {epic_id} to project {project_id}")
+            return epic_id
             
         except Exception as e:
             logger.error(f"Error adding epic to project {project_id}: {e}")
             raise
     
+    @traced("Firestore add_epic_to_project_async")
     async def add_epic_to_project_async(self, project_id: str, epic: Epic) -> bool:
         """Add an epic to a project"""
         try:
             doc_ref = self.client.collection(self.projects_collection).document(project_id)
             doc = doc_ref.get()
+            record_reads("get")
             
             if not doc.exists:
                 return False
@@ -431,6 +479,7 @@ class FirestoreClient:
             # Update project
             project.updated_at = datetime.utcnow()
             doc_ref.update({"epics": [epic.dict() for epic in project.epics], "updated_at": project.updated_at})
+            record_writes("update")
             
             logger.info(f"Added epic {epic.epic_id} to project {project_id}")
             return True
@@ -439,11 +488,13 @@ class FirestoreClient:
             logger.error(f"Error adding epic to project {project_id}: {e}")
             raise
     
+    @traced("Firestore update_epic")
     async def update_epic(self, project_id: str, epic_id: str, updated_epic: Epic) -> bool:
         """Update an epic in a project"""
         try:
             doc_ref = self.client.collection(self.projects_collection).document(project_id)
             doc = doc_ref.get()
+            record_reads("get")
             
             if not doc.exists:
                 return False
@@ -466,6 +517,7 @@ class FirestoreClient:
             # Update project
             project.updated_at = datetime.utcnow()
             doc_ref.update({"epics": [epic.dict() for epic in project.epics], "updated_at": project.updated_at})
+            record_writes("update")
             
             logger.info(f"Updated epic {epic_id} in project {project_id}")
             return True
@@ -474,11 +526,13 @@ class FirestoreClient:
             logger.error(f"Error updating epic {epic_id} in project {project_id}: {e}")
             raise
     
+    @traced("Firestore delete_epic")
     async def delete_epic(self, project_id: str, epic_id: str) -> bool:
         """Delete an epic from a project"""
         try:
             doc_ref = self.client.collection(self.projects_collection).document(project_id)
             doc = doc_ref.get()
+            record_reads("get")
             
             if not doc.exists:
                 return False
@@ -499,6 +553,7 @@ class FirestoreClient:
             # Update project
             project.updated_at = datetime.utcnow()
             doc_ref.update({"epics": [epic.dict() for epic in project.epics], "updated_at": project.updated_at})
+            record_writes("update")
             
             logger.info(f"Deleted epic {epic_id} from project {project_id}")
             return True
@@ -507,17 +562,12 @@ class FirestoreClient:
             logger.error(f"Error deleting epic {epic_id} from project {project_id}: {e}")
             raise
     
+    @traced("Firestore update_epic_jira_status")
     async def update_epic_jira_status(self, project_id: str, epic_id: str, jira_status: JiraStatus, jira_key: Optional[str] = None) -> bool:
         """Update Jira status for an epic"""
-        try:
-            doc_ref = self.client.collection(self.projects_collection).document(project_id)
-            doc = doc_ref.get()
-            
-            if not doc.exists:
-                return False
-            
-            project_data = doc.to_dict()
-            project = self._create_project_from_dict(project_data, project_id)
+        def set_jira_status(project_data: Dict[str, Any]) -> bool:
+            # A copy: the model defaults filled in for validation are not written back
+            project = self._create_project_from_dict(dict(project_data), project_id)
             
             if not project:
                 return False
@@ -535,13 +585,19 @@ class FirestoreClient:
             else:
                 return False
             
-            # Update project
-            project.updated_at = datetime.utcnow()
-            doc_ref.update({"epics": [epic.dict() for epic in project.epics], "updated_at": project.updated_at})
-            
-            logger.info(f"Updated Jira status for epic {epic_id} to {jira_status}")
+            project_data['epics'] = [epic.dict() for epic in project.epics]
+            project_data['updated_at'] = datetime.utcnow()
             return True
+        
+        try:
+            updated = await self.write_queue.write(project_id, set_jira_status)
+            
+            if updated:
+                logger.info(f"Updated Jira status for epic {epic_id} to {jira_status}")
+            return updated
             
+        except ProjectNotFound:
+            return False
         except Exception as e:
             logger.error(f"Error updating Jira status for epic {epic_id}: {e}")
             raise
@@ -550,6 +606,7 @@ class FirestoreClient:
     # FEATURE OPERATIONS
     # ================================
     
+    @traced("Firestore get_epic_features")
     def get_epic_features(self, project_id: str, epic_id: str) -> List[Dict[str, Any]]:
         """Get all features for an epic"""
         try:
@@ -573,60 +630,54 @@ class FirestoreClient:
             logger.error(f"Error getting features for epic {epic_id}: {e}")
             return []
     
-    def add_feature_to_epic(self, project_id: str, epic_id: str, feature_data: Dict[str, Any]) -> str:
-        """Add a feature to an epic (simple version)"""
-        try:
-            doc_ref = self.client.collection(self.projects_collection).document(project_id)
-            doc = doc_ref.get()
-            
-            if not doc.exists:
-                raise ValueError(f"Project {project_id} not found")
-            
-            project_data = doc.to_dict()
-            if not project_data:
-                raise ValueError(f"Project {project_id} has no data")
-                
-            epics = project_data.get('epics', [])
-            
+    def feature_mutation(self, project_id: str, epic_id: str, feature_data: Dict[str, Any],
+                         upsert: bool = False) -> Tuple[str, Mutation]:
+        """Write-queue mutation adding a feature to an epic; the feature ID is assigned up front.
+
+        With `upsert`, a feature of the epic with the same ID is updated instead.
+        """
+        # Generate feature ID if not provided
+        if not feature_data.get('feature_id'):
+            feature_data['feature_id'] = self._generate_id("FEAT_")
+        
+        # Add timestamps
+        feature_data['created_at'] = datetime.utcnow()
+        feature_data['updated_at'] = datetime.utcnow()
+        
+        def add_feature(project_data: Dict[str, Any]) -> str:
             # Find and update the epic
-            epic_found = False
-            for epic in epics:
+            for epic in project_data.get('epics', []):
                 if epic.get('epic_id') == epic_id:
-                    epic_found = True
-                    features = epic.get('features', [])
-                    
-                    # Generate feature ID if not provided
-                    if not feature_data.get('feature_id'):
-                        feature_data['feature_id'] = self._generate_id("FEAT_")
-                    
-                    # Add timestamps
-                    feature_data['created_at'] = datetime.utcnow()
-                    feature_data['updated_at'] = datetime.utcnow()
-                    
-                    # Add feature to epic
-                    features.append(feature_data)
-                    epic['features'] = features
+                    self._add_or_update(epic.setdefault('features', []), feature_data, 'feature_id', upsert)
                     epic['updated_at'] = datetime.utcnow()
-                    break
-            
-            if not epic_found:
-                raise ValueError(f"Epic {epic_id} not found in project {project_id}")
+                    project_data['updated_at'] = datetime.utcnow()
+                    return feature_data['feature_id']
             
-            # Update project with modified epics
-            doc_ref.update({'epics': epics, 'updated_at': datetime.utcnow()})
+            raise ValueError(f"Epic {epic_id} not found in project {project_id}")
+        
+        return feature_data['feature_id'], add_feature
+    
+    @traced("Firestore add_feature_to_epic")
+    async def add_feature_to_epic(self, project_id: str, epic_id: str, feature_data: Dict[str, Any]) -> str:
+        """Add a feature to an epic (simple version)"""
+        try:
+            feature_id, mutation = self.feature_mutation(project_id, epic_id, feature_data)
+            await self.write_queue.write(project_id, mutation)
             
-            logger.info(f"Added feature {feature_data['feature_id']} to epic {epic_id}")
-            return feature_data['feature_id']
+            logger.info(f"Added feature {feature_id} to epic {epic_id}")
+            return feature_id
             
         except Exception as e:
             logger.error(f"Error adding feature to epic {epic_id}: {e}")
             raise
     
+    @traced("Firestore add_feature_to_epic_async")
     async def add_feature_to_epic_async(self, project_id: str, epic_id: str, feature: Feature) -> bool:
         """Add a feature to an epic"""
         try:
             doc_ref = self.client.collection(self.projects_collection).document(project_id)
             doc = doc_ref.get()
+            record_reads("get")
             
             if not doc.exists:
                 return False
@@ -650,6 +701,7 @@ class FirestoreClient:
             # Update project
             project.updated_at = datetime.utcnow()
             doc_ref.update({"epics": [epic.dict() for epic in project.epics], "updated_at": project.updated_at})
+            record_writes("update")
             
             logger.info(f"Added feature {feature.feature_id} to epic {epic_id}")
             return True
@@ -662,6 +714,7 @@ class FirestoreClient:
     # USE CASE OPERATIONS
     # ================================
     
+    @traced("Firestore get_feature_use_cases")
     def get_feature_use_cases(self, project_id: str, epic_id: str, feature_id: str) -> List[Dict[str, Any]]:
         """Get all use cases for a feature"""
         try:
@@ -688,73 +741,60 @@ class FirestoreClient:
             logger.error(f"Error getting use cases for feature {feature_id}: {e}")
             return []
     
-    def add_use_case_to_feature(self, project_id: str, epic_id: str, feature_id: str, use_case_data: Dict[str, Any]) -> str:
-        """Add a use case to a feature (simple version)"""
-        try:
-            doc_ref = self.client.collection(self.projects_collection).document(project_id)
-            doc = doc_ref.get()
-            
-            if not doc.exists:
-                raise ValueError(f"Project {project_id} not found")
-            
-            project_data = doc.to_dict()
-            if not project_data:
-                raise ValueError(f"Project {project_id} has no data")
-                
-            epics = project_data.get('epics', [])
-            
+    def use_case_mutation(self, project_id: str, epic_id: str, feature_id: str,
+                          use_case_data: Dict[str, Any], upsert: bool = False) -> Tuple[str, Mutation]:
+        """Write-queue mutation adding a use case to a feature; the use case ID is assigned up front.
+
+        With `upsert`, a use case of the feature with the same ID is updated instead.
+        """
+        # Generate use case ID if not provided
+        if not use_case_data.get('use_case_id'):
+            use_case_data['use_case_id'] = self._generate_id("UC_")
+        
+        # Add timestamps
+        use_case_data['created_at'] = datetime.utcnow()
+        use_case_data['updated_at'] = datetime.utcnow()
+        
+        def add_use_case(project_data: Dict[str, Any]) -> str:
             # Find and update the epic and feature
-            epic_found = False
-            feature_found = False
-            
-            for epic in epics:
+            for epic in project_data.get('epics', []):
                 if epic.get('epic_id') == epic_id:
-                    epic_found = True
-                    features = epic.get('features', [])
-                    
-                    for feature in features:
+                    for feature in epic.get('features', []):
                         if feature.get('feature_id') == feature_id:
-                            feature_found = True
-                            use_cases = feature.get('use_cases', [])
-                            
-                            # Generate use case ID if not provided
-                            if not use_case_data.get('use_case_id'):
-                                use_case_data['use_case_id'] = self._generate_id("UC_")
-                            
-                            # Add timestamps
-                            use_case_data['created_at'] = datetime.utcnow()
-                            use_case_data['updated_at'] = datetime.utcnow()
-                            
-                            # Add use case to feature
-                            use_cases.append(use_case_data)
-                            feature['use_cases'] = use_cases
+                            self._add_or_update(feature.setdefault('use_cases', []), use_case_data,
+                                                'use_case_id', upsert)
                             feature['updated_at'] = datetime.utcnow()
-                            break
+                            epic['updated_at'] = datetime.utcnow()
+                            project_data['updated_at'] = datetime.utcnow()
+                            return use_case_data['use_case_id']
                     
-                    if feature_found:
-                        epic['updated_at'] = datetime.utcnow()
-                        break
-            
-            if not epic_found:
-                raise ValueError(f"Epic {epic_id} not found in project {project_id}")
-            if not feature_found:
-                raise ValueError(f"Feature {feature_id} not found in epic {epic_id}")
+                    raise ValueError(f"Feature {feature_id} not found in epic {epic_id}")
             
-            # Update project with modified epics
-            doc_ref.update({'epics': epics, 'updated_at': datetime.utcnow()})
+            raise ValueError(f"Epic {epic_id} not found in project {project_id}")
+        
+        return use_case_data['use_case_id'], add_use_case
+    
+    @traced("Firestore add_use_case_to_feature")
+    async def add_use_case_to_feature(self, project_id: str, epic_id: str, feature_id: str, use_case_data: Dict[str, Any]) -> str:
+        """Add a use case to a feature (simple version)"""
+        try:
+            use_case_id, mutation = self.use_case_mutation(project_id, epic_id, feature_id, use_case_data)
+            await self.write_queue.write(project_id, mutation)
             
-            logger.info(f"Added use case {use_case_data['use_case_id']} to feature {feature_id}")
-            return use_case_data['use_case_id']
+            logger.info(f"Added use case {use_case_id} to feature {feature_id}")
+            return use_case_id
             
         except Exception as e:
             logger.error(f"Error adding use case to feature {feature_id}: {e}")
             raise
     
+    @traced("Firestore add_use_case_to_feature_async")
     async def add_use_case_to_feature_async(self, project_id: str, epic_id: str, feature_id: str, use_case: UseCase) -> bool:
         """Add a use case to a feature"""
         try:
             doc_ref = self.client.collection(self.projects_collection).document(project_id)
             doc = doc_ref.get()
+            record_reads("get")
             
             if not doc.exists:
                 return False
@@ -782,6 +822,7 @@ class FirestoreClient:
             # Update project
             project.updated_at = datetime.utcnow()
             doc_ref.update({"epics": [epic.dict() for epic in project.epics], "updated_at": project.updated_at})
+            record_writes("update")
             
             logger.info(f"Added use case {use_case.use_case_id} to feature {feature_id}")
             return True
@@ -794,83 +835,67 @@ class FirestoreClient:
     # TEST CASE OPERATIONS
     # ================================
     
-    def add_test_case_to_use_case(self, project_id: str, epic_id: str, feature_id: str, use_case_id: str, 
-                                 test_case_title: str, test_steps: List[str], expected_result: str, 
-                                 test_type: str = "Functional", additional_fields: Optional[Dict[str, Any]] = None) -> str:
-        """Add a test case to a use case (simple version)"""
-        try:
-            doc_ref = self.client.collection(self.projects_collection).document(project_id)
-            doc = doc_ref.get()
-            
-            if not doc.exists:
-                raise ValueError(f"Project {project_id} not found")
-            
-            project_data = doc.to_dict()
-            if not project_data:
-                raise ValueError(f"Project {project_id} has no data")
-                
-            epics = project_data.get('epics', [])
-            
+    def test_case_mutation(self, project_id: str, epic_id: str, feature_id: str, use_case_id: str,
+                           test_case_title: str, test_steps: List[str], expected_result: str,
+                           test_type: str = "Functional",
+                           additional_fields: Optional[Dict[str, Any]] = None,
+                           upsert: bool = False) -> Tuple[str, Mutation]:
+        """Write-queue mutation adding a test case to a use case; the test case ID is assigned up front.
+
+        With `upsert`, a test case of the use case with the same custom_test_case_id
+        is updated instead, keeping its ID; the mutation returns the ID it kept.
+        """
+        # Create test case data with core fields
+        test_case_data = {
+            'test_case_id': self._generate_id("TC_"),
+            'test_case_title': test_case_title,
+            'test_steps': test_steps,
+            'expected_result': expected_result,
+            'test_type': test_type,
+            'created_at': datetime.utcnow(),
+            'updated_at': datetime.utcnow()
+        }
+        
+        # Add additional fields if provided
+        if additional_fields:
+            test_case_data.update(additional_fields)
+        
+        def add_test_case(project_data: Dict[str, Any]) -> str:
             # Find the epic, feature, and use case
-            epic_found = False
-            feature_found = False
-            use_case_found = False
-            
-            for epic in epics:
+            for epic in project_data.get('epics', []):
                 if epic.get('epic_id') == epic_id:
-                    epic_found = True
-                    features = epic.get('features', [])
-                    
-                    for feature in features:
+                    for feature in epic.get('features', []):
                         if feature.get('feature_id') == feature_id:
-                            feature_found = True
-                            use_cases = feature.get('use_cases', [])
-                            
-                            for use_case in use_cases:
+                            for use_case in feature.get('use_cases', []):
                                 if use_case.get('use_case_id') == use_case_id:
-                                    use_case_found = True
-                                    test_cases = use_case.get('test_cases', [])
-                                    
-                                    # Create test case data with core fields
-                                    test_case_data = {
-                                        'test_case_id': self._generate_id("TC_"),
-                                        'test_case_title': test_case_title,
-                                        'test_steps': test_steps,
-                                        'expected_result': expected_result,
-                                        'test_type': test_type,
-                                        'created_at': datetime.utcnow(),
-                                        'updated_at': datetime.utcnow()
-                                    }
-                                    
-                                    # Add additional fields if provided
-                                    if additional_fields:
-                                        test_case_data.update(additional_fields)
-                                    
-                                    # Add test case to use case
-                                    test_cases.append(test_case_data)
-                                    use_case['test_cases'] = test_cases
+                                    test_case = self._add_or_update(use_case.setdefault('test_cases', []),
+                                                                    test_case_data, 'custom_test_case_id', upsert,
+                                                                    keep=('created_at', 'test_case_id'))
                                     use_case['updated_at'] = datetime.utcnow()
-                                    break
+                                    feature['updated_at'] = datetime.utcnow()
+                                    epic['updated_at'] = datetime.utcnow()
+                                    project_data['updated_at'] = datetime.utcnow()
+                                    return test_case['test_case_id']
                             
-                            if use_case_found:
-                                feature['updated_at'] = datetime.utcnow()
-                                break
+                            raise ValueError(f"Use case {use_case_id} not found in feature {feature_id}")
                     
-                    if feature_found:
-                        epic['updated_at'] = datetime.utcnow()
-                        break
+                    raise ValueError(f"Feature {feature_id} not found in epic {epic_id}")
             
-            if not epic_found:
-                raise ValueError(f"Epic {epic_id} not found in project {project_id}")
-            if not feature_found:
-                raise ValueError(f"Feature {feature_id} not found in epic {epic_id}")
-            if not use_case_found:
-                raise ValueError(f"Use case {use_case_id} not found in feature {feature_id}")
-            
-            # Update project with modified epics
-            doc_ref.update({'epics': epics, 'updated_at': datetime.utcnow()})
+            raise ValueError(f"Epic {epic_id} not found in project {project_id}")
+        
+        return test_case_data['test_case_id'], add_test_case
+    
+    @traced("Firestore add_test_case_to_use_case")
+    async def add_test_case_to_use_case(self, project_id: str, epic_id: str, feature_id: str, use_case_id: str, 
+                                       test_case_title: str, test_steps: List[str], expected_result: str, 
+                                       test_type: str = "Functional", additional_fields: Optional[Dict[str, Any]] = None) -> str:
+        """Add a test case to a use case (simple version)"""
+        try:
+            test_case_id, mutation = self.test_case_mutation(project_id, epic_id, feature_id, use_case_id,
+                                                             test_case_title, test_steps, expected_result,
+                                                             test_type, additional_fields)
+            await self.write_queue.write(project_id, mutation)
             
-            test_case_id = test_case_data['test_case_id']
             logger.info(f"Added test case {test_case_id} to use case {use_case_id}")
             return test_case_id
             
@@ -878,11 +903,13 @@ class FirestoreClient:
             logger.error(f"Error adding test case to use case {use_case_id}: {e}")
             raise
     
+    @traced("Firestore add_test_case_to_use_case_async")
     async def add_test_case_to_use_case_async(self, project_id: str, epic_id: str, feature_id: str, use_case_id: str, test_case: TestCase) -> bool:
         """Add a test case to a use case"""
         try:
             doc_ref = self.client.collection(self.projects_collection).document(project_id)
             doc = doc_ref.get()
+            record_reads("get")
             
             if not doc.exists:
                 return False
@@ -914,6 +941,7 @@ class FirestoreClient:
             # Update project
             project.updated_at = datetime.utcnow()
             doc_ref.update({"epics": [epic.dict() for epic in project.epics], "updated_at": project.updated_at})
+            record_writes("update")
             
             logger.info(f"Added test case {test_case.test_case_id} to use case {use_case_id}")
             return True
@@ -926,6 +954,7 @@ class FirestoreClient:
     # BULK OPERATIONS
     # ================================
     
+    @traced("Firestore bulk_create_from_structure")
     async def bulk_create_from_structure(self, project_id: str, structure_data: Dict[str, Any]) -> BulkOperationResult:
         """Create project structure from generated test case data"""
         try:
@@ -956,6 +985,7 @@ class FirestoreClient:
             if 'coverage_summary' in structure_data:
                 doc_ref = self.client.collection(self.projects_collection).document(project_id)
                 doc_ref.update({"coverage_summary": structure_data['coverage_summary']})
+                record_writes("update")
             
             logger.info(f"Bulk create completed: {result.success_count} success, {result.error_count} errors")
             return result
@@ -968,6 +998,7 @@ class FirestoreClient:
     # SEARCH AND ANALYTICS
     # ================================
     
+    @traced("Firestore search_test_cases")
     async def search_test_cases(self, project_id: str, search_term: str) -> List[Dict[str, Any]]:
         """Search test cases within a project"""
         try:
@@ -1004,10 +1035,11 @@ class FirestoreClient:
             logger.error(f"Error searching test cases: {e}")
             raise
     
+    @traced("Firestore get_project_statistics")
     def get_project_statistics(self) -> Dict[str, Any]:
         """Get overall statistics for all projects (simple version)"""
         try:
-            docs = self.client.collection(self.projects_collection).stream()
+            docs = counted_reads("query", self.client.collection(self.projects_collection).stream())
             
             total_projects = 0
             total_epics = 0
@@ -1048,6 +1080,7 @@ class FirestoreClient:
             logger.error(f"Error getting project statistics: {e}")
             return {}
     
+    @traced("Firestore get_project_statistics_async")
     async def get_project_statistics_async(self, project_id: str) -> Dict[str, Any]:
         """Get detailed statistics for a project"""
         try:
@@ -14,8 +14,15 @@ from dotenv import load_dotenv
 # Load environment variables from .env file
 load_dotenv()
 
+import metrics
+import tracing
+
 # Initialize FastMCP server
 mcp = FastMCP("firestore")
+# Tool call and Firestore read/write metrics, GET /metrics for Prometheus
+metrics.install(mcp)
+# Tool call and Firestore operation spans, joined to the Agents API trace
+tracing.install(mcp)
 
 # Import all modules for tools
 from firestore_client import FirestoreClient
@@ -194,6 +201,10 @@ async def bulk_write_epics_structure(
     """
     Bulk write complete epic structures (epics → features → use cases → test cases) to an existing project.
     
+    Items whose epic_id, feature_id, use_case_id or test_case_id already exist
+    under the same parent are updated instead of added again, so writing the
+    same structure twice (a retried push) does not duplicate it.
+    
     Args:
         project_id: The ID of the existing project to add epics to
         epics: List of epic objects with complete nested structure:
@@ -268,20 +279,19 @@ async def bulk_write_epics_structure(
                 "error": f"Project {project_id} not found"
             }
         
-        # Keep track of created items
-        created_epics = []
-        created_features = []
-        created_use_cases = []
-        created_test_cases = []
-        
-        # Process each epic
         for epic_data in epics:
             if not epic_data.get("epic_name"):
                 return {
                     "success": False,
                     "error": "Each epic must have an 'epic_name' field"
                 }
-            
+        
+        # Every addition is collected first, with the kind of item it writes,
+        # and the structure is written at the end
+        mutations = []
+        
+        # Process each epic
+        for epic_data in epics:
             # Create epic
             epic_info = {
                 "epic_name": epic_data["epic_name"],
@@ -295,8 +305,8 @@ async def bulk_write_epics_structure(
                 "created_at": firestore_client.get_current_timestamp()
             }
             
-            epic_id = firestore_client.add_epic_to_project(project_id, epic_info)
-            created_epics.append(epic_id)
+            epic_id, mutation = firestore_client.epic_mutation(project_id, epic_info, upsert=True)
+            mutations.append(("epic", mutation))
             
             # Process features in this epic
             features = epic_data.get("features", [])
@@ -317,8 +327,8 @@ async def bulk_write_epics_structure(
                     "created_at": firestore_client.get_current_timestamp()
                 }
                 
-                feature_id = firestore_client.add_feature_to_epic(project_id, epic_id, feature_info)
-                created_features.append(feature_id)
+                feature_id, mutation = firestore_client.feature_mutation(project_id, epic_id, feature_info, upsert=True)
+                mutations.append(("feature", mutation))
                 
                 # Process use cases in this feature
                 use_cases = feature_data.get("use_cases", [])
@@ -345,8 +355,9 @@ async def bulk_write_epics_structure(
                         "created_at": firestore_client.get_current_timestamp()
                     }
                     
-                    use_case_id = firestore_client.add_use_case_to_feature(project_id, epic_id, feature_id, use_case_info)
-                    created_use_cases.append(use_case_id)
+                    use_case_id, mutation = firestore_client.use_case_mutation(project_id, epic_id, feature_id,
+                                                                               use_case_info, upsert=True)
+                    mutations.append(("use_case", mutation))
                     
                     # Process test cases in this use case
                     test_cases = use_case_data.get("test_cases", [])
@@ -372,29 +383,40 @@ async def bulk_write_epics_structure(
                         if test_case_data.get("test_case_id"):
                             additional_fields["custom_test_case_id"] = test_case_data.get("test_case_id")
                         
-                        test_case_id = firestore_client.add_test_case_to_use_case(
+                        _, mutation = firestore_client.test_case_mutation(
                             project_id, epic_id, feature_id, use_case_id,
                             test_case_data["test_case_title"],
                             test_case_data.get("test_steps", []),
                             test_case_data.get("expected_result", ""),
                             test_case_data.get("test_type", "Functional"),
-                            additional_fields=additional_fields
+                            additional_fields=additional_fields,
+                            upsert=True
                         )
-                        created_test_cases.append(test_case_id)
+                        mutations.append(("test_case", mutation))
+        
+        def write_structure(project_data: Dict[str, Any]) -> Dict[str, List[str]]:
+            written = {"epic": [], "feature": [], "use_case": [], "test_case": []}
+            for kind, mutation in mutations:
+                written[kind].append(mutation(project_data))
+            return written
+        
+        # One mutation for the whole structure, so it is committed in a single
+        # transaction and a failure leaves none of it behind
+        written = await firestore_client.write_queue.write(project_id, write_structure)
         
         return {
             "success": True,
             "message": f"Successfully added complete epic structure to project {project_id}",
             "summary": {
                 "project_id": project_id,
-                "epics_created": len(created_epics),
-                "features_created": len(created_features),
-                "use_cases_created": len(created_use_cases),
-                "test_cases_created": len(created_test_cases),
-                "epic_ids": created_epics,
-                "feature_ids": created_features,
-                "use_case_ids": created_use_cases,
-                "test_case_ids": created_test_cases
+                "epics_created": len(written["epic"]),
+                "features_created": len(written["feature"]),
+                "use_cases_created": len(written["use_case"]),
+                "test_cases_created": len(written["test_case"]),
+                "epic_ids": written["epic"],
+                "feature_ids": written["feature"],
+                "use_case_ids": written["use_case"],
+                "test_case_ids": written["test_case"]
             }
         }
     except Exception as e:
@@ -426,7 +448,7 @@ async def add_epic_to_project(
             "created_at": firestore_client.get_current_timestamp()
         }
         
-        epic_id = firestore_client.add_epic_to_project(project_id, epic_data)
+        epic_id = await firestore_client.add_epic_to_project(project_id, epic_data)
         
         return {
             "success": True,
@@ -478,7 +500,7 @@ async def add_feature_to_epic(
             "created_at": firestore_client.get_current_timestamp()
         }
         
-        feature_id = firestore_client.add_feature_to_epic(project_id, epic_id, feature_data)
+        feature_id = await firestore_client.add_feature_to_epic(project_id, epic_id, feature_data)
         
         return {
             "success": True,
@@ -543,7 +565,7 @@ async def add_use_case_to_feature(
             "created_at": firestore_client.get_current_timestamp()
         }
         
-        use_case_id = firestore_client.add_use_case_to_feature(project_id, epic_id, feature_id, use_case_data)
+        use_case_id = await firestore_client.add_use_case_to_feature(project_id, epic_id, feature_id, use_case_data)
         
         return {
             "success": True,
@@ -627,55 +649,23 @@ async def update_use_case(
         # Always update the timestamp
         update_data["updated_at"] = firestore_client.get_current_timestamp()
         
-        # Check if use case exists first
-        use_cases = firestore_client.get_feature_use_cases(project_id, epic_id, feature_id)
-        target_use_case = None
-        for uc in use_cases:
-            if uc.get('id') == use_case_id or uc.get('use_case_id') == use_case_id:
-                target_use_case = uc
-                break
-        
-        if not target_use_case:
-            return {
-                "success": False,
-                "error": f"Use case {use_case_id} not found in feature {feature_id}"
-            }
-        
-        # Update the use case using direct Firestore operations
-        doc_ref = firestore_client.client.collection(firestore_client.projects_collection).document(project_id)
-        doc = doc_ref.get()
-        
-        if not doc.exists:
-            return {
-                "success": False,
-                "error": f"Project {project_id} not found"
-            }
-        
-        project_data = doc.to_dict()
-        updated = False
-        
-        # Navigate to the use case and update it
-        if 'epics' in project_data:
-            for epic in project_data['epics']:
+        def apply_update(project_data: Dict[str, Any]) -> bool:
+            # Navigate to the use case and update it
+            for epic in project_data.get('epics', []):
                 if epic.get('epic_id') == epic_id or epic.get('id') == epic_id:
-                    if 'features' in epic:
-                        for feature in epic['features']:
-                            if feature.get('feature_id') == feature_id or feature.get('id') == feature_id:
-                                if 'use_cases' in feature:
-                                    for i, use_case in enumerate(feature['use_cases']):
-                                        if use_case.get('use_case_id') == use_case_id or use_case.get('id') == use_case_id:
-                                            # Update the use case with new data
-                                            feature['use_cases'][i].update(update_data)
-                                            updated = True
-                                            break
-                                if updated:
-                                    break
-                    if updated:
-                        break
+                    for feature in epic.get('features', []):
+                        if feature.get('feature_id') == feature_id or feature.get('id') == feature_id:
+                            for use_case in feature.get('use_cases', []):
+                                if use_case.get('use_case_id') == use_case_id or use_case.get('id') == use_case_id:
+                                    # Update the use case with new data
+                                    use_case.update(update_data)
+                                    return True
+            return False
+        
+        # Merged with other pending writes to the project by the write queue
+        updated = await firestore_client.write_queue.write(project_id, apply_update)
         
         if updated:
-            # Save the updated project data back to Firestore
-            doc_ref.set(project_data)
             return {
                 "success": True,
                 "message": f"Use case {use_case_id} updated successfully",
@@ -685,7 +675,7 @@ async def update_use_case(
         else:
             return {
                 "success": False,
-                "error": f"Use case {use_case_id} not found"
+                "error": f"Use case {use_case_id} not found in feature {feature_id}"
             }
             
     except Exception as e:
@@ -733,7 +723,7 @@ async def add_test_case_to_use_case(
             additional_fields["custom_test_case_id"] = test_case_id
         
         # Call the enhanced firestore method with additional fields
-        generated_test_case_id = firestore_client.add_test_case_to_use_case(
+        generated_test_case_id = await firestore_client.add_test_case_to_use_case(
             project_id, epic_id, feature_id, use_case_id,
             test_case_title, test_steps, expected_result, test_type,
             additional_fields=additional_fields
@@ -816,50 +806,27 @@ async def update_test_case(
         # Always update the timestamp
         update_data["updated_at"] = firestore_client.get_current_timestamp()
         
-        # Update the test case using direct Firestore operations
-        doc_ref = firestore_client.client.collection(firestore_client.projects_collection).document(project_id)
-        doc = doc_ref.get()
-        
-        if not doc.exists:
-            return {
-                "success": False,
-                "error": f"Project {project_id} not found"
-            }
-        
-        project_data = doc.to_dict()
-        updated = False
-        
-        # Navigate to the test case and update it
-        if 'epics' in project_data:
-            for epic in project_data['epics']:
+        def apply_update(project_data: Dict[str, Any]) -> bool:
+            # Navigate to the test case and update it
+            for epic in project_data.get('epics', []):
                 if epic.get('epic_id') == epic_id or epic.get('id') == epic_id:
-                    if 'features' in epic:
-                        for feature in epic['features']:
-                            if feature.get('feature_id') == feature_id or feature.get('id') == feature_id:
-                                if 'use_cases' in feature:
-                                    for use_case in feature['use_cases']:
-                                        if use_case.get('use_case_id') == use_case_id or use_case.get('id') == use_case_id:
-                                            if 'test_cases' in use_case:
-                                                for i, test_case in enumerate(use_case['test_cases']):
-                                                    if (test_case.get('test_case_id') == test_case_id or 
-                                                        test_case.get('id') == test_case_id or
-                                                        test_case.get('custom_test_case_id') == test_case_id):
-                                                        # Update the test case with new data
-                                                        use_case['test_cases'][i].update(update_data)
-                                                        updated = True
-                                                        break
-                                            if updated:
-                                                break
-                                        if updated:
-                                            break
-                                if updated:
-                                    break
-                    if updated:
-                        break
+                    for feature in epic.get('features', []):
+                        if feature.get('feature_id') == feature_id or feature.get('id') == feature_id:
+                            for use_case in feature.get('use_cases', []):
+                                if use_case.get('use_case_id') == use_case_id or use_case.get('id') == use_case_id:
+                                    for test_case in use_case.get('test_cases', []):
+                                        if (test_case.get('test_case_id') == test_case_id or 
+                                            test_case.get('id') == test_case_id or
+                                            test_case.get('custom_test_case_id') == test_case_id):
+                                            # Update the test case with new data
+                                            test_case.update(update_data)
+                                            return True
+            return False
+        
+        # Merged with other pending writes to the project by the write queue
+        updated = await firestore_client.write_queue.write(project_id, apply_update)
         
         if updated:
-            # Save the updated project data back to Firestore
-            doc_ref.set(project_data)
             return {
                 "success": True,
                 "message": f"Test case {test_case_id} updated successfully",
@@ -0,0 +1,92 @@
+"""
+Prometheus metrics for the Firestore MCP server.
+
+GET /metrics (next to /mcp) exposes:
+
+- firestore_mcp_tool_calls_total{tool,outcome} and
+  firestore_mcp_tool_call_duration_seconds{tool}: every MCP tool call,
+- firestore_mcp_tool_calls_in_flight{tool},
+- firestore_documents_read_total{operation} and
+  firestore_documents_written_total{operation}: document reads (get, query)
+  and writes (set, update, delete) made by the server,
+- firestore_reads_per_tool_call{tool} and firestore_writes_per_tool_call{tool}:
+  how many documents each tool call read and wrote,
+- firestore_write_batch_mutations and firestore_write_transaction_retries_total:
+  mutations merged into each write-queue transaction and the transaction
+  attempts Firestore retried because of contention.
+
+Metrics are optional: without prometheus_client, or with METRICS_ENABLED=false,
+every helper is a no-op and /metrics is not registered.
+"""
+
+import time
+
+from fastmcp.server.middleware import Middleware, MiddlewareContext
+
+from medassure_telemetry import metrics as shared_metrics
+from medassure_telemetry.metrics import DOCUMENT_BUCKETS, METRICS_ENABLED
+
+if METRICS_ENABLED:
+    from prometheus_client import Counter, Gauge, Histogram
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+documents = shared_metrics.DocumentCounters("firestore", "tool_call", "tool")
+record_reads = documents.record_reads
+record_writes = documents.record_writes
+counted_reads = documents.counted_reads
+
+if METRICS_ENABLED:
+    TOOL_CALLS = Counter("firestore_mcp_tool_calls_total", "MCP tool calls", ["tool", "outcome"])
+    TOOL_DURATION = Histogram("firestore_mcp_tool_call_duration_seconds", "MCP tool call latency", ["tool"],
+                              buckets=LATENCY_BUCKETS)
+    TOOLS_IN_FLIGHT = Gauge("firestore_mcp_tool_calls_in_flight", "MCP tool calls being handled", ["tool"])
+    WRITE_BATCH_SIZE = Histogram("firestore_write_batch_mutations", "Mutations merged into one project write transaction",
+                                 buckets=DOCUMENT_BUCKETS)
+    WRITE_RETRIES = Counter("firestore_write_transaction_retries_total",
+                            "Project write transactions retried because of contention")
+
+
+def record_write_batch(mutations: int, attempts: int) -> None:
+    if METRICS_ENABLED:
+        WRITE_BATCH_SIZE.observe(mutations)
+        if attempts > 1:
+            WRITE_RETRIES.inc(attempts - 1)
+
+
+class ToolMetricsMiddleware(Middleware):
+    """Counts and times every MCP tool call and the Firestore documents it touches."""
+
+    async def on_call_tool(self, context: MiddlewareContext, call_next):
+        tool = context.message.name
+        TOOLS_IN_FLIGHT.labels(tool).inc()
+        started = time.perf_counter()
+        outcome = "error"
+        with documents.unit() as io:
+            try:
+                result = await call_next(context)
+                # Tools report most failures as {"success": False, "error": ...}
+                content = getattr(result, "structured_content", None)
+                outcome = "error" if isinstance(content, dict) and content.get("success") is False else "success"
+                return result
+            finally:
+                TOOLS_IN_FLIGHT.labels(tool).dec()
+                TOOL_CALLS.labels(tool, outcome).inc()
+                TOOL_DURATION.labels(tool).observe(time.perf_counter() - started)
+                documents.observe(tool, io)
+
+
+def install(mcp) -> None:
+    """Add the tool middleware and the /metrics route to a FastMCP server."""
+    if not METRICS_ENABLED:
+        shared_metrics.report_disabled()
+        return
+
+    from starlette.responses import Response
+
+    mcp.add_middleware(ToolMetricsMiddleware())
+
+    @mcp.custom_route("/metrics", methods=["GET"])
+    async def metrics_endpoint(request):
+        body, content_type = shared_metrics.exposition()
+        return Response(body, media_type=content_type)
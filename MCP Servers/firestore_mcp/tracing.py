@@ -0,0 +1,62 @@
+"""
+OpenTelemetry tracing for the Firestore MCP server.
+
+Every MCP tool call becomes a server span. The Agents API sends its W3C trace
+context (traceparent/tracestate) in the `_meta` field of the tools/call
+request, so the span joins the caller's trace. FirestoreClient operations
+become client spans underneath (see `traced`).
+
+The exporter, sampling and span helpers are shared with the other services
+(medassure_telemetry.tracing, which also lists the TRACING_* settings); the
+service name defaults to medassure-firestore-mcp.
+"""
+
+from typing import Any, Dict
+
+from fastmcp.server.middleware import Middleware, MiddlewareContext
+
+from medassure_telemetry import tracing as shared_tracing
+# Re-exported for the rest of the service
+from medassure_telemetry.tracing import set_error, span
+
+tracer = shared_tracing.configure("medassure-firestore-mcp", "medassure.firestore_mcp")
+
+
+def traced(name: str, kind: str = "client", **attributes: Any):
+    """Decorator running a sync or async Firestore operation in a span."""
+    return shared_tracing.traced(name, kind, **{"db.system": "firestore", **attributes})
+
+
+def _meta_carrier(context: MiddlewareContext) -> Dict[str, str]:
+    # The params passed to middleware are rebuilt without `_meta`; the request context keeps it
+    meta = getattr(context.message, "meta", None)
+    if meta is None and context.fastmcp_context is not None:
+        try:
+            meta = context.fastmcp_context.request_context.meta
+        except (AttributeError, LookupError, ValueError):
+            meta = None
+    if meta is None:
+        return {}
+    return {key: value for key, value in meta.model_dump().items() if isinstance(value, str)}
+
+
+class ToolTracingMiddleware(Middleware):
+    """Runs every MCP tool call in a server span joined to the caller's trace."""
+
+    async def on_call_tool(self, context: MiddlewareContext, call_next):
+        tool = context.message.name
+        with shared_tracing.extracted_context(_meta_carrier(context)):
+            with span(f"tool {tool}", "server", **{"mcp.tool.name": tool}):
+                result = await call_next(context)
+                # Tools report most failures as {"success": False, "error": ...}
+                content = getattr(result, "structured_content", None)
+                if isinstance(content, dict) and content.get("success") is False:
+                    set_error(str(content.get("error")))
+                return result
+
+
+def install(mcp) -> None:
+    """Set up tracing and add the tool span middleware to a FastMCP server."""
+    shared_tracing.setup_tracing()
+    if shared_tracing.TRACING_ENABLED:
+        mcp.add_middleware(ToolTracingMiddleware())
@@ -0,0 +1,159 @@
+"""
+Per-project write queue for project documents.
+
+Epics, features, use cases and test cases are stored inside their project's
+document, so every add/update tool is a read-modify-write of that document.
+Called in quick succession (an enhancement session, bulk_write_epics_structure)
+each call costs a read and a full write, and concurrent calls overwrite each
+other's changes.
+
+Instead, tools submit a mutation: a function that changes the project dict in
+place and returns the tool's result. Mutations for a project are collected for
+FIRESTORE_WRITE_DEBOUNCE_MS, applied in submission order to a single read of
+the document inside a Firestore transaction, and committed as one update of
+the top-level fields they changed. If the document changes underneath, Firestore
+retries the transaction and the mutations are re-applied to the fresh read, so
+no update is lost. A batch holds at most FIRESTORE_WRITE_MAX_BATCH mutations,
+and batches for one project commit one at a time. Writes that must land
+together (bulk_write_epics_structure) are submitted as a single mutation, so
+the cap never splits them across transactions.
+
+A mutation that raises only fails its own call; the rest of the batch is
+re-applied without it. Mutations may run more than once, so they must only
+change the dict they are given.
+
+The batch is committed outside the submitting tool calls, so the documents it
+reads and writes are credited to every tool call with a mutation in it.
+"""
+
+import asyncio
+import contextvars
+import copy
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from google.cloud import firestore
+
+import tracing
+from metrics import documents, record_reads, record_write_batch, record_writes
+
+Mutation = Callable[[Dict[str, Any]], Any]
+# A mutation, the future for its result and the document counts of the tool call that submitted it
+Pending = Tuple[Mutation, asyncio.Future, Optional[Dict[str, int]]]
+
+_MISSING = object()
+
+
+class ProjectNotFound(ValueError):
+    """The project document does not exist."""
+
+
+class ProjectWriteQueue:
+    """Debounces, merges and transactionally commits mutations of project documents."""
+
+    def __init__(self, client: firestore.Client, collection: str, debounce_seconds: float, max_batch: int):
+        self.client = client
+        self.collection = collection
+        self.debounce_seconds = max(0.0, debounce_seconds)
+        self.max_batch = max(1, max_batch)
+        self._pending: Dict[str, List[Pending]] = {}
+        self._flushers: Dict[str, asyncio.Task] = {}
+        self._batch_full: Dict[str, asyncio.Event] = {}
+
+    def submit(self, project_id: str, mutation: Mutation) -> asyncio.Future:
+        """Queue a mutation; the future resolves to its result once the batch is committed."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        pending = self._pending.setdefault(project_id, [])
+        pending.append((mutation, future, documents.current()))
+        if project_id not in self._flushers:
+            # A fresh context: the batch's span belongs to no single tool call
+            self._flushers[project_id] = loop.create_task(self._flush(project_id), context=contextvars.Context())
+        elif len(pending) >= self.max_batch:
+            self._batch_full.setdefault(project_id, asyncio.Event()).set()
+        return future
+
+    async def write(self, project_id: str, mutation: Mutation) -> Any:
+        """Apply a mutation to a project document and return its result."""
+        return await self.submit(project_id, mutation)
+
+    async def _flush(self, project_id: str) -> None:
+        batch_full = self._batch_full.setdefault(project_id, asyncio.Event())
+        try:
+            while self._pending.get(project_id):
+                if len(self._pending[project_id]) < self.max_batch:
+                    try:
+                        await asyncio.wait_for(batch_full.wait(), self.debounce_seconds)
+                    except asyncio.TimeoutError:
+                        pass
+                batch_full.clear()
+                batch = self._pending[project_id][:self.max_batch]
+                del self._pending[project_id][:len(batch)]
+                await self._commit(project_id, batch)
+        finally:
+            for _, future, _ in self._pending.pop(project_id, []):
+                if not future.done():
+                    future.set_exception(RuntimeError(f"Write queue for project {project_id} stopped"))
+            self._flushers.pop(project_id, None)
+            self._batch_full.pop(project_id, None)
+
+    async def _commit(self, project_id: str, batch: List[Pending]) -> None:
+        with documents.unit() as io, tracing.span("Firestore write batch", "client", **{"db.system": "firestore",
+                                                                  "firestore.project_id": project_id,
+                                                                  "firestore.mutations": len(batch)}):
+            try:
+                outcomes = await asyncio.to_thread(self._run_transaction, project_id, [mutation for mutation, _, _ in batch])
+            except Exception as e:
+                outcomes = [(False, e)] * len(batch)
+        # Credited before the futures resolve, while the submitting tool calls are still counting
+        for submitter in {id(submitter): submitter for _, _, submitter in batch}.values():
+            documents.credit(submitter, io)
+        for (_, future, _), (succeeded, value) in zip(batch, outcomes):
+            if future.done():
+                continue
+            if succeeded:
+                future.set_result(value)
+            else:
+                future.set_exception(value)
+
+    def _run_transaction(self, project_id: str, mutations: List[Mutation]) -> List[Tuple[bool, Any]]:
+        doc_ref = self.client.collection(self.collection).document(project_id)
+        attempts = 0
+
+        @firestore.transactional
+        def apply(transaction) -> List[Tuple[bool, Any]]:
+            nonlocal attempts
+            attempts += 1
+            snapshot = doc_ref.get(transaction=transaction)
+            record_reads("transaction_get")
+            if not snapshot.exists:
+                raise ProjectNotFound(f"Project {project_id} not found")
+            original = snapshot.to_dict() or {}
+
+            failed: Dict[int, Exception] = {}
+            while True:
+                project_data = copy.deepcopy(original)
+                outcomes: List[Tuple[bool, Any]] = []
+                for index, mutation in enumerate(mutations):
+                    if index in failed:
+                        outcomes.append((False, failed[index]))
+                        continue
+                    try:
+                        outcomes.append((True, mutation(project_data)))
+                    except Exception as e:
+                        # It may have changed the dict before raising: start over without it
+                        failed[index] = e
+                        break
+                else:
+                    break
+
+            changes = {key: value for key, value in project_data.items() if original.get(key, _MISSING) != value}
+            changes.update({key: firestore.DELETE_FIELD for key in original if key not in project_data})
+            if changes:
+                transaction.update(doc_ref, changes)
+                record_writes("transaction_update")
+            return outcomes
+
+        try:
+            return apply(self.client.transaction())
+        finally:
+            record_write_batch(len(mutations), attempts)
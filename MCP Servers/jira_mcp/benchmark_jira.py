@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+Throughput and tail-latency benchmark for `batch_create_issues`.
+
+Runs the Jira MCP's bulk create path (scheduler, shared HTTP client, ref
+label lookup, chunking) against the local fake Jira server at several batch sizes
+and reports, per size:
+
+- issues per second and wall time per call (p50 / p95 / p99 over the runs),
+- latency of the individual Jira HTTP requests (p50 / p95 / p99),
+- requests sent, 429s received and retries made by the scheduler.
+
+By default the fake server is started in-process with the given latency and
+rate limit; pass --jira-url to benchmark a fake server (or Jira sandbox)
+that is already running.
+
+Usage:
+    python benchmark_jira.py
+    python benchmark_jira.py --sizes 10,100,1000 --runs 5 --latency-ms 80 --rate-limit 10
+    python benchmark_jira.py --json bench_results.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+import uuid
+from typing import Any, Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+BENCH_PROJECT_KEY = "BENCH"
+
+
+def percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def start_fake_server(args) -> str:
+    """Run the fake Jira server in a background thread; returns its base URL."""
+    import uvicorn
+    from fake_jira_server import FakeJira, create_app
+
+    jira = FakeJira(args.latency_ms, args.jitter_ms, args.per_issue_ms, args.rate_limit,
+                    args.burst, args.retry_after, args.error_rate)
+    server = uvicorn.Server(uvicorn.Config(create_app(jira), host="127.0.0.1", port=args.port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    deadline = time.monotonic() + 10
+    while not server.started:
+        if time.monotonic() > deadline:
+            raise RuntimeError("Fake Jira server did not start")
+        time.sleep(0.05)
+    return f"http://127.0.0.1:{args.port}"
+
+
+def make_issues(count: int) -> List[Dict[str, Any]]:
+    return [
+        {
+            "summary": f"[TC{index:05d}] Benchmark test case {index}",
+            "description": "Preconditions:\n- user is logged in\n\nTest steps:\n- open the page\n- submit the form",
+            "issue_type": "Task",
+            "external_ref": f"TC{index:05d}",
+        }
+        for index in range(count)
+    ]
+
+
+async def run_benchmark(args) -> List[Dict[str, Any]]:
+    import httpx
+    import main as jira_mcp
+
+    client = jira_mcp.get_http_client()
+    request_latencies: List[float] = []
+
+    async def on_request(request: httpx.Request):
+        request.extensions["bench_started"] = time.perf_counter()
+
+    async def on_response(response: httpx.Response):
+        started = response.request.extensions.get("bench_started")
+        if started is not None:
+            request_latencies.append(time.perf_counter() - started)
+
+    client.event_hooks = {"request": [on_request], "response": [on_response]}
+
+    results = []
+    for size in args.sizes:
+        issues = make_issues(size)
+        durations: List[float] = []
+        created = failed = 0
+        request_latencies.clear()
+        before = jira_mcp.jira_scheduler.metrics()
+
+        for _ in range(args.runs):
+            if args.reset:
+                async with httpx.AsyncClient(base_url=jira_mcp.JIRA_BASE_URL) as admin:
+                    await admin.post("/_fake/reset")
+            # A fresh namespace per run, so earlier runs' ref labels never short-circuit creation
+            started = time.perf_counter()
+            # @mcp.tool() wraps the function in a FunctionTool; .fn is the coroutine function itself
+            result = await jira_mcp.batch_create_issues.fn(issues, BENCH_PROJECT_KEY, f"bench-{uuid.uuid4().hex}")
+            durations.append(time.perf_counter() - started)
+            created += len(result.get("created", []))
+            failed += len(result.get("failed", []))
+
+        after = jira_mcp.jira_scheduler.metrics()
+        total_seconds = sum(durations)
+        results.append({
+            "issues": size,
+            "runs": args.runs,
+            "created": created,
+            "failed": failed,
+            "issues_per_second": round(created / total_seconds, 1) if total_seconds else 0.0,
+            "call_seconds": {
+                "mean": round(statistics.mean(durations), 3),
+                "p50": round(percentile(durations, 50), 3),
+                "p95": round(percentile(durations, 95), 3),
+                "p99": round(percentile(durations, 99), 3),
+            },
+            "request_ms": {
+                "p50": round(percentile(request_latencies, 50) * 1000, 1),
+                "p95": round(percentile(request_latencies, 95) * 1000, 1),
+                "p99": round(percentile(request_latencies, 99) * 1000, 1),
+            },
+            "http_requests": after["requests_total"] - before["requests_total"],
+            "throttled": after["throttled_total"] - before["throttled_total"],
+            "retries": after["retries_total"] - before["retries_total"],
+        })
+        row = results[-1]
+        print(f"{size:>6} issues | {row['issues_per_second']:>8} issues/s | call p50 {row['call_seconds']['p50']:.3f}s "
+              f"p95 {row['call_seconds']['p95']:.3f}s p99 {row['call_seconds']['p99']:.3f}s | request p95 "
+              f"{row['request_ms']['p95']}ms | {row['http_requests']} requests, {row['throttled']} throttled, "
+              f"{row['retries']} retries, {failed} failed")
+
+    await jira_mcp.close_http_client()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark batch_create_issues against a fake Jira")
+    parser.add_argument("--sizes", default="10,100,1000", help="comma-separated issue counts per call")
+    parser.add_argument("--runs", type=int, default=5, help="calls per size")
+    parser.add_argument("--jira-url", help="use an already running fake Jira instead of starting one")
+    parser.add_argument("--port", type=int, default=8091)
+    parser.add_argument("--latency-ms", type=float, default=50)
+    parser.add_argument("--jitter-ms", type=float, default=20)
+    parser.add_argument("--per-issue-ms", type=float, default=2)
+    parser.add_argument("--rate-limit", type=float, default=10)
+    parser.add_argument("--burst", type=float, default=20)
+    parser.add_argument("--retry-after", type=float, default=1)
+    parser.add_argument("--error-rate", type=float, default=0)
+    parser.add_argument("--no-reset", dest="reset", action="store_false",
+                        help="keep issues between runs (required for servers without /_fake/reset)")
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+    args.sizes = [int(size) for size in args.sizes.split(",") if size.strip()]
+
+    base_url = args.jira_url or start_fake_server(args)
+    # main.py reads its configuration at import time
+    os.environ["JIRA_BASE_URL"] = base_url
+    os.environ.setdefault("JIRA_EMAIL", "bench@example.com")
+    os.environ.setdefault("JIRA_API_TOKEN", "bench")
+
+    print(f"🚀 Benchmarking batch_create_issues against {base_url} ({args.runs} runs per size)")
+    results = asyncio.run(run_benchmark(args))
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"jira_url": base_url, "config": vars(args), "results": results}, f, indent=2)
+        print(f"📋 Results written to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
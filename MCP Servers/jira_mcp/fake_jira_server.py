@@ -0,0 +1,277 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the Jira Cloud REST API, for load tests and benchmarks.
+
+Implements the endpoints the Jira MCP server uses, backed by memory:
+
+- POST /rest/api/2/issue            create one issue
+- POST /rest/api/2/issue/bulk       create up to 50 issues, with per-element errors
+- GET/PUT /rest/api/2/issue/{key}   read / update an issue (404 for unknown keys)
+- POST /rest/api/2/issueLink        link two issues
+- GET /rest/api/{2,3}/search        JQL search (project, labels) with startAt pagination
+- GET /rest/api/3/search/jql        JQL search with nextPageToken pagination
+
+Latency and throttling are configurable, so the MCP's scheduler sees
+realistic behaviour: every request waits `latency_ms` (+ random jitter, +
+`per_issue_ms` per issue in bulk requests), and requests beyond the token
+bucket (`rate_limit` per second, bursts up to `burst`) are answered with 429
+and a Retry-After header. `/_fake/stats` reports what the server saw and
+`/_fake/reset` clears issues and counters.
+
+Usage:
+    python fake_jira_server.py --port 8090 --latency-ms 80 --rate-limit 10
+    JIRA_BASE_URL=http://localhost:8090 python main.py
+"""
+
+import argparse
+import asyncio
+import random
+import re
+import time
+from typing import Any, Dict, List, Optional
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, Response
+
+BULK_LIMIT = 50
+
+
+class FakeJira:
+    """In-memory issues plus the latency / rate-limit model."""
+
+    def __init__(self, latency_ms: float = 50, jitter_ms: float = 20, per_issue_ms: float = 2,
+                 rate_limit: float = 10, burst: float = 20, retry_after: float = 1, error_rate: float = 0):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.per_issue_ms = per_issue_ms
+        self.rate_limit = rate_limit
+        self.burst = max(1.0, burst)
+        self.retry_after = retry_after
+        self.error_rate = error_rate
+        self.reset()
+
+    def reset(self) -> None:
+        self.issues: Dict[str, Dict[str, Any]] = {}
+        self.links: List[Dict[str, Any]] = []
+        self.next_id = 10000
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+        self.started = time.monotonic()
+        self.requests: Dict[str, int] = {}
+        self.throttled = 0
+        self.errors = 0
+
+    def allow(self) -> bool:
+        """Token bucket; False means the request gets a 429."""
+        if self.rate_limit <= 0:
+            return True
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate_limit)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+    async def delay(self, issues: int = 0) -> None:
+        seconds = (self.latency_ms + random.uniform(0, self.jitter_ms) + self.per_issue_ms * issues) / 1000
+        if seconds > 0:
+            await asyncio.sleep(seconds)
+
+    def create(self, fields: Dict[str, Any]) -> Dict[str, Any]:
+        project = (fields.get("project") or {}).get("key") or "FAKE"
+        self.next_id += 1
+        key = f"{project}-{self.next_id - 10000}"
+        now = time.strftime("%Y-%m-%dT%H:%M:%S.000+0000", time.gmtime())
+        self.issues[key] = {
+            "id": str(self.next_id),
+            "key": key,
+            "fields": {
+                "project": {"key": project},
+                "summary": fields.get("summary"),
+                "description": fields.get("description"),
+                "issuetype": {"name": (fields.get("issuetype") or {}).get("name", "Task")},
+                "parent": fields.get("parent"),
+                "status": {"name": "To Do"},
+                "priority": {"name": "Medium"},
+                "labels": list(fields.get("labels") or []),
+                "issuelinks": [],
+                "created": now,
+                "updated": now,
+            },
+        }
+        return {"id": str(self.next_id), "key": key, "self": f"/rest/api/2/issue/{self.next_id}"}
+
+    def search(self, jql: str) -> List[Dict[str, Any]]:
+        # Only `project = X` and `labels in (...)` are understood; everything else matches all issues
+        match = re.search(r'project\s*=\s*"?([A-Za-z0-9_]+)"?', jql or "")
+        issues = list(self.issues.values())
+        if match:
+            issues = [issue for issue in issues if issue["fields"]["project"]["key"] == match.group(1)]
+        match = re.search(r'labels\s+in\s*\(([^)]*)\)', jql or "")
+        if match:
+            labels = {label.strip().strip('"') for label in match.group(1).split(",")}
+            issues = [issue for issue in issues if labels.intersection(issue["fields"]["labels"])]
+        return issues
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "issues": len(self.issues),
+            "links": len(self.links),
+            "requests": dict(self.requests),
+            "requests_total": sum(self.requests.values()),
+            "throttled": self.throttled,
+            "errors": self.errors,
+            "uptime_seconds": round(time.monotonic() - self.started, 3),
+        }
+
+
+def _project_fields(issue: Dict[str, Any], fields: Optional[str]) -> Dict[str, Any]:
+    if not fields or fields in ("*all", "*navigable"):
+        return issue
+    wanted = [name.strip() for name in fields.split(",")]
+    return {"id": issue["id"], "key": issue["key"],
+            "fields": {name: issue["fields"].get(name) for name in wanted if name in issue["fields"]}}
+
+
+def create_app(jira: FakeJira) -> FastAPI:
+    app = FastAPI(title="Fake Jira")
+
+    @app.middleware("http")
+    async def simulate(request: Request, call_next):
+        route = f"{request.method} {re.sub(r'/[A-Z][A-Z0-9_]*-[0-9]+$', '/{key}', request.url.path)}"
+        if request.url.path.startswith("/_fake"):
+            return await call_next(request)
+        jira.requests[route] = jira.requests.get(route, 0) + 1
+        if not jira.allow():
+            jira.throttled += 1
+            return JSONResponse({"errorMessages": ["Rate limit exceeded"]}, status_code=429,
+                                headers={"Retry-After": str(jira.retry_after)})
+        if jira.error_rate and random.random() < jira.error_rate:
+            jira.errors += 1
+            await jira.delay()
+            return JSONResponse({"errorMessages": ["Service unavailable"]}, status_code=503)
+        return await call_next(request)
+
+    @app.post("/rest/api/2/issue")
+    async def create_issue(request: Request):
+        body = await request.json()
+        await jira.delay(1)
+        fields = body.get("fields") or {}
+        if not fields.get("summary"):
+            return JSONResponse({"errors": {"summary": "You must specify a summary of the issue."}}, status_code=400)
+        return JSONResponse(jira.create(fields), status_code=201)
+
+    @app.post("/rest/api/2/issue/bulk")
+    async def bulk_create(request: Request):
+        updates = (await request.json()).get("issueUpdates") or []
+        if len(updates) > BULK_LIMIT:
+            return JSONResponse({"errorMessages": [f"Bulk create accepts at most {BULK_LIMIT} issues"]}, status_code=400)
+        await jira.delay(len(updates))
+        issues, errors = [], []
+        for number, update in enumerate(updates):
+            fields = update.get("fields") or {}
+            if not fields.get("summary"):
+                errors.append({"status": 400, "failedElementNumber": number,
+                               "elementErrors": {"errors": {"summary": "You must specify a summary of the issue."}}})
+                continue
+            issues.append(jira.create(fields))
+        return JSONResponse({"issues": issues, "errors": errors}, status_code=201)
+
+    @app.get("/rest/api/2/issue/{key}")
+    async def get_issue(key: str, fields: Optional[str] = None):
+        await jira.delay()
+        if key not in jira.issues:
+            return JSONResponse({"errorMessages": ["Issue does not exist"]}, status_code=404)
+        return _project_fields(jira.issues[key], fields)
+
+    @app.put("/rest/api/2/issue/{key}")
+    async def update_issue(key: str, request: Request):
+        body = await request.json()
+        await jira.delay()
+        if key not in jira.issues:
+            return JSONResponse({"errorMessages": ["Issue does not exist"]}, status_code=404)
+        issue_fields = jira.issues[key]["fields"]
+        for name, value in (body.get("fields") or {}).items():
+            issue_fields[name] = {"name": value["name"]} if isinstance(value, dict) and "name" in value else value
+        for operation in (body.get("update") or {}).get("labels") or []:
+            if "remove" in operation and operation["remove"] in issue_fields["labels"]:
+                issue_fields["labels"].remove(operation["remove"])
+            if "add" in operation and operation["add"] not in issue_fields["labels"]:
+                issue_fields["labels"].append(operation["add"])
+        issue_fields["updated"] = time.strftime("%Y-%m-%dT%H:%M:%S.000+0000", time.gmtime())
+        return Response(status_code=204)
+
+    @app.post("/rest/api/2/issueLink")
+    async def link_issues(request: Request):
+        body = await request.json()
+        await jira.delay()
+        for side in ("inwardIssue", "outwardIssue"):
+            if (body.get(side) or {}).get("key") not in jira.issues:
+                return JSONResponse({"errorMessages": [f"{side} does not exist"]}, status_code=404)
+        jira.links.append(body)
+        inward, outward = body["inwardIssue"]["key"], body["outwardIssue"]["key"]
+        jira.issues[inward]["fields"]["issuelinks"].append({"type": body.get("type"), "outwardIssue": {"key": outward}})
+        jira.issues[outward]["fields"]["issuelinks"].append({"type": body.get("type"), "inwardIssue": {"key": inward}})
+        return Response(status_code=201)
+
+    async def search(request: Request, token_pagination: bool):
+        params = request.query_params
+        max_results = min(100, int(params.get("maxResults", "50")))
+        matches = jira.search(params.get("jql", ""))
+        start_at = int(params.get("nextPageToken") or 0) if token_pagination else int(params.get("startAt", "0"))
+        page = [_project_fields(issue, params.get("fields")) for issue in matches[start_at:start_at + max_results]]
+        await jira.delay(len(page) // 10)
+        if token_pagination:
+            end = start_at + len(page)
+            data: Dict[str, Any] = {"issues": page, "isLast": end >= len(matches)}
+            if end < len(matches):
+                data["nextPageToken"] = str(end)
+            return data
+        return {"startAt": start_at, "maxResults": max_results, "total": len(matches), "issues": page}
+
+    @app.get("/rest/api/2/search")
+    @app.get("/rest/api/3/search")
+    async def search_offset(request: Request):
+        return await search(request, token_pagination=False)
+
+    @app.get("/rest/api/3/search/jql")
+    async def search_token(request: Request):
+        return await search(request, token_pagination=True)
+
+    @app.get("/_fake/stats")
+    async def stats():
+        return jira.stats()
+
+    @app.post("/_fake/reset")
+    async def reset():
+        jira.reset()
+        return jira.stats()
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a local fake Jira REST API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--latency-ms", type=float, default=50, help="base latency of every request")
+    parser.add_argument("--jitter-ms", type=float, default=20, help="random extra latency, 0..jitter")
+    parser.add_argument("--per-issue-ms", type=float, default=2, help="extra latency per issue in bulk requests")
+    parser.add_argument("--rate-limit", type=float, default=10, help="requests per second before 429 (0 = unlimited)")
+    parser.add_argument("--burst", type=float, default=20, help="requests allowed in a burst")
+    parser.add_argument("--retry-after", type=float, default=1, help="Retry-After seconds sent with 429")
+    parser.add_argument("--error-rate", type=float, default=0, help="fraction of requests answered with 503")
+    args = parser.parse_args()
+
+    import uvicorn
+
+    jira = FakeJira(args.latency_ms, args.jitter_ms, args.per_issue_ms, args.rate_limit,
+                    args.burst, args.retry_after, args.error_rate)
+    print(f"🚀 Fake Jira on http://{args.host}:{args.port} "
+          f"(latency {args.latency_ms}ms, rate limit {args.rate_limit}/s, burst {args.burst})")
+    uvicorn.run(create_app(jira), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,210 @@
+"""
+Rate-limit-aware scheduler for Jira REST calls.
+
+Jira Cloud throttles per account: once the budget is used up it answers 429
+with a Retry-After header. Every Jira tool sends its requests through one
+`JiraRequestScheduler`, which
+
+- spaces requests with a token bucket (JIRA_RATE_LIMIT_PER_SECOND, with bursts
+  up to JIRA_RATE_LIMIT_BURST),
+- caps the number of requests in flight (JIRA_MAX_IN_FLIGHT),
+- on 429 pauses *all* requests until Retry-After has passed, since the limit
+  is shared, then retries,
+- retries 5xx responses and transport errors with jittered exponential backoff,
+  but only for idempotent methods: a POST (creating an issue or a link) whose
+  response was lost may already have been applied, so it is retried only when
+  it was throttled or never reached Jira (connect and pool errors),
+- keeps counters for throttling, retries and time spent waiting.
+"""
+
+import asyncio
+import logging
+import os
+import random
+import time
+from email.utils import parsedate_to_datetime
+from typing import Any, Dict, Optional
+
+import httpx
+
+import tracing
+from metrics import api_call_finished, api_call_retried, api_call_started, api_call_throttled, endpoint_template
+
+logger = logging.getLogger("jira_mcp.scheduler")
+
+RETRY_STATUS_CODES = {429, 502, 503, 504}
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}
+# Raised before the request was sent, so retrying cannot apply it twice
+NOT_SENT_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+
+
+def _retry_after_seconds(response: httpx.Response) -> Optional[float]:
+    """Parse Retry-After (seconds or an HTTP date)."""
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class JiraRequestScheduler:
+    """Token bucket + in-flight cap + Retry-After aware retries for Jira requests."""
+
+    def __init__(self):
+        self.rate = float(os.getenv("JIRA_RATE_LIMIT_PER_SECOND", "10"))
+        self.burst = max(1.0, float(os.getenv("JIRA_RATE_LIMIT_BURST", "20")))
+        self.max_in_flight = max(1, int(os.getenv("JIRA_MAX_IN_FLIGHT", "8")))
+        self.max_retries = max(0, int(os.getenv("JIRA_MAX_RETRIES", "3")))
+        self.backoff_base = float(os.getenv("JIRA_BACKOFF_BASE_SECONDS", "1"))
+        self.backoff_max = float(os.getenv("JIRA_BACKOFF_MAX_SECONDS", "30"))
+
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._bucket_lock: Optional[asyncio.Lock] = None
+        self._in_flight: Optional[asyncio.Semaphore] = None
+
+        self.requests_total = 0
+        self.throttled_total = 0
+        self.retries_total = 0
+        self.errors_total = 0
+        self.wait_seconds_total = 0.0
+        self.in_flight = 0
+
+    def _primitives(self):
+        # Created lazily so they bind to the server's running event loop
+        if self._bucket_lock is None:
+            self._bucket_lock = asyncio.Lock()
+            self._in_flight = asyncio.Semaphore(self.max_in_flight)
+        return self._bucket_lock, self._in_flight
+
+    async def _acquire_token(self) -> None:
+        bucket_lock, _ = self._primitives()
+        async with bucket_lock:
+            while True:
+                now = time.monotonic()
+                if now < self._paused_until:
+                    wait = self._paused_until - now
+                elif self.rate <= 0:
+                    return
+                else:
+                    self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                    self._updated = now
+                    if self._tokens >= 1:
+                        self._tokens -= 1
+                        return
+                    wait = (1 - self._tokens) / self.rate
+                self.wait_seconds_total += wait
+                await asyncio.sleep(wait)
+
+    def _backoff(self, attempt: int) -> float:
+        # Full jitter: spread retries from concurrent requests apart
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    def _pause(self, seconds: float) -> None:
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+        # Restart the bucket empty, refilling from the end of the pause, so
+        # requests resume gradually instead of as a full burst
+        self._tokens = 0
+        self._updated = self._paused_until
+
+    async def request(self, client: httpx.AsyncClient, method: str, url: str, *,
+                      idempotent: Optional[bool] = None, **kwargs: Any) -> httpx.Response:
+        """Send a request, waiting for rate-limit capacity and retrying throttled or failed attempts.
+
+        `idempotent` defaults to whether the HTTP method is; non-idempotent
+        requests are only retried on 429 and on errors raised before sending.
+        Returns the final response (which may still be an error status);
+        raises the transport error of the last attempt otherwise.
+        The whole exchange, waits and retries included, is one client span.
+        """
+        if idempotent is None:
+            idempotent = method.upper() in IDEMPOTENT_METHODS
+        endpoint = endpoint_template(url)
+        with tracing.span(f"Jira {method} {endpoint}", "client", **{"http.request.method": method, "url.path": endpoint}):
+            response = await self._send(client, method, url, idempotent, **kwargs)
+            tracing.set_attributes(**{"http.response.status_code": response.status_code})
+            if response.status_code >= 400:
+                tracing.set_error(f"HTTP {response.status_code}")
+            return response
+
+    def _retryable(self, idempotent: bool, response: Optional[httpx.Response], error: Optional[Exception]) -> bool:
+        if response is not None:
+            if response.status_code == 429:
+                return True
+            return idempotent and response.status_code in RETRY_STATUS_CODES
+        return idempotent or isinstance(error, NOT_SENT_ERRORS)
+
+    async def _send(self, client: httpx.AsyncClient, method: str, url: str, idempotent: bool, **kwargs: Any) -> httpx.Response:
+        _, in_flight = self._primitives()
+        attempt = 0
+        while True:
+            await self._acquire_token()
+            async with in_flight:
+                self.in_flight += 1
+                self.requests_total += 1
+                api_call_started()
+                started = time.perf_counter()
+                status = "error"
+                try:
+                    response = await client.request(method, url, **kwargs)
+                    status = str(response.status_code)
+                    error = None
+                except httpx.TransportError as e:
+                    response = None
+                    error = e
+                finally:
+                    self.in_flight -= 1
+                    api_call_finished(method, url, status, time.perf_counter() - started)
+
+            if response is not None and response.status_code < 400:
+                return response
+            if not self._retryable(idempotent, response, error) or attempt >= self.max_retries:
+                if response is None or response.status_code in RETRY_STATUS_CODES:
+                    self.errors_total += 1
+                if error is not None:
+                    raise error
+                return response
+
+            if response is not None and response.status_code == 429:
+                self.throttled_total += 1
+                api_call_throttled()
+                retry_after = _retry_after_seconds(response)
+                delay = retry_after if retry_after is not None else self._backoff(attempt)
+                self._pause(delay)
+                tracing.add_event("jira.throttled", attempt=attempt + 1, retry_after_seconds=delay)
+                logger.warning("Jira throttled %s %s; pausing requests for %.1fs", method, url, delay)
+            else:
+                delay = self._backoff(attempt)
+                reason = error or f"HTTP {response.status_code}"
+                tracing.add_event("jira.retry", attempt=attempt + 1, reason=str(reason), delay_seconds=delay)
+                logger.warning("Jira request %s %s failed (%s); retrying in %.1fs", method, url, reason, delay)
+                self.wait_seconds_total += delay
+                await asyncio.sleep(delay)
+            self.retries_total += 1
+            api_call_retried()
+            attempt += 1
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "requests_total": self.requests_total,
+            "throttled_total": self.throttled_total,
+            "retries_total": self.retries_total,
+            "errors_total": self.errors_total,
+            "wait_seconds_total": round(self.wait_seconds_total, 3),
+            "in_flight": self.in_flight,
+            "paused_for_seconds": round(max(0.0, self._paused_until - time.monotonic()), 3),
+            "rate_limit_per_second": self.rate,
+            "burst": self.burst,
+            "max_in_flight": self.max_in_flight,
+        }
+
+
+# Create a singleton instance
+jira_scheduler = JiraRequestScheduler()
@@ -1,7 +1,9 @@
 import asyncio
+import base64
 import logging
 import os
-from typing import List, Dict, Any
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, List, Dict, Any
 
 from fastmcp import FastMCP
 
@@ -9,14 +11,17 @@ from typing import Any
 import httpx
 from pydantic import BaseModel
 import os
-from jira import JIRA
 from dotenv import load_dotenv
 
-# Load environment variables from .env file
+# Load environment variables from .env file (before the modules that read them at import)
 load_dotenv()
 
-# Initialize FastMCP server
-mcp = FastMCP("jira")
+import metrics
+import tracing
+from jira_scheduler import jira_scheduler
+from ref_store import FINGERPRINT_LABEL_PREFIX, fingerprint_label, issue_fingerprint, label_fingerprint, ref_label, ref_map
+
+logger = logging.getLogger("jira_mcp")
 
 JIRA_BASE_URL = os.getenv("JIRA_BASE_URL")
 JIRA_EMAIL = os.getenv("JIRA_EMAIL")
@@ -32,10 +37,74 @@ if not JIRA_API_TOKEN:
     raise ValueError("JIRA_API_TOKEN environment variable is required")
 
 JIRA_HEADERS = {
-    "Authorization": f"Basic {JIRA_EMAIL}:{JIRA_API_TOKEN}",
+    "Authorization": "Basic " + base64.b64encode(f"{JIRA_EMAIL}:{JIRA_API_TOKEN}".encode()).decode(),
     "Content-Type": "application/json"
 }
-auth_jira = JIRA(server=JIRA_BASE_URL, basic_auth=(JIRA_EMAIL, JIRA_API_TOKEN))
+
+# Jira accepts at most 50 issues per bulk create request
+JIRA_BULK_CHUNK_SIZE = min(50, max(1, int(os.getenv("JIRA_BULK_CHUNK_SIZE", "50"))))
+# Link type used for issues that are attached to their parent with an issue link
+JIRA_LINK_TYPE = os.getenv("JIRA_LINK_TYPE", "Relates")
+JIRA_API_TIMEOUT = float(os.getenv("JIRA_API_TIMEOUT", "30"))
+
+# Search pagination and payload limits
+JIRA_SEARCH_PATH = os.getenv("JIRA_SEARCH_PATH", "/rest/api/3/search")
+JIRA_SEARCH_PAGE_SIZE = min(100, max(1, int(os.getenv("JIRA_SEARCH_PAGE_SIZE", "100"))))
+JIRA_SEARCH_MAX_RESULTS = int(os.getenv("JIRA_SEARCH_MAX_RESULTS", "500"))
+JIRA_SEARCH_SUMMARY_MAX_RESULTS = int(os.getenv("JIRA_SEARCH_SUMMARY_MAX_RESULTS", "10000"))
+JIRA_SEARCH_FIELDS = os.getenv("JIRA_SEARCH_FIELDS", "summary,status,issuetype,priority,assignee,parent,labels,updated")
+
+JIRA_HTTP2 = os.getenv("JIRA_HTTP2", "true").lower() == "true"
+JIRA_KEEPALIVE_EXPIRY = float(os.getenv("JIRA_KEEPALIVE_EXPIRY", "60"))
+
+try:
+    import h2  # noqa: F401  (enables httpx HTTP/2 support)
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+    if JIRA_HTTP2:
+        print("Warning: HTTP/2 support not available. Install with: pip install 'httpx[http2]'")
+
+# One pooled client carries all Jira traffic; the server lifespan opens and closes it
+_http_client: httpx.AsyncClient | None = None
+
+def get_http_client() -> httpx.AsyncClient:
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        _http_client = httpx.AsyncClient(
+            base_url=JIRA_BASE_URL,
+            headers=JIRA_HEADERS,
+            timeout=JIRA_API_TIMEOUT,
+            http2=JIRA_HTTP2 and HTTP2_AVAILABLE,
+            limits=httpx.Limits(
+                max_connections=jira_scheduler.max_in_flight,
+                max_keepalive_connections=jira_scheduler.max_in_flight,
+                keepalive_expiry=JIRA_KEEPALIVE_EXPIRY,
+            ),
+        )
+    return _http_client
+
+async def close_http_client() -> None:
+    global _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
+
+@asynccontextmanager
+async def jira_lifespan(server):
+    get_http_client()
+    print(f"DEBUG: Jira HTTP client ready (http2={JIRA_HTTP2 and HTTP2_AVAILABLE})")
+    try:
+        yield
+    finally:
+        await close_http_client()
+
+# Initialize FastMCP server
+mcp = FastMCP("jira", lifespan=jira_lifespan)
+# Tool call metrics and GET /metrics for Prometheus
+metrics.install(mcp)
+# Tool call and Jira request spans, joined to the Agents API trace
+tracing.install(mcp)
 
 class IssueCreateRequest(BaseModel):
     project_key: str = JIRA_PROJECT_KEY
@@ -44,27 +113,120 @@ class IssueCreateRequest(BaseModel):
     issue_type: str = "Bug"
 
 async def make_jira_request(method: str, url: str, **kwargs) -> dict[str, Any] | None:
-    async with httpx.AsyncClient() as client:
+    try:
+        response = await jira_scheduler.request(get_http_client(), method, url, **kwargs)
+        response.raise_for_status()
+        return response.json()
+    except Exception as e:
+        logger.warning("Jira request %s %s failed: %s", method, url, e)
+        return None
+
+async def iter_search_issues(jql: str, fields: str = JIRA_SEARCH_FIELDS, max_results: int = JIRA_SEARCH_MAX_RESULTS) -> AsyncIterator[Dict[str, Any]]:
+    """Yield issues matching `jql` page by page, fetching only `fields`.
+
+    Follows startAt/maxResults pagination, or nextPageToken when the search
+    endpoint uses it, and stops after `max_results` issues.
+    Raises RuntimeError if a page cannot be fetched.
+    """
+    start_at = 0
+    next_page_token = None
+    returned = 0
+    while returned < max_results:
+        params: Dict[str, Any] = {"jql": jql, "fields": fields, "maxResults": min(JIRA_SEARCH_PAGE_SIZE, max_results - returned)}
+        if next_page_token:
+            params["nextPageToken"] = next_page_token
+        else:
+            params["startAt"] = start_at
+        data = await make_jira_request("GET", JIRA_SEARCH_PATH, params=params)
+        if data is None:
+            raise RuntimeError(f"Jira search failed after {returned} issues")
+
+        issues = data.get("issues") or []
+        for issue in issues[:max_results - returned]:
+            yield issue
+        returned += len(issues)
+        start_at += len(issues)
+
+        next_page_token = data.get("nextPageToken")
+        if not issues or data.get("isLast") or ("total" in data and start_at >= data["total"]):
+            break
+        if "total" not in data and not next_page_token:
+            break
+
+def _field_value(value: Any) -> Any:
+    """Reduce Jira field objects (status, user, issue type, ...) to their display value."""
+    if isinstance(value, dict):
+        for key in ("name", "displayName", "key", "value"):
+            if key in value:
+                return value[key]
+        return value
+    if isinstance(value, list):
+        return [_field_value(item) for item in value]
+    return value
+
+def compact_issue(issue: Dict[str, Any]) -> Dict[str, Any]:
+    """Flatten a Jira search hit into {key, id, <field>: <display value>}."""
+    compact = {"key": issue.get("key"), "id": issue.get("id")}
+    for name, value in (issue.get("fields") or {}).items():
+        if value is not None:
+            compact[name] = _field_value(value)
+    return compact
+
+async def run_search(jql: str, fields: str, max_results: int, summary_only: bool) -> dict[str, Any] | str:
+    """Shared implementation of the search tools."""
+    if summary_only:
+        by_status: Dict[str, int] = {}
+        by_type: Dict[str, int] = {}
+        count = 0
         try:
-            response = await client.request(method, url, headers=JIRA_HEADERS, timeout=30.0, **kwargs)
-            response.raise_for_status()
-            return response.json()
-        except Exception:
-            return None
+            async for issue in iter_search_issues(jql, "status,issuetype", JIRA_SEARCH_SUMMARY_MAX_RESULTS):
+                compact = compact_issue(issue)
+                count += 1
+                by_status[compact.get("status", "Unknown")] = by_status.get(compact.get("status", "Unknown"), 0) + 1
+                by_type[compact.get("issuetype", "Unknown")] = by_type.get(compact.get("issuetype", "Unknown"), 0) + 1
+        except RuntimeError as e:
+            if not count:
+                return f"Unable to search issues: {e}"
+            return {"jql": jql, "count": count, "by_status": by_status, "by_issue_type": by_type, "error": str(e)}
+        return {
+            "jql": jql,
+            "count": count,
+            "truncated": count >= JIRA_SEARCH_SUMMARY_MAX_RESULTS,
+            "by_status": by_status,
+            "by_issue_type": by_type,
+        }
+
+    max_results = max(1, min(max_results, JIRA_SEARCH_MAX_RESULTS))
+    issues = []
+    try:
+        async for issue in iter_search_issues(jql, fields, max_results + 1):
+            issues.append(compact_issue(issue))
+    except RuntimeError as e:
+        if not issues:
+            return f"Unable to search issues: {e}"
+        return {"jql": jql, "returned": len(issues), "issues": issues, "error": str(e)}
+    truncated = len(issues) > max_results
+    return {
+        "jql": jql,
+        "returned": min(len(issues), max_results),
+        "truncated": truncated,
+        "issues": issues[:max_results],
+    }
 
 @mcp.tool()
-async def get_issues() -> dict[str, Any] | str:
-    """Get all JIRA issues."""
-    url = f"{JIRA_BASE_URL}/rest/api/3/search"
-    data = await make_jira_request("GET", url)
-    if not data:
-        return "Unable to fetch issues."
-    return data
+async def get_issues(fields: str = JIRA_SEARCH_FIELDS, max_results: int = JIRA_SEARCH_MAX_RESULTS, summary_only: bool = False) -> dict[str, Any] | str:
+    """Get all JIRA issues, newest first.
+
+    Args:
+        fields: Comma-separated Jira fields to return for each issue
+        max_results: Maximum number of issues to return (capped by the server)
+        summary_only: Return only counts by status and issue type
+    """
+    return await run_search("ORDER BY created DESC", fields, max_results, summary_only)
 
 #@mcp.tool()
 async def create_issue(project_key: str = JIRA_PROJECT_KEY, summary: str = "", description: str = "", issue_type: str = "Task") -> dict[str, Any] | str:
     """Create a new JIRA issue."""
-    url = f"{JIRA_BASE_URL}/rest/api/3/issue"
     payload = {
         "fields": {
             "project": {"key": project_key},
@@ -73,44 +235,320 @@ async def create_issue(project_key: str = JIRA_PROJECT_KEY, summary: str = "", d
             "issuetype": {"name": issue_type}
         }
     }
-    issue = auth_jira.create_issue(fields=payload["fields"])
+    # API v2 accepts a plain-text description (v3 requires Atlassian Document Format)
+    issue = await make_jira_request("POST", "/rest/api/2/issue", json=payload)
     if not issue:
         return "Unable to create issue."
-    # Convert Issue object to dict (using .raw or extracting fields)
-    return issue.raw if hasattr(issue, "raw") else {"key": getattr(issue, "key", None)}
+    return issue
 
-@mcp.tool()
-async def batch_create_issues(jira_issues: List[Dict[str, Any]], project_key: str = JIRA_PROJECT_KEY):
+def _bulk_error_message(error: Dict[str, Any]) -> str:
+    element_errors = error.get("elementErrors") or {}
+    messages = list(element_errors.get("errorMessages") or [])
+    messages += [f"{field}: {message}" for field, message in (element_errors.get("errors") or {}).items()]
+    return "; ".join(messages) or f"HTTP {error.get('status', 'error')}"
+
+def _issue_url(issue_key: str) -> str:
+    return f"{JIRA_BASE_URL.rstrip('/')}/browse/{issue_key}"
+
+def _issue_fields(issue: Dict[str, Any], project_key: str, ref_namespace: str) -> Dict[str, Any]:
+    fields = {
+        "project": {"key": project_key},
+        "summary": issue.get("summary", ""),
+        "description": issue.get("description", ""),
+        "issuetype": {"name": issue.get("issue_type", "Task")}
+    }
+    if issue.get("parent_key"):
+        fields["parent"] = {"key": issue["parent_key"]}
+    if ref_namespace and issue.get("external_ref"):
+        fields["labels"] = [ref_label(ref_namespace, issue["external_ref"]), fingerprint_label(issue)]
+    return fields
+
+async def _find_ref_issues(project_key: str, labels: List[str]) -> Dict[str, Dict[str, Any]]:
+    """Issues carrying one of the ref `labels`, keyed by label.
+
+    If concurrent pushes created an artifact twice, the oldest issue wins.
+    Raises RuntimeError if the search fails.
+    """
+    async def search(chunk: List[str]) -> List[Dict[str, Any]]:
+        quoted = ", ".join(f'"{label}"' for label in chunk)
+        jql = f'project = "{project_key}" AND labels in ({quoted}) ORDER BY created ASC'
+        return [issue async for issue in iter_search_issues(jql, "labels", 10 * len(chunk))]
+
+    # Keep each JQL query short
+    chunks = [labels[start:start + 50] for start in range(0, len(labels), 50)]
+    wanted = set(labels)
+    found: Dict[str, Dict[str, Any]] = {}
+    for issues in await asyncio.gather(*[search(chunk) for chunk in chunks]):
+        for issue in issues:
+            issue_labels = (issue.get("fields") or {}).get("labels") or []
+            for label in wanted.intersection(issue_labels):
+                current = found.get(label)
+                if current is None or int(issue["id"]) < int(current["jira_issue_id"]):
+                    found[label] = {
+                        "jira_issue_id": str(issue["id"]),
+                        "jira_issue_key": issue["key"],
+                        "jira_issue_url": _issue_url(issue["key"]),
+                        "fingerprint": label_fingerprint(issue_labels),
+                    }
+    return found
+
+async def _bulk_create_chunk(items: List[tuple], project_key: str, ref_namespace: str):
+    """Create one chunk of (index, issue) pairs with POST /issue/bulk."""
+    payload = {"issueUpdates": [{"fields": _issue_fields(issue, project_key, ref_namespace)} for _, issue in items]}
     created = []
     failed = []
-    
-    for idx, issue in enumerate(jira_issues):
-        try:
+    try:
+        response = await jira_scheduler.request(get_http_client(), "POST", "/rest/api/2/issue/bulk", json=payload)
+        # Jira answers 400 when every issue in the request failed; the body still lists the errors
+        body = response.json() if response.content else {}
+        if response.status_code >= 400 and not body.get("errors"):
+            response.raise_for_status()
+    except Exception as e:
+        for index, issue in items:
+            failed.append({"index": index, "external_ref": issue.get("external_ref"), "error": str(e)})
+        return created, failed
+
+    errors = {error.get("failedElementNumber"): error for error in body.get("errors") or []}
+    # "issues" lists the successfully created issues in request order
+    results = iter(body.get("issues") or [])
+    for offset, (index, issue) in enumerate(items):
+        if offset in errors:
+            failed.append({"index": index, "external_ref": issue.get("external_ref"), "error": _bulk_error_message(errors[offset])})
+            continue
+        result = next(results, None)
+        if result is None:
+            failed.append({"index": index, "external_ref": issue.get("external_ref"), "error": "No result returned by Jira"})
+            continue
+        created.append({
+            "index": index,
+            "external_ref": issue.get("external_ref"),
+            "jira_issue_id": result["id"],
+            "jira_issue_key": result["key"],
+            "jira_issue_url": _issue_url(result["key"])
+        })
+    return created, failed
+
+async def _update_existing(index: int, issue: Dict[str, Any], existing: Dict[str, Any]) -> tuple[Dict[str, Any] | None, bool]:
+    """Bring an already created issue in line with `issue`.
+
+    Returns (result entry, found); found is False when the issue no longer exists in Jira.
+    """
+    fields = {"summary": issue.get("summary", ""), "description": issue.get("description", "")}
+    # Record the new content's fingerprint in place of the old one
+    labels = [{"add": fingerprint_label(issue)}]
+    if existing.get("fingerprint"):
+        labels.insert(0, {"remove": f"{FINGERPRINT_LABEL_PREFIX}{existing['fingerprint']}"})
+    response = await jira_scheduler.request(
+        get_http_client(), "PUT", f"/rest/api/2/issue/{existing['jira_issue_key']}",
+        json={"fields": fields, "update": {"labels": labels}}
+    )
+    if response.status_code == 404:
+        return None, False
+    response.raise_for_status()
+    return {
+        "index": index,
+        "external_ref": issue.get("external_ref"),
+        "jira_issue_id": existing["jira_issue_id"],
+        "jira_issue_key": existing["jira_issue_key"],
+        "jira_issue_url": existing["jira_issue_url"],
+        "existing": True,
+        "updated": True
+    }, True
+
+def _linked_keys(fields: Dict[str, Any]) -> set:
+    """Keys of the issues an issue is linked to, from its "issuelinks" field."""
+    keys = set()
+    for link in fields.get("issuelinks") or []:
+        for side in ("inwardIssue", "outwardIssue"):
+            if (link.get(side) or {}).get("key"):
+                keys.add(link[side]["key"])
+    return keys
+
+async def _link_issue(entry: Dict[str, Any], link_key: str) -> None:
+    """Link an issue to `link_key`; failures are reported on the entry.
 
-            payload = {
-                "fields": {
-                    "project": {"key": project_key},
-                    "summary": issue["summary"],
-                    "description": issue["description"],
-                    "issuetype": {"name": issue["issue_type"]}
-                }
-            }
-                        
-            result = auth_jira.create_issue(fields=payload["fields"])
-
-            created.append({
-                "index": idx,
-                "jira_issue_id": result.id,
-                "jira_issue_key": result.key,
-                "jira_issue_url": result.permalink()
-            })
+    Issues that existed before are checked first, so a link made by an
+    earlier push is not added twice.
+    """
+    if entry.get("existing"):
+        try:
+            response = await jira_scheduler.request(
+                get_http_client(), "GET", f"/rest/api/2/issue/{entry['jira_issue_key']}", params={"fields": "issuelinks"}
+            )
+            response.raise_for_status()
         except Exception as e:
-            failed.append({
-                "index": idx,
-                "error": str(e)
-            })
-            asyncio.sleep(2)  # retry spacing to avoid 429 throttling
+            entry["link_error"] = str(e)
+            return
+        if link_key in _linked_keys(response.json().get("fields") or {}):
+            entry["linked_to"] = link_key
+            return
+    payload = {
+        "type": {"name": JIRA_LINK_TYPE},
+        "inwardIssue": {"key": entry["jira_issue_key"]},
+        "outwardIssue": {"key": link_key}
+    }
+    try:
+        response = await jira_scheduler.request(get_http_client(), "POST", "/rest/api/2/issueLink", json=payload)
+        response.raise_for_status()
+        entry["linked_to"] = link_key
+    except Exception as e:
+        entry["link_error"] = str(e)
+
+# Serializes lookups and creation per (project, namespace) so concurrent pushes to this instance cannot
+# both create an issue; across instances the oldest of the duplicates is returned afterwards
+_ref_locks: Dict[tuple, asyncio.Lock] = {}
+# Pushes holding or waiting for each lock; the lock is dropped when the last one leaves
+_ref_lock_users: Dict[tuple, int] = {}
+
+@asynccontextmanager
+async def _ref_lock(project_key: str, ref_namespace: str) -> AsyncIterator[None]:
+    key = (project_key, ref_namespace)
+    lock = _ref_locks.setdefault(key, asyncio.Lock())
+    _ref_lock_users[key] = _ref_lock_users.get(key, 0) + 1
+    try:
+        async with lock:
+            yield
+    finally:
+        _ref_lock_users[key] -= 1
+        if not _ref_lock_users[key]:
+            del _ref_lock_users[key]
+            del _ref_locks[key]
+
+@mcp.tool()
+async def batch_create_issues(
+    jira_issues: List[Dict[str, Any]],
+    project_key: str = JIRA_PROJECT_KEY,
+    ref_namespace: str = "",
+    on_existing: str = "skip"
+):
+    """Create many JIRA issues with the bulk create API, without duplicating earlier pushes.
+
+    Args:
+        jira_issues: Issues to create, each with "summary", "description" and
+            "issue_type", plus an "external_ref" (epic_id, feature_id,
+            use_case_id or test_case_id) that identifies the artifact.
+            Optional "parent_key" creates the issue under that parent (e.g. a
+            story under an epic); optional "link_key" links the issue to
+            that issue with JIRA_LINK_TYPE, unless it already is. Issues
+            given with the "jira_issue_key" (and "jira_issue_id",
+            "jira_issue_url") of an earlier push are not created again, only
+            linked.
+        project_key: The JIRA project key to create the issues in
+        ref_namespace: Scope for external_ref values, e.g. the Firestore project ID.
+            Created issues are labelled with their (namespace, external_ref),
+            and issues already carrying those labels are not created again.
+            Empty disables this: every issue is created.
+        on_existing: What to do with artifacts that were already pushed:
+            "skip" returns the existing issue, "update" also rewrites its
+            summary and description when they changed.
 
+    Returns:
+        {"created": [...], "failed": [...]} where every entry carries the
+        "index" of the issue in `jira_issues`. Entries for issues that already
+        existed are marked "existing": true.
+    """
+    async with _ref_lock(project_key, ref_namespace):
+        labels = {issue["external_ref"]: ref_label(ref_namespace, issue["external_ref"])
+                  for issue in jira_issues
+                  if ref_namespace and issue.get("external_ref") and not issue.get("jira_issue_key")}
+        # Refs this instance already knows first: JQL may not list just-created issues yet
+        found = ref_map.get(project_key, labels.values())
+        unknown = [label for label in dict.fromkeys(labels.values()) if label not in found]
+        try:
+            searched = await _find_ref_issues(project_key, unknown) if unknown else {}
+        except RuntimeError as e:
+            # Creating without knowing what exists would duplicate earlier pushes
+            error = f"Could not look up previously pushed issues: {e}"
+            return {"created": [], "failed": [{"index": index, "external_ref": issue.get("external_ref"), "error": error}
+                                              for index, issue in enumerate(jira_issues)]}
+        for label, issue in searched.items():
+            ref_map.record(project_key, label, issue)
+        found.update(searched)
+        known = {ref: found[label] for ref, label in labels.items() if label in found}
+
+        created = []
+        failed = []
+        to_create = []
+        duplicates = []  # (index, index of the first issue with the same external_ref)
+        first_index: Dict[str, int] = {}
+        updates = []
+        for index, issue in enumerate(jira_issues):
+            ref = issue.get("external_ref")
+            if ref and ref in first_index:
+                duplicates.append((index, first_index[ref]))
+                continue
+            if ref:
+                first_index[ref] = index
+            if issue.get("jira_issue_key"):
+                created.append({
+                    "index": index,
+                    "external_ref": ref,
+                    "jira_issue_id": issue.get("jira_issue_id"),
+                    "jira_issue_key": issue["jira_issue_key"],
+                    "jira_issue_url": issue.get("jira_issue_url") or _issue_url(issue["jira_issue_key"]),
+                    "existing": True
+                })
+                continue
+            existing = known.get(ref)
+            if existing is None:
+                to_create.append((index, issue))
+            elif on_existing == "update" and existing["fingerprint"] != issue_fingerprint(issue):
+                updates.append((index, issue, existing))
+            else:
+                created.append({
+                    "index": index,
+                    "external_ref": ref,
+                    "jira_issue_id": existing["jira_issue_id"],
+                    "jira_issue_key": existing["jira_issue_key"],
+                    "jira_issue_url": existing["jira_issue_url"],
+                    "existing": True
+                })
+
+        update_results = await asyncio.gather(
+            *[_update_existing(index, issue, existing) for index, issue, existing in updates],
+            return_exceptions=True
+        )
+        for (index, issue, existing), outcome in zip(updates, update_results):
+            if isinstance(outcome, Exception):
+                failed.append({"index": index, "external_ref": issue.get("external_ref"), "error": str(outcome)})
+                continue
+            entry, exists = outcome
+            if not exists:
+                # Deleted in Jira since it was looked up; create it again
+                ref_map.forget(project_key, labels[issue["external_ref"]])
+                to_create.append((index, issue))
+                continue
+            ref_map.record(project_key, labels[issue["external_ref"]], dict(entry, fingerprint=issue_fingerprint(issue)))
+            created.append(entry)
+
+        chunks = [to_create[start:start + JIRA_BULK_CHUNK_SIZE] for start in range(0, len(to_create), JIRA_BULK_CHUNK_SIZE)]
+        results = await asyncio.gather(*[_bulk_create_chunk(chunk, project_key, ref_namespace) for chunk in chunks])
+        for chunk_created, chunk_failed in results:
+            for entry in chunk_created:
+                issue = jira_issues[entry["index"]]
+                if issue.get("external_ref") in labels:
+                    ref_map.record(project_key, labels[issue["external_ref"]], dict(entry, fingerprint=issue_fingerprint(issue)))
+            created.extend(chunk_created)
+            failed.extend(chunk_failed)
+
+    # Includes issues that existed before: their earlier link may have failed
+    await asyncio.gather(*[
+        _link_issue(entry, jira_issues[entry["index"]]["link_key"])
+        for entry in created if jira_issues[entry["index"]].get("link_key")
+    ])
+
+    # Repeated external_refs in one request resolve to the same issue
+    by_index = {entry["index"]: entry for entry in created + failed}
+    for index, original in duplicates:
+        entry = dict(by_index[original], index=index)
+        (failed if "error" in entry else created).append(entry)
+
+    created.sort(key=lambda entry: entry["index"])
+    failed.sort(key=lambda entry: entry["index"])
+    updated = sum(1 for entry in created if entry.get("updated"))
+    existing = sum(1 for entry in created if entry.get("existing"))
+    logger.info("batch_create_issues: %d created, %d already existed (%d updated), %d failed",
+                len(created) - existing, existing, updated, len(failed))
     return {"created": created, "failed": failed}
 
 @mcp.tool()
@@ -129,9 +567,6 @@ async def update_jira_issue(
         project_key: The JIRA project key to move the issue to (optional)
     """
     try:
-        # Get the issue first to ensure it exists
-        issue = auth_jira.issue(issue_key)
-        
         # Build update fields
         update_fields = {}
         
@@ -144,9 +579,15 @@ async def update_jira_issue(
         if project_key is not None:
             update_fields["project"] = {"key": project_key}
         
-        # Update the issue fields if any provided
+        # Update the issue fields if any provided; Jira answers 404 for unknown issues
         if update_fields:
-            issue.update(fields=update_fields)
+            response = await jira_scheduler.request(
+                get_http_client(), "PUT", f"/rest/api/2/issue/{issue_key}", json={"fields": update_fields}
+            )
+            response.raise_for_status()
+        else:
+            response = await jira_scheduler.request(get_http_client(), "GET", f"/rest/api/2/issue/{issue_key}", params={"fields": "summary"})
+            response.raise_for_status()
         
         return {
             "success": True,
@@ -161,14 +602,16 @@ async def update_jira_issue(
         }
 
 @mcp.tool()
-async def search_issues(jql: str) -> dict[str, Any] | str:
-    """Search JIRA issues using JQL."""
-    url = f"{JIRA_BASE_URL}/rest/api/3/search"
-    params = {"jql": jql}
-    data = await make_jira_request("GET", url, params=params)
-    if not data:
-        return "Unable to search issues."
-    return data
+async def search_issues(jql: str, fields: str = JIRA_SEARCH_FIELDS, max_results: int = JIRA_SEARCH_MAX_RESULTS, summary_only: bool = False) -> dict[str, Any] | str:
+    """Search JIRA issues using JQL.
+
+    Args:
+        jql: JQL query (e.g., 'project=ABC AND status="To Do"')
+        fields: Comma-separated Jira fields to return for each issue
+        max_results: Maximum number of issues to return (capped by the server)
+        summary_only: Return only counts by status and issue type
+    """
+    return await run_search(jql, fields, max_results, summary_only)
 
 @mcp.tool()
 async def create_issue_in_project(project_key: str = JIRA_PROJECT_KEY, summary: str = "", description: str = "", issue_type: str = "Task") -> dict[str, Any] | str:
@@ -180,7 +623,6 @@ async def create_issue_in_project(project_key: str = JIRA_PROJECT_KEY, summary:
         description: The description/details of the issue
         issue_type: The type of the issue (e.g., 'Task', 'Bug')
     """
-    url = f"{JIRA_BASE_URL}/rest/api/3/issue"
     payload = {
         "fields": {
             "project": {"key": project_key},
@@ -189,39 +631,40 @@ async def create_issue_in_project(project_key: str = JIRA_PROJECT_KEY, summary:
             "issuetype": {"name": issue_type}
         }
     }
-    data = await make_jira_request("POST", url, json=payload)
+    # API v2 accepts a plain-text description (v3 requires Atlassian Document Format)
+    data = await make_jira_request("POST", "/rest/api/2/issue", json=payload)
     if not data:
         return f"Unable to create issue in project {project_key}."
     return data
 
 @mcp.tool()
-async def get_issues_from_project(project_key: str = JIRA_PROJECT_KEY) -> dict[str, Any] | str:
+async def get_issues_from_project(project_key: str = JIRA_PROJECT_KEY, fields: str = JIRA_SEARCH_FIELDS, max_results: int = JIRA_SEARCH_MAX_RESULTS, summary_only: bool = False) -> dict[str, Any] | str:
     """Get all JIRA issues from a specific project.
     Args:
         project_key: The key of the JIRA project (e.g., 'ABC')
+        fields: Comma-separated Jira fields to return for each issue
+        max_results: Maximum number of issues to return (capped by the server)
+        summary_only: Return only counts by status and issue type
     """
-    jql = f"project={project_key}"
-    url = f"{JIRA_BASE_URL}/rest/api/3/search"
-    params = {"jql": jql}
-    data = await make_jira_request("GET", url, params=params)
-    if not data:
-        return f"Unable to fetch issues from project {project_key}."
-    return data
+    return await run_search(f"project={project_key}", fields, max_results, summary_only)
 
 @mcp.tool()
-async def search_issues_in_project(project_key: str = JIRA_PROJECT_KEY, jql_query: str = "") -> dict[str, Any] | str:
+async def search_issues_in_project(project_key: str = JIRA_PROJECT_KEY, jql_query: str = "", fields: str = JIRA_SEARCH_FIELDS, max_results: int = JIRA_SEARCH_MAX_RESULTS, summary_only: bool = False) -> dict[str, Any] | str:
     """Search JIRA issues in a specific project using JQL.
     Args:
         project_key: The key of the JIRA project (e.g., 'ABC')
         jql_query: Additional JQL query string (e.g., 'status=Open')
+        fields: Comma-separated Jira fields to return for each issue
+        max_results: Maximum number of issues to return (capped by the server)
+        summary_only: Return only counts by status and issue type
     """
     jql = f"project={project_key} AND {jql_query}" if jql_query else f"project={project_key}"
-    url = f"{JIRA_BASE_URL}/rest/api/3/search"
-    params = {"jql": jql}
-    data = await make_jira_request("GET", url, params=params)
-    if not data:
-        return f"Unable to search issues in project {project_key}."
-    return data
+    return await run_search(jql, fields, max_results, summary_only)
+
+@mcp.tool()
+async def get_jira_request_metrics() -> Dict[str, Any]:
+    """Report Jira request throughput, throttling (429) and retry counters."""
+    return jira_scheduler.metrics()
 
 if __name__ == "__main__":
     port = int(os.getenv("PORT", 8080))
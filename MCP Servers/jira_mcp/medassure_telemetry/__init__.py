@@ -0,0 +1,12 @@
+"""
+Tracing, metrics and logging helpers shared by the Backend, the Agents API and
+the MCP servers.
+
+This directory is the only source of the package. Each service is deployed
+from its own directory, so shared/sync_telemetry.py copies the package into
+every service; edit it here, run the script and commit the copies.
+
+A service's own tracing, metrics and logs modules configure the package for
+that service (service name, metric and logger prefixes) and add what only
+that service has: its middleware, spans and metrics.
+"""
@@ -0,0 +1,195 @@
+"""
+Structured logging shared by every service.
+
+A service's logs module calls `configure` with its logger prefix; its
+category loggers (`get_logger("run")` is the "agents.run" logger in the
+Agents API) are used instead of print():
+
+- each record is one JSON object on stdout (severity, time, category,
+  message, the `extra` fields, trace/span IDs when tracing is on), which Cloud
+  Logging parses into structured entries; LOG_FORMAT=text prints one
+  readable line instead,
+- string fields and messages are cut to LOG_MAX_FIELD_CHARS; messages (with
+  their arguments), tracebacks and other values are only turned into text on
+  the writer thread,
+- records are handed to a bounded queue and written by a background thread,
+  so a slow stdout never blocks the event loop; when the queue is full records
+  are dropped and the next written record reports how many,
+- LOG_LEVEL sets the default level and LOG_LEVELS overrides it per category
+  (e.g. "events=WARNING,session=DEBUG"),
+- LOG_SAMPLE_RATES keeps only a fraction of a category's records below
+  WARNING (e.g. "events=0.1": one log in ten); a service can set a default.
+"""
+
+import atexit
+import copy
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+
+try:
+    from opentelemetry import trace
+    OTEL_AVAILABLE = True
+except ImportError:
+    OTEL_AVAILABLE = False
+
+SERVICE = "medassure"
+
+
+def _pairs(value: str) -> Dict[str, str]:
+    """"events=0.1,run=INFO" -> {"events": "0.1", "run": "INFO"}"""
+    pairs = {}
+    for item in value.split(","):
+        key, separator, setting = item.partition("=")
+        if separator and key.strip():
+            pairs[key.strip()] = setting.strip()
+    return pairs
+
+
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json").lower()
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+CATEGORY_LEVELS = {category: level.upper() for category, level in _pairs(os.getenv("LOG_LEVELS", "")).items()}
+SAMPLE_RATES: Dict[str, float] = {}
+MAX_FIELD_CHARS = int(os.getenv("LOG_MAX_FIELD_CHARS", "500"))
+QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+
+# Attributes every LogRecord has; anything else was passed through `extra`
+_RECORD_ATTRIBUTES = set(vars(logging.makeLogRecord({}))) | {"message", "asctime", "taskName"}
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+def configure(service: str, default_sample_rates: str = "") -> None:
+    """Set the service's logger prefix and its LOG_SAMPLE_RATES default; call before `get_logger`."""
+    global SERVICE
+    SERVICE = service
+    SAMPLE_RATES.clear()
+    SAMPLE_RATES.update({category: float(rate)
+                         for category, rate in _pairs(os.getenv("LOG_SAMPLE_RATES", default_sample_rates)).items()})
+
+
+def truncate(value: Any, limit: int = MAX_FIELD_CHARS) -> str:
+    """Text of `value`, cut to `limit` characters with a note of how much was left out."""
+    text = value if isinstance(value, str) else str(value)
+    if len(text) <= limit:
+        return text
+    return f"{text[:limit]}... [{len(text) - limit} more chars]"
+
+
+def _field(value: Any) -> Any:
+    if value is None or isinstance(value, (bool, int, float)):
+        return value
+    if isinstance(value, (list, tuple)) and len(value) <= 50 and all(
+            item is None or isinstance(item, (str, bool, int, float)) for item in value):
+        return [_field(item) for item in value]
+    return truncate(value)
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record, with the `extra` fields at the top level."""
+
+    def fields(self, record: logging.LogRecord) -> Dict[str, Any]:
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "severity": record.levelname,
+            "category": record.name.split(".", 1)[-1],
+            "message": truncate(record.getMessage()),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES:
+                entry[key] = _field(value)
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exception"] = truncate(record.exc_text, 4000)
+        return entry
+
+    def format(self, record: logging.LogRecord) -> str:
+        return json.dumps(self.fields(record), default=str)
+
+
+class TextFormatter(JsonFormatter):
+    """severity category: message key=value ..., for reading logs locally."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = self.fields(record)
+        exception = entry.pop("exception", None)
+        head = f"{entry.pop('severity')} {entry.pop('category')}: {entry.pop('message')}"
+        entry.pop("time")
+        line = " ".join([head] + [f"{key}={value}" for key, value in entry.items()])
+        return f"{line}\n{exception}" if exception else line
+
+
+class _SamplingFilter(logging.Filter):
+    """Keeps a fraction of the records below WARNING."""
+
+    def __init__(self, rate: float):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        return record.levelno >= logging.WARNING or random.random() < self.rate
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """Queue handler that drops records when the queue is full and leaves formatting to the writer thread."""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Message arguments and exc_info are formatted by the writer thread
+        record = copy.copy(record)
+        # prepare runs on the caller's thread, the only place the current span is known
+        if OTEL_AVAILABLE:
+            span_context = trace.get_current_span().get_span_context()
+            if span_context.is_valid:
+                record.trace_id = format(span_context.trace_id, "032x")
+                record.span_id = format(span_context.span_id, "016x")
+        if self.dropped:
+            record.dropped_records, self.dropped = self.dropped, 0
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def setup_logging() -> None:
+    """Send the service's category loggers through the queue to stdout (once)."""
+    global _listener
+    if _listener is not None:
+        return
+    writer = logging.StreamHandler(sys.stdout)
+    writer.setFormatter(TextFormatter() if LOG_FORMAT == "text" else JsonFormatter())
+    handler = _QueueHandler(queue.Queue(QUEUE_SIZE))
+
+    root = logging.getLogger(SERVICE)
+    root.setLevel(LOG_LEVEL)
+    root.addHandler(handler)
+    root.propagate = False
+
+    _listener = logging.handlers.QueueListener(handler.queue, writer)
+    _listener.start()
+    # Flush what is still queued on shutdown
+    atexit.register(_listener.stop)
+
+
+def get_logger(category: str) -> logging.Logger:
+    """The logger of a category, with its LOG_LEVELS level and LOG_SAMPLE_RATES sampling."""
+    setup_logging()
+    logger = logging.getLogger(f"{SERVICE}.{category}")
+    if category in CATEGORY_LEVELS:
+        logger.setLevel(CATEGORY_LEVELS[category])
+    if category in SAMPLE_RATES and not any(isinstance(f, _SamplingFilter) for f in logger.filters):
+        logger.addFilter(_SamplingFilter(SAMPLE_RATES[category]))
+    return logger
@@ -0,0 +1,100 @@
+"""
+Prometheus helpers shared by every service.
+
+Metrics are optional: without prometheus_client, or with METRICS_ENABLED=false,
+METRICS_ENABLED is False, the services define no metrics, every helper is a
+no-op and /metrics is not registered.
+"""
+
+import contextvars
+import os
+from contextlib import contextmanager
+from typing import Dict, Iterable, Iterator, Optional, Tuple
+
+try:
+    from prometheus_client import CONTENT_TYPE_LATEST, Counter, Histogram, generate_latest
+    PROMETHEUS_AVAILABLE = True
+except ImportError:
+    PROMETHEUS_AVAILABLE = False
+
+METRICS_ENABLED = PROMETHEUS_AVAILABLE and os.getenv("METRICS_ENABLED", "true").lower() == "true"
+
+DOCUMENT_BUCKETS = (0, 1, 2, 5, 10, 25, 50, 100, 250, 1000)
+
+
+def report_disabled() -> None:
+    print("DEBUG: Prometheus metrics disabled" + ("" if PROMETHEUS_AVAILABLE else " (prometheus_client not installed)"))
+
+
+def exposition() -> Tuple[bytes, str]:
+    """Body and content type of a /metrics response."""
+    return generate_latest(), CONTENT_TYPE_LATEST
+
+
+class DocumentCounters:
+    """Firestore documents read and written, per operation and per unit of work.
+
+    A unit is one HTTP request or MCP tool call: the middleware handling it
+    opens `unit()`, and `observe` records what the unit read and wrote under
+    `{label}` (the route or tool). Reads and writes outside a unit only count
+    towards the per-operation totals.
+    """
+
+    def __init__(self, prefix: str, unit: str, label: str):
+        # Documents read/written by the unit currently being handled
+        self._io: contextvars.ContextVar[Optional[Dict[str, int]]] = contextvars.ContextVar(
+            f"{prefix}_io", default=None)
+        if METRICS_ENABLED:
+            per_unit = unit.replace("_", " ")
+            self.read = Counter(f"{prefix}_documents_read_total", "Firestore documents read", ["operation"])
+            self.written = Counter(f"{prefix}_documents_written_total", "Firestore documents written", ["operation"])
+            self.reads_per_unit = Histogram(f"{prefix}_reads_per_{unit}", f"Firestore documents read per {per_unit}",
+                                            [label], buckets=DOCUMENT_BUCKETS)
+            self.writes_per_unit = Histogram(f"{prefix}_writes_per_{unit}", f"Firestore documents written per {per_unit}",
+                                             [label], buckets=DOCUMENT_BUCKETS)
+
+    def record_reads(self, operation: str, count: int = 1) -> None:
+        if METRICS_ENABLED:
+            self.read.labels(operation).inc(count)
+            io = self._io.get()
+            if io is not None:
+                io["reads"] += count
+
+    def record_writes(self, operation: str, count: int = 1) -> None:
+        if METRICS_ENABLED:
+            self.written.labels(operation).inc(count)
+            io = self._io.get()
+            if io is not None:
+                io["writes"] += count
+
+    def counted_reads(self, operation: str, documents: Iterable) -> Iterator:
+        """Pass a query stream through, counting each document as a read."""
+        for document in documents:
+            self.record_reads(operation)
+            yield document
+
+    @contextmanager
+    def unit(self) -> Iterator[Dict[str, int]]:
+        """Count the documents read and written inside the block."""
+        io = {"reads": 0, "writes": 0}
+        token = self._io.set(io)
+        try:
+            yield io
+        finally:
+            self._io.reset(token)
+
+    def current(self) -> Optional[Dict[str, int]]:
+        """The counts of the unit being handled, to credit work done for it in another context."""
+        return self._io.get()
+
+    @staticmethod
+    def credit(io: Optional[Dict[str, int]], done: Dict[str, int]) -> None:
+        """Add the documents read and written in `done` to a unit's counts."""
+        if io is not None:
+            io["reads"] += done["reads"]
+            io["writes"] += done["writes"]
+
+    def observe(self, label: str, io: Dict[str, int]) -> None:
+        if METRICS_ENABLED:
+            self.reads_per_unit.labels(label).observe(io["reads"])
+            self.writes_per_unit.labels(label).observe(io["writes"])
@@ -0,0 +1,194 @@
+"""
+OpenTelemetry setup and span helpers shared by every service.
+
+Configuration:
+- TRACING_EXPORTER: "none" (default, tracing off), "otlp" (OTLP/HTTP to
+  OTEL_EXPORTER_OTLP_ENDPOINT, default http://localhost:4318), "file" (one
+  JSON span per line in TRACING_FILE_PATH) or "console"
+- TRACING_SAMPLE_RATIO: fraction of new traces recorded; spans of a sampled
+  caller are always recorded
+- OTEL_SERVICE_NAME: service name on the spans (default: the one passed to
+  `configure`)
+
+Without opentelemetry-sdk, or with TRACING_EXPORTER=none, every helper is a no-op.
+"""
+
+import functools
+import importlib.util
+import inspect
+import json
+import os
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional
+
+try:
+    from opentelemetry import context as otel_context
+    from opentelemetry import propagate, trace
+    from opentelemetry.trace import SpanKind, Status, StatusCode
+    OTEL_AVAILABLE = True
+except ImportError:
+    OTEL_AVAILABLE = False
+
+TRACING_EXPORTER = os.getenv("TRACING_EXPORTER", "none").lower()
+TRACING_ENABLED = OTEL_AVAILABLE and TRACING_EXPORTER != "none"
+
+default_service_name = "medassure"
+tracer = trace.get_tracer("medassure") if OTEL_AVAILABLE else None
+
+
+def configure(service_name: str, tracer_name: str) -> Any:
+    """Set the service's default name and tracer; returns the tracer."""
+    global default_service_name, tracer
+    default_service_name = service_name
+    if OTEL_AVAILABLE:
+        tracer = trace.get_tracer(tracer_name)
+    return tracer
+
+
+def _exporter():
+    if TRACING_EXPORTER == "otlp":
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+        return OTLPSpanExporter()
+    from opentelemetry.sdk.trace.export import ConsoleSpanExporter
+    if TRACING_EXPORTER == "file":
+        path = os.getenv("TRACING_FILE_PATH", "data/traces.jsonl")
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        return ConsoleSpanExporter(out=open(path, "a"),
+                                   formatter=lambda span: json.dumps(json.loads(span.to_json())) + "\n")
+    return ConsoleSpanExporter()
+
+
+def setup_tracing() -> None:
+    """Install the tracer provider and exporter chosen by TRACING_EXPORTER."""
+    if not TRACING_ENABLED:
+        if TRACING_EXPORTER != "none":
+            print("DEBUG: Tracing disabled (opentelemetry-sdk not installed)")
+        return
+    from opentelemetry.sdk.resources import Resource
+    from opentelemetry.sdk.trace import TracerProvider
+    from opentelemetry.sdk.trace.export import BatchSpanProcessor
+    from opentelemetry.sdk.trace.sampling import ParentBased, TraceIdRatioBased
+
+    service_name = os.getenv("OTEL_SERVICE_NAME", default_service_name)
+    sampler = ParentBased(TraceIdRatioBased(float(os.getenv("TRACING_SAMPLE_RATIO", "1.0"))))
+    provider = TracerProvider(resource=Resource.create({"service.name": service_name}), sampler=sampler)
+    provider.add_span_processor(BatchSpanProcessor(_exporter()))
+    trace.set_tracer_provider(provider)
+    print(f"DEBUG: Tracing enabled for {service_name} ({TRACING_EXPORTER} exporter)")
+
+
+@contextmanager
+def span(name: str, kind: str = "internal", **attributes: Any) -> Iterator[Any]:
+    """Run the block in a span ("internal", "client" or "server"); exceptions mark it as failed."""
+    if not TRACING_ENABLED:
+        yield None
+        return
+    with tracer.start_as_current_span(name, kind=getattr(SpanKind, kind.upper()),
+                                      attributes={k: v for k, v in attributes.items() if v is not None}) as current:
+        yield current
+
+
+def traced(name: str, kind: str = "client", **attributes: Any):
+    """Decorator running a sync or async function in a span."""
+
+    def decorate(function):
+        if inspect.iscoroutinefunction(function):
+            @functools.wraps(function)
+            async def async_wrapper(*args, **kwargs):
+                with span(name, kind, **attributes):
+                    return await function(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with span(name, kind, **attributes):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def add_event(name: str, **attributes: Any) -> None:
+    """Add an event to the current span."""
+    if TRACING_ENABLED:
+        trace.get_current_span().add_event(name, {k: v for k, v in attributes.items() if v is not None})
+
+
+def set_attributes(**attributes: Any) -> None:
+    if TRACING_ENABLED:
+        trace.get_current_span().set_attributes({k: v for k, v in attributes.items() if v is not None})
+
+
+def set_error(description: str) -> None:
+    """Mark the current span as failed without an exception."""
+    if TRACING_ENABLED:
+        trace.get_current_span().set_status(Status(StatusCode.ERROR, description[:200]))
+
+
+def inject_headers() -> Dict[str, str]:
+    """The current trace context as HTTP headers (traceparent, tracestate) for an outgoing request."""
+    carrier: Dict[str, str] = {}
+    if TRACING_ENABLED:
+        propagate.inject(carrier)
+    return carrier
+
+
+def inject_meta() -> Optional[Dict[str, str]]:
+    """The current trace context as MCP request `_meta` (traceparent, tracestate)."""
+    return inject_headers() or None
+
+
+@contextmanager
+def extracted_context(carrier: Dict[str, str]) -> Iterator[None]:
+    """Make the trace context of an incoming request (headers or MCP `_meta`) current for the block."""
+    if not TRACING_ENABLED:
+        yield
+        return
+    token = otel_context.attach(propagate.extract(carrier))
+    try:
+        yield
+    finally:
+        otel_context.detach(token)
+
+
+class TracingMiddleware:
+    """ASGI middleware running each HTTP request in a server span joined to the caller's trace."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = {key.decode("latin-1"): value.decode("latin-1") for key, value in scope["headers"]}
+        status = {"code": 500}
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        with extracted_context(headers):
+            with tracer.start_as_current_span(f"{scope['method']} {scope['path']}", kind=SpanKind.SERVER,
+                                              attributes={"http.request.method": scope["method"]}) as current:
+                try:
+                    await self.app(scope, receive, send_with_status)
+                finally:
+                    # Name the span after the route template once the router has matched it
+                    route = getattr(scope.get("route"), "path", None)
+                    if route:
+                        current.update_name(f"{scope['method']} {route}")
+                        current.set_attribute("http.route", route)
+                    current.set_attribute("http.response.status_code", status["code"])
+                    if status["code"] >= 500:
+                        current.set_status(Status(StatusCode.ERROR))
+
+
+def install_fastapi(app) -> None:
+    """Set up tracing and add the server span middleware to a FastAPI app."""
+    setup_tracing()
+    # FastAPI releases with built-in telemetry (fastapi.telemetry) record the
+    # same server span, joined to the caller's traceparent, once a provider is set
+    if TRACING_ENABLED and importlib.util.find_spec("fastapi.telemetry") is None:
+        app.add_middleware(TracingMiddleware)
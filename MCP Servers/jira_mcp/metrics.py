@@ -0,0 +1,110 @@
+"""
+Prometheus metrics for the Jira MCP server.
+
+GET /metrics (next to /mcp) exposes:
+
+- jira_mcp_tool_calls_total{tool,outcome} and
+  jira_mcp_tool_call_duration_seconds{tool}: every MCP tool call,
+- jira_mcp_tool_calls_in_flight{tool},
+- jira_api_calls_total{method,endpoint,status} and
+  jira_api_call_duration_seconds{method,endpoint}: every Jira REST attempt made
+  by the request scheduler, retries included (status "error" for transport errors),
+- jira_api_calls_in_flight, jira_api_throttled_total, jira_api_retries_total.
+
+Endpoints are reported as path templates (issue keys and IDs become {id}) so
+label cardinality stays bounded. Metrics are optional: without
+prometheus_client, or with METRICS_ENABLED=false, every helper is a no-op and
+/metrics is not registered.
+"""
+
+import re
+import time
+
+import httpx
+from fastmcp.server.middleware import Middleware, MiddlewareContext
+
+from medassure_telemetry import metrics as shared_metrics
+from medassure_telemetry.metrics import METRICS_ENABLED
+
+if METRICS_ENABLED:
+    from prometheus_client import Counter, Gauge, Histogram
+
+LATENCY_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+_ID_SEGMENT = re.compile(r"/(?:[A-Za-z][A-Za-z0-9_]*-\d+|\d{2,})(?=/|$)")
+
+if METRICS_ENABLED:
+    TOOL_CALLS = Counter("jira_mcp_tool_calls_total", "MCP tool calls", ["tool", "outcome"])
+    TOOL_DURATION = Histogram("jira_mcp_tool_call_duration_seconds", "MCP tool call latency", ["tool"],
+                              buckets=LATENCY_BUCKETS)
+    TOOLS_IN_FLIGHT = Gauge("jira_mcp_tool_calls_in_flight", "MCP tool calls being handled", ["tool"])
+    API_CALLS = Counter("jira_api_calls_total", "Jira REST requests sent", ["method", "endpoint", "status"])
+    API_DURATION = Histogram("jira_api_call_duration_seconds", "Jira REST request latency", ["method", "endpoint"],
+                             buckets=LATENCY_BUCKETS)
+    API_IN_FLIGHT = Gauge("jira_api_calls_in_flight", "Jira REST requests awaiting a response")
+    API_THROTTLED = Counter("jira_api_throttled_total", "Jira responses with HTTP 429")
+    API_RETRIES = Counter("jira_api_retries_total", "Jira requests retried after 429, 5xx or a transport error")
+
+
+def endpoint_template(url: str) -> str:
+    """/rest/api/2/issue/PROJ-12/transitions -> /rest/api/2/issue/{id}/transitions"""
+    return _ID_SEGMENT.sub("/{id}", httpx.URL(url).path) or "/"
+
+
+def api_call_started() -> None:
+    if METRICS_ENABLED:
+        API_IN_FLIGHT.inc()
+
+
+def api_call_finished(method: str, url: str, status: str, seconds: float) -> None:
+    if METRICS_ENABLED:
+        endpoint = endpoint_template(url)
+        API_IN_FLIGHT.dec()
+        API_CALLS.labels(method, endpoint, status).inc()
+        API_DURATION.labels(method, endpoint).observe(seconds)
+
+
+def api_call_throttled() -> None:
+    if METRICS_ENABLED:
+        API_THROTTLED.inc()
+
+
+def api_call_retried() -> None:
+    if METRICS_ENABLED:
+        API_RETRIES.inc()
+
+
+class ToolMetricsMiddleware(Middleware):
+    """Counts and times every MCP tool call."""
+
+    async def on_call_tool(self, context: MiddlewareContext, call_next):
+        tool = context.message.name
+        TOOLS_IN_FLIGHT.labels(tool).inc()
+        started = time.perf_counter()
+        outcome = "error"
+        try:
+            result = await call_next(context)
+            # Tools report most failures as {"success": False, "error": ...}
+            content = getattr(result, "structured_content", None)
+            outcome = "error" if isinstance(content, dict) and content.get("success") is False else "success"
+            return result
+        finally:
+            TOOLS_IN_FLIGHT.labels(tool).dec()
+            TOOL_CALLS.labels(tool, outcome).inc()
+            TOOL_DURATION.labels(tool).observe(time.perf_counter() - started)
+
+
+def install(mcp) -> None:
+    """Add the tool middleware and the /metrics route to a FastMCP server."""
+    if not METRICS_ENABLED:
+        shared_metrics.report_disabled()
+        return
+
+    from starlette.responses import Response
+
+    mcp.add_middleware(ToolMetricsMiddleware())
+
+    @mcp.custom_route("/metrics", methods=["GET"])
+    async def metrics_endpoint(request):
+        body, content_type = shared_metrics.exposition()
+        return Response(body, media_type=content_type)
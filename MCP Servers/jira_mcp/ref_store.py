@@ -0,0 +1,95 @@
+"""
+Labels that tie Jira issues to the generated artifacts they were created for.
+
+Every issue created through `batch_create_issues` with an `external_ref`
+(epic_id, feature_id, use_case_id or test_case_id) and a `ref_namespace`
+carries two labels:
+
+- a ref label, a hash of (namespace, external_ref). The namespace separates
+  artifacts of different Firestore projects, which all number their epics
+  from E001,
+- a fingerprint label, a hash of the fields the push wrote, so an "update"
+  push can tell whether the content changed.
+
+The mapping lives on the issues themselves, so it survives restarts and is
+shared by every instance of the server: a retried push finds the issues of
+the earlier one with a JQL `labels in (...)` search and returns (or updates)
+them instead of creating them again.
+
+Jira indexes new issues for search asynchronously, so a retry right after a
+push may not find them with JQL yet. Each instance therefore also keeps the
+ref → issue mapping of the issues it created or found (`ref_map`, the most
+recent JIRA_REF_MAP_SIZE refs) and searches only for the refs it does not know.
+"""
+
+import hashlib
+import json
+import os
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Optional
+
+JIRA_REF_LABEL_PREFIX = os.getenv("JIRA_REF_LABEL_PREFIX", "tcgen")
+JIRA_REF_MAP_SIZE = max(0, int(os.getenv("JIRA_REF_MAP_SIZE", "10000")))
+REF_LABEL_PREFIX = f"{JIRA_REF_LABEL_PREFIX}-ref-"
+FINGERPRINT_LABEL_PREFIX = f"{JIRA_REF_LABEL_PREFIX}-fp-"
+
+
+def issue_fingerprint(issue: Dict[str, Any]) -> str:
+    """Hash of the fields a push writes, used to detect changed content."""
+    content = {field: issue.get(field) for field in ("summary", "description", "issue_type")}
+    return hashlib.sha256(json.dumps(content, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+
+
+def ref_label(namespace: str, external_ref: str) -> str:
+    """Label identifying the issue of `external_ref` in `namespace`.
+
+    Hashed because labels cannot contain spaces and the IDs are free-form.
+    """
+    digest = hashlib.sha256(f"{namespace}\n{external_ref}".encode("utf-8")).hexdigest()[:24]
+    return f"{REF_LABEL_PREFIX}{digest}"
+
+
+def fingerprint_label(issue: Dict[str, Any]) -> str:
+    return f"{FINGERPRINT_LABEL_PREFIX}{issue_fingerprint(issue)}"
+
+
+def label_fingerprint(labels: Any) -> Optional[str]:
+    """The fingerprint recorded in an issue's labels, if any."""
+    for label in labels or []:
+        if isinstance(label, str) and label.startswith(FINGERPRINT_LABEL_PREFIX):
+            return label[len(FINGERPRINT_LABEL_PREFIX):]
+    return None
+
+
+class RefMap:
+    """Issues of known (Jira project, ref label) pairs, least recently used first."""
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._issues: "OrderedDict[tuple, Dict[str, Any]]" = OrderedDict()
+
+    def get(self, project_key: str, labels: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        """The known issues among `labels`, keyed by label."""
+        found = {}
+        for label in labels:
+            issue = self._issues.get((project_key, label))
+            if issue is not None:
+                self._issues.move_to_end((project_key, label))
+                found[label] = dict(issue)
+        return found
+
+    def record(self, project_key: str, label: str, issue: Dict[str, Any]) -> None:
+        """Remember the issue (jira_issue_id, jira_issue_key, jira_issue_url, fingerprint) of a ref label."""
+        if self.max_size <= 0:
+            return
+        self._issues[(project_key, label)] = {field: issue.get(field) for field in
+                                              ("jira_issue_id", "jira_issue_key", "jira_issue_url", "fingerprint")}
+        self._issues.move_to_end((project_key, label))
+        while len(self._issues) > self.max_size:
+            self._issues.popitem(last=False)
+
+    def forget(self, project_key: str, label: str) -> None:
+        self._issues.pop((project_key, label), None)
+
+
+ref_map = RefMap(JIRA_REF_MAP_SIZE)
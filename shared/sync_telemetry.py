@@ -0,0 +1,61 @@
+"""
+Copy the medassure_telemetry package into every service directory.
+
+The Backend, the Agents API and each MCP server are deployed from their own
+directory (`gcloud run deploy --source=.`, `COPY . .`), so each needs its own
+copy of the package. Edit shared/medassure_telemetry only, then run
+
+    python shared/sync_telemetry.py
+
+and commit the copies. With --check nothing is written and the exit status
+is 1 when a copy differs from the source.
+"""
+
+import argparse
+import filecmp
+import shutil
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+SOURCE = ROOT / "shared" / "medassure_telemetry"
+SERVICES = ("Agents", "Backend", "MCP Servers/jira_mcp", "MCP Servers/firestore_mcp")
+
+
+def _modules(directory: Path):
+    return {path.name for path in directory.glob("*.py")} if directory.is_dir() else set()
+
+
+def stale_copies():
+    """(service copy, out-of-date module names) for every copy that differs from the source."""
+    source_modules = _modules(SOURCE)
+    for service in SERVICES:
+        copy = ROOT / service / SOURCE.name
+        copy_modules = _modules(copy)
+        stale = sorted((copy_modules ^ source_modules)
+                       | {name for name in source_modules & copy_modules
+                          if not filecmp.cmp(SOURCE / name, copy / name, shallow=False)})
+        if stale:
+            yield copy, stale
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--check", action="store_true", help="only report copies that differ from the source")
+    args = parser.parse_args()
+
+    stale = list(stale_copies())
+    for copy, names in stale:
+        print(f"{copy.relative_to(ROOT)}: {', '.join(names)}")
+        if not args.check:
+            shutil.rmtree(copy, ignore_errors=True)
+            shutil.copytree(SOURCE, copy, ignore=shutil.ignore_patterns("__pycache__", "*.pyc"))
+    if args.check:
+        return 1 if stale else 0
+    if not stale:
+        print("All copies are up to date")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())